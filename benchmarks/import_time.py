@@ -0,0 +1,153 @@
+# vim: set fileencoding=utf-8
+"""
+benchmarks/import_time.py
+
+This file checks the import cost of pythoneda.shared.git.github.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Usage:
+    python benchmarks/import_time.py [--budget-ms 150] [--runs 5]
+                                     [--statement "from pythoneda.shared.git.github import Repository"]
+
+Runs the statement in fresh interpreters under `python -X importtime`, and
+reports the best time spent importing modules on its behalf (compared to an
+empty interpreter) and the slowest modules it pulled in. It fails if that
+time exceeds the budget, or if any of the network-only dependencies
+(aiohttp, multidict, http.server) got imported.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+PACKAGE = "pythoneda.shared.git.github"
+DEFAULT_STATEMENT = f"from {PACKAGE} import Repository"
+# Modules only needed to talk to the network, or to serve metrics.
+FORBIDDEN = ("aiohttp", "multidict", "http.server")
+
+
+def importtime(statement: str) -> Dict[str, Tuple[int, int, int]]:
+    """
+    Runs a statement in a fresh interpreter under -X importtime.
+    :param statement: The Python statement.
+    :type statement: str
+    :return: For each imported module, its self and cumulative time, in
+    microseconds, and its nesting level (0 for modules the statement imported
+    directly).
+    :rtype: Dict[str, Tuple[int, int, int]]
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": ""},
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr)
+    result = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            own, cumulative = int(fields[0]), int(fields[1])
+        except ValueError:
+            # The header line.
+            continue
+        name = fields[2].rstrip()
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        result[name.strip()] = (own, cumulative, level)
+    return result
+
+
+def cost(run: Dict[str, Tuple[int, int, int]], startup: set) -> int:
+    """
+    Computes the time spent importing modules on behalf of the statement.
+    :param run: The output of importtime().
+    :type run: Dict[str, Tuple[int, int, int]]
+    :param startup: The modules any interpreter imports at startup.
+    :type startup: set
+    :return: Such time, in microseconds.
+    :rtype: int
+    """
+    return sum(
+        cumulative
+        for name, (_, cumulative, level) in run.items()
+        if level == 0 and name not in startup
+    )
+
+
+def main(argv: List[str]) -> int:
+    usage, description = __doc__.split("Usage:")[1].split("\n\n", 1)
+    parser = argparse.ArgumentParser(
+        usage=usage.strip(),
+        description=description.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--statement", default=DEFAULT_STATEMENT, help="The import to measure."
+    )
+    parser.add_argument(
+        "--budget-ms", type=float, default=150.0, help="The maximum import time."
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="How many interpreters to start."
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="How many of the slowest modules to show."
+    )
+    args = parser.parse_args(argv)
+
+    startup = set(importtime("pass"))
+    runs = [importtime(args.statement) for _ in range(args.runs)]
+    fastest = min(runs, key=lambda run: cost(run, startup))
+    best = cost(fastest, startup)
+
+    print(f"{args.statement}")
+    print(f"  {best / 1000:.1f} ms (best of {args.runs})")
+    slowest = sorted(
+        (item for item in fastest.items() if item[0] not in startup),
+        key=lambda item: item[1][0],
+        reverse=True,
+    )
+    for module, (own, _, _) in slowest[: args.top]:
+        print(f"  {own / 1000:>8.1f} ms  {module}")
+
+    failures = []
+    if best / 1000 > args.budget_ms:
+        failures.append(
+            f"{best / 1000:.1f} ms exceeds the {args.budget_ms:.1f} ms budget"
+        )
+    for module in FORBIDDEN:
+        if any(name == module or name.startswith(f"{module}.") for name in fastest):
+            failures.append(f"{module} imported eagerly")
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
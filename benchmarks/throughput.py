@@ -0,0 +1,367 @@
+# vim: set fileencoding=utf-8
+"""
+benchmarks/throughput.py
+
+This file benchmarks the Github clients against FakeGithubServer.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Usage:
+    python benchmarks/throughput.py [--sizes 1,100,10000] [--concurrency 64]
+                                    [--latency 0.0] [--error-rate 0.0]
+                                    [--scenarios fetch,create]
+                                    [--output results.json]
+                                    [--baseline results.json] [--tolerance 0.25]
+
+For each organization size, every scenario issues its calls (one per
+repository, or a single listing or bulk update of the whole organization)
+against an in-process FakeGithubServer, through clients sharing a single
+session, and reports requests per second, p50/p95/p99 latency and peak traced
+memory (client and fake server share the process). Only the requests sent by
+successful calls count as throughput. Calls whose result shows they failed are
+counted apart, and left out of the throughput and latencies; any failure fails
+the run, as its numbers can't be trusted. With --baseline, the run also fails
+if throughput drops or p95 latency grows beyond the tolerance.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from pythoneda.shared.git.github.aiohttp_transport import AiohttpTransport
+from pythoneda.shared.git.github.custom_property_values import CustomPropertyValues
+from pythoneda.shared.git.github.fake_github_server import FakeGithubServer
+from pythoneda.shared.git.github.repository_access import RepositoryAccess
+from pythoneda.shared.git.github.team import Team
+
+ORG = "bench"
+TOKEN = "benchmark-token"
+
+# The requests sent by the call running in the current task.
+REQUESTS = contextvars.ContextVar("requests")
+
+
+class Clients(NamedTuple):
+    """
+    The clients of a scenario run, sharing a single session.
+    """
+
+    access: RepositoryAccess
+    team: Team
+    properties: CustomPropertyValues
+
+
+def _teams(size: int) -> int:
+    return max(size // 10, 1)
+
+
+# Each call returns whether it succeeded.
+
+
+async def _fetch(clients: Clients, names: List[str], index: int) -> bool:
+    repository = await clients.access.fetch(ORG, names[index])
+    return repository is not None
+
+
+async def _create(clients: Clients, names: List[str], index: int) -> bool:
+    repository = await clients.access.create(ORG, f"new-{index:06d}")
+    return repository is not None
+
+
+async def _rename_to(clients: Clients, names: List[str], index: int) -> bool:
+    return await clients.access.rename_to(ORG, names[index], f"renamed-{index:06d}")
+
+
+async def _team_list(clients: Clients, names: List[str], index: int) -> bool:
+    count = 0
+    async for _ in clients.team.stream(ORG):
+        count += 1
+    return count == _teams(len(names))
+
+
+async def _stream(clients: Clients, names: List[str], index: int) -> bool:
+    count = 0
+    async for _ in clients.access.stream(ORG):
+        count += 1
+    return count == len(names)
+
+
+async def _custom_properties(clients: Clients, names: List[str], index: int) -> bool:
+    results = await clients.properties.set(ORG, names, {"tier": "gold"})
+    return sum(len(batch) for batch, _ in results) == len(names)
+
+
+def _one_per_repository(size: int) -> int:
+    return size
+
+
+def _one(size: int) -> int:
+    return 1
+
+
+# Scenario name -> (number of calls for an organization size, coroutine
+# issuing the [index]-th call).
+SCENARIOS: Dict[str, Tuple[Callable, Callable]] = {
+    "fetch": (_one_per_repository, _fetch),
+    "create": (_one_per_repository, _create),
+    "rename_to": (_one_per_repository, _rename_to),
+    "team_list": (_one, _team_list),
+    "stream": (_one, _stream),
+    "custom_properties": (_one, _custom_properties),
+}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+    Computes a percentile by nearest rank.
+    :param samples: The sorted samples.
+    :type samples: List[float]
+    :param fraction: The percentile, between 0 and 1.
+    :type fraction: float
+    :return: The percentile.
+    :rtype: float
+    """
+    if not samples:
+        return 0.0
+    rank = max(int(round(fraction * len(samples) + 0.5)) - 1, 0)
+    return samples[min(rank, len(samples) - 1)]
+
+
+async def run_scenario(
+    scenario: str,
+    size: int,
+    concurrency: int,
+    latency: float,
+    memory: bool,
+    errorRate: float = 0.0,
+) -> Dict:
+    """
+    Runs a scenario against a fresh fake server holding [size] repositories.
+    :param scenario: The scenario name.
+    :type scenario: str
+    :param size: The number of repositories.
+    :type size: int
+    :param concurrency: The maximum number of calls in flight.
+    :type concurrency: int
+    :param latency: The latency injected by the fake server, in seconds.
+    :type latency: float
+    :param memory: Whether to trace peak memory.
+    :type memory: bool
+    :param errorRate: The probability of the fake server failing a request.
+    :type errorRate: float
+    :return: The results.
+    :rtype: Dict
+    """
+    import aiohttp
+
+    calls, call = SCENARIOS[scenario]
+    server = FakeGithubServer(
+        latency=latency, errorRate=errorRate, rateLimit=10 * size + 1000
+    )
+    names = server.populate(ORG, size)
+    for index in range(_teams(size)):
+        server.add_team(ORG, f"team-{index:05d}")
+    await server.start()
+    latencies = []
+    failures = []
+    requests = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def count(session, context, params):
+        REQUESTS.get()[0] += 1
+
+    tracing = aiohttp.TraceConfig()
+    tracing.on_request_start.append(count)
+    tracing.on_request_redirect.append(count)
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency), trace_configs=[tracing]
+    )
+    transport = AiohttpTransport(session)
+    clients = Clients(
+        RepositoryAccess(TOKEN, apiUrl=server.url, transport=transport),
+        Team(TOKEN, apiUrl=server.url, transport=transport),
+        CustomPropertyValues(TOKEN, apiUrl=server.url, transport=transport),
+    )
+
+    async def timed(index: int):
+        nonlocal requests
+        # Each call runs in its own task, and so counts its own requests.
+        sent = [0]
+        REQUESTS.set(sent)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                succeeded = await call(clients, names, index)
+            except Exception as error:
+                failures.append(f"{type(error).__name__}: {error}")
+                return
+            if succeeded:
+                latencies.append(time.perf_counter() - start)
+                requests += sent[0]
+            else:
+                failures.append("unsuccessful result")
+
+    try:
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(timed(index) for index in range(calls(size))))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if memory else 0
+    finally:
+        if memory:
+            tracemalloc.stop()
+        await session.close()
+        await server.stop()
+
+    latencies.sort()
+    total = calls(size)
+    return {
+        "scenario": scenario,
+        "size": size,
+        "calls": total,
+        "errors": len(failures),
+        "first_error": failures[0] if failures else None,
+        "requests": requests,
+        "seconds": elapsed,
+        "rps": requests / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "peak_memory": peak,
+    }
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """
+    Compares results against a baseline.
+    :param results: The current results.
+    :type results: List[Dict]
+    :param baseline: The baseline results.
+    :type baseline: List[Dict]
+    :param tolerance: The relative regression allowed.
+    :type tolerance: float
+    :return: The regressions found.
+    :rtype: List[str]
+    """
+    previous = {(entry["scenario"], entry["size"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        reference = previous.get((entry["scenario"], entry["size"]), None)
+        if reference is None:
+            continue
+        label = f"{entry['scenario']}@{entry['size']}"
+        if entry["errors"]:
+            regressions.append(f"{label}: {entry['errors']} failed calls")
+            continue
+        if entry["rps"] < reference["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: {entry['rps']:.0f} req/s < baseline {reference['rps']:.0f} req/s"
+            )
+        if entry["p95"] > reference["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: p95 {entry['p95'] * 1000:.2f} ms > baseline {reference['p95'] * 1000:.2f} ms"
+            )
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> List[Dict]:
+    results = []
+    print(
+        f"{'scenario':<20}{'size':>8}{'errors':>8}{'req/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MiB':>10}"
+    )
+    for size in args.sizes:
+        for scenario in args.scenarios:
+            entry = await run_scenario(
+                scenario,
+                size,
+                args.concurrency,
+                args.latency,
+                not args.no_memory,
+                args.error_rate,
+            )
+            results.append(entry)
+            print(
+                f"{scenario:<20}{size:>8}{entry['errors']:>8}{entry['rps']:>12.1f}"
+                f"{entry['p50'] * 1000:>10.2f}{entry['p95'] * 1000:>10.2f}"
+                f"{entry['p99'] * 1000:>10.2f}{entry['peak_memory'] / 2**20:>10.1f}"
+            )
+    return results
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    usage, description = __doc__.split("Usage:")[1].split("\n\n", 1)
+    parser = argparse.ArgumentParser(
+        usage=usage.strip(),
+        description=description.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[1, 100, 10000],
+    )
+    parser.add_argument(
+        "--scenarios",
+        type=lambda value: value.split(","),
+        default=list(SCENARIOS),
+    )
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+    unknown = [scenario for scenario in args.scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    results = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    failed = [entry for entry in results if entry["errors"]]
+    for entry in failed:
+        print(
+            f"ERRORS {entry['scenario']}@{entry['size']}: {entry['errors']} of"
+            f" {entry['calls']} calls failed, first: {entry['first_error']}",
+            file=sys.stderr,
+        )
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+    sys.exit(1 if failed or regressions else 0)
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -21,8 +21,100 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 __path__ = __import__("pkgutil").extend_path(__path__, __name__)
 
-from .repository import Repository
-from .team import Team
+import importlib
+from typing import TYPE_CHECKING
+
+# Public names, and the module defining each of them. They are imported on
+# first access (PEP 562), so that scripts needing only the Repository value
+# type don't pay for the network stack.
+_EXPORTS = {
+    "AiohttpTransport": ".aiohttp_transport",
+    "ArchiveDownload": ".archive_download",
+    "BlobStore": ".blob_store",
+    "Cassette": ".cassette",
+    "CustomPropertyUpdateError": ".custom_property_update_error",
+    "CustomPropertyValues": ".custom_property_values",
+    "FakeGithubServer": ".fake_github_server",
+    "GithubApiError": ".github_api_error",
+    "GithubClient": ".github_client",
+    "GithubMetrics": ".metrics",
+    "JsonArrayStream": ".json_array_stream",
+    "OrgScanner": ".org_scanner",
+    "OrgTeam": ".org_team",
+    "RecordingTransport": ".recording_transport",
+    "ReplayTransport": ".replay_transport",
+    "Repository": ".repository",
+    "RepositoryAccess": ".repository_access",
+    "RepositoryCache": ".repository_cache",
+    "RepositoryInventory": ".repository_inventory",
+    "RepositoryTree": ".repository_tree",
+    "SharedTokenBucket": ".shared_token_bucket",
+    "SyncClient": ".sync_client",
+    "Team": ".team",
+    "TeamAccessMatrix": ".team_access_matrix",
+    "TeamHierarchy": ".team_hierarchy",
+    "ThrottledTransport": ".throttled_transport",
+    "Transport": ".transport",
+    "TransportResponse": ".transport_response",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """
+    Imports a public name on first access.
+    :param name: The name.
+    :type name: str
+    :return: The class.
+    :rtype: type
+    """
+    module = _EXPORTS.get(name, None)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """
+    Lists the attributes of this package, including the not-yet-imported ones.
+    :return: Such attributes.
+    :rtype: List[str]
+    """
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .aiohttp_transport import AiohttpTransport
+    from .archive_download import ArchiveDownload
+    from .blob_store import BlobStore
+    from .cassette import Cassette
+    from .custom_property_update_error import CustomPropertyUpdateError
+    from .custom_property_values import CustomPropertyValues
+    from .fake_github_server import FakeGithubServer
+    from .github_api_error import GithubApiError
+    from .github_client import GithubClient
+    from .json_array_stream import JsonArrayStream
+    from .metrics import GithubMetrics
+    from .org_scanner import OrgScanner
+    from .org_team import OrgTeam
+    from .recording_transport import RecordingTransport
+    from .replay_transport import ReplayTransport
+    from .repository import Repository
+    from .repository_access import RepositoryAccess
+    from .repository_cache import RepositoryCache
+    from .repository_inventory import RepositoryInventory
+    from .repository_tree import RepositoryTree
+    from .shared_token_bucket import SharedTokenBucket
+    from .sync_client import SyncClient
+    from .team import Team
+    from .team_access_matrix import TeamAccessMatrix
+    from .team_hierarchy import TeamHierarchy
+    from .throttled_transport import ThrottledTransport
+    from .transport import Transport
+    from .transport_response import TransportResponse
 
 # vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
 # Local Variables:
@@ -0,0 +1,162 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/aiohttp_transport.py
+
+This file defines the AiohttpTransport class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from contextlib import asynccontextmanager
+from .transport import Transport
+from typing import Dict, Tuple, Type, TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    import aiohttp
+    from .metrics import GithubMetrics
+
+
+class AiohttpTransport(Transport):
+    """
+    Sends requests to the Github API over the network, using aiohttp.
+
+    Class name: AiohttpTransport
+
+    Responsibilities:
+        - Send requests through a given aiohttp session, or a short-lived one per request.
+        - Report the connections in use, against the limit of the pool, if asked to.
+
+    Collaborators:
+        - aiohttp.ClientSession: Sends the requests.
+        - pythoneda.shared.git.github.GithubMetrics: Optionally collects pool utilisation.
+        - pythoneda.shared.git.github.AiohttpTransportResponse: Wraps the responses.
+    """
+
+    def __init__(
+        self,
+        session: Union["aiohttp.ClientSession", None] = None,
+        metrics: Union["GithubMetrics", None] = None,
+        pool: str = "default",
+    ):
+        """
+        Creates a new AiohttpTransport instance.
+        :param session: The session to reuse. If None, each request opens its own.
+        :type session: Union[aiohttp.ClientSession, None]
+        :param metrics: The metrics to report the connection pool to, if any.
+        :type metrics: Union[pythoneda.shared.git.github.GithubMetrics, None]
+        :param pool: The name of the connection pool, in the metrics.
+        :type pool: str
+        """
+        super().__init__()
+        self._session = session
+        self._metrics = metrics
+        self._pool = pool
+        # Short-lived sessions currently open, one connection each.
+        self._sessions = 0
+
+    @property
+    def session(self) -> Union["aiohttp.ClientSession", None]:
+        """
+        Retrieves the shared session, if any.
+        :return: Such session.
+        :rtype: Union[aiohttp.ClientSession, None]
+        """
+        return self._session
+
+    @property
+    def transient_errors(self) -> Tuple[Type[BaseException], ...]:
+        """
+        Retrieves the errors of this transport worth retrying a request for.
+        :return: Such error types, including aiohttp's.
+        :rtype: Tuple[Type[BaseException], ...]
+        """
+        import aiohttp
+        import asyncio
+
+        return (aiohttp.ClientError, OSError, asyncio.TimeoutError)
+
+    def _observe_pool(self):
+        """
+        Reports the connections in use, against the limit of the pool, if
+        there are metrics.
+        """
+        if self._metrics is None:
+            return
+        if self._session is None:
+            # Short-lived sessions aren't pooled, so there's no limit.
+            self._metrics.observe_pool(self._pool, self._sessions, 0)
+        else:
+            connector = self._session.connector
+            # aiohttp only keeps the connections checked out in a private set.
+            in_use = len(getattr(connector, "_acquired", ()))
+            self._metrics.observe_pool(self._pool, in_use, connector.limit)
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Union[Dict[str, str], None] = None,
+        data: Union[bytes, None] = None,
+    ):
+        """
+        Sends a request.
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The url.
+        :type url: str
+        :param headers: The request headers.
+        :type headers: Union[Dict[str, str], None]
+        :param data: The request body.
+        :type data: Union[bytes, None]
+        :return: An async context manager yielding the response.
+        :rtype: AsyncContextManager[pythoneda.shared.git.github.TransportResponse]
+        """
+        # aiohttp is only imported when the first request is sent, so that
+        # importing this package stays cheap for callers not using the network.
+        import aiohttp
+        from .aiohttp_transport_response import AiohttpTransportResponse
+
+        if self._session is not None:
+            try:
+                async with self._session.request(
+                    method, url, headers=headers, data=data
+                ) as response:
+                    self._observe_pool()
+                    yield AiohttpTransportResponse(response)
+            finally:
+                self._observe_pool()
+        else:
+            self._sessions += 1
+            self._observe_pool()
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.request(
+                        method, url, headers=headers, data=data
+                    ) as response:
+                        yield AiohttpTransportResponse(response)
+            finally:
+                self._sessions -= 1
+                self._observe_pool()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
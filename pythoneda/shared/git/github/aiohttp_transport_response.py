@@ -0,0 +1,85 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/aiohttp_transport_response.py
+
+This file defines the AiohttpTransportResponse class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .transport_response import TransportResponse
+from multidict import CIMultiDictProxy
+from typing import AsyncIterator
+
+
+class AiohttpTransportResponse(TransportResponse):
+    """
+    A TransportResponse backed by a live aiohttp response.
+
+    Class name: AiohttpTransportResponse
+
+    Responsibilities:
+        - Read the body from the network only when asked to, either whole or in chunks.
+
+    Collaborators:
+        - aiohttp.ClientResponse: The underlying response.
+    """
+
+    def __init__(self, response):
+        """
+        Creates a new AiohttpTransportResponse instance.
+        :param response: The aiohttp response.
+        :type response: aiohttp.ClientResponse
+        """
+        super().__init__(response.status, (), b"", str(response.url))
+        self._response = response
+
+    @property
+    def headers(self) -> CIMultiDictProxy:
+        """
+        Retrieves the response headers, case-insensitively.
+        :return: Such headers.
+        :rtype: multidict.CIMultiDictProxy
+        """
+        return self._response.headers
+
+    async def read(self) -> bytes:
+        """
+        Retrieves the whole body.
+        :return: Such body.
+        :rtype: bytes
+        """
+        return await self._response.read()
+
+    async def iter_chunked(self, size: int = 65536) -> AsyncIterator[bytes]:
+        """
+        Iterates over the body in chunks, as they arrive from the network.
+        :param size: The maximum size of each chunk.
+        :type size: int
+        :return: The chunks.
+        :rtype: AsyncIterator[bytes]
+        """
+        async for chunk in self._response.content.iter_chunked(size):
+            yield chunk
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
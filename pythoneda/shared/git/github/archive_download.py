@@ -0,0 +1,368 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/archive_download.py
+
+This file defines the ArchiveDownload class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+from .github_client import GithubClient
+from .metrics import GithubMetrics
+import os
+from .repository import Repository
+import tarfile
+from .transport import Transport
+from typing import Dict, Iterable, Tuple, Union
+from urllib.parse import quote
+
+
+class ArchiveDownload(GithubClient):
+    """
+    Interacts with the /repos/[org]/[name]/tarball and zipball endpoints of github API.
+
+    Class name: ArchiveDownload
+
+    Responsibilities:
+        - Stream repository archives to disk, chunk by chunk.
+        - Resume interrupted transfers with Range requests.
+        - Cap the number of concurrent downloads, and their combined byte rate.
+        - Optionally extract tarballs while they download.
+
+    Collaborators:
+        - pythoneda.shared.git.github.GithubClient: Sends and tracks the requests.
+        - pythoneda.shared.git.github.Repository: The repositories to download.
+    """
+
+    ARCHIVES = ("tarball", "zipball")
+
+    def __init__(
+        self,
+        token: str,
+        metrics: Union[GithubMetrics, None] = None,
+        apiUrl: str = "https://api.github.com",
+        transport: Union[Transport, None] = None,
+        concurrency: int = 4,
+        bytesPerSecond: Union[int, None] = None,
+        chunkSize: int = 65536,
+    ):
+        """
+        Creates a new ArchiveDownload instance.
+        :param token: The Github token.
+        :type token: str
+        :param metrics: The metrics to report requests to, if any.
+        :type metrics: Union[pythoneda.shared.git.github.GithubMetrics, None]
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param transport: How to send requests. Defaults to the network, via aiohttp.
+        :type transport: Union[pythoneda.shared.git.github.Transport, None]
+        :param concurrency: The maximum number of archives downloaded at once.
+        :type concurrency: int
+        :param bytesPerSecond: The maximum combined rate of all downloads, if any.
+        :type bytesPerSecond: Union[int, None]
+        :param chunkSize: The size of the chunks read and written.
+        :type chunkSize: int
+        """
+        super().__init__(token, metrics, apiUrl, transport)
+        self._concurrency = concurrency
+        self._bytes_per_second = bytesPerSecond
+        self._chunk_size = chunkSize
+        # The time when the bytes already received would be within the rate.
+        self._available_at = 0.0
+
+    @property
+    def bytes_per_second(self) -> Union[int, None]:
+        """
+        Retrieves the maximum combined rate of all downloads.
+        :return: Such rate, if any.
+        :rtype: Union[int, None]
+        """
+        return self._bytes_per_second
+
+    async def _throttle(self, size: int):
+        """
+        Waits until receiving some bytes keeps all downloads within the byte rate.
+        :param size: The number of bytes received.
+        :type size: int
+        """
+        if not self._bytes_per_second:
+            return
+        now = asyncio.get_running_loop().time()
+        self._available_at = (
+            max(now, self._available_at) + size / self._bytes_per_second
+        )
+        delay = self._available_at - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _extract(source: int, folder: str):
+        """
+        Extracts a gzipped tarball read from a file descriptor, as it arrives.
+        :param source: The file descriptor.
+        :type source: int
+        :param folder: The folder to extract to.
+        :type folder: str
+        """
+        # The "data" filter rejects absolute paths and links leaving the folder.
+        options = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+        with os.fdopen(source, "rb") as stream:
+            with tarfile.open(fileobj=stream, mode="r|*") as archive:
+                archive.extractall(folder, **options)
+
+    @staticmethod
+    def _close(sink):
+        """
+        Closes the writing end of the extraction pipe.
+        :param sink: The writing end.
+        :type sink: io.BufferedWriter
+        """
+        with contextlib.suppress(BrokenPipeError):
+            sink.close()
+
+    async def _finish(
+        self,
+        sink,
+        writer: concurrent.futures.Executor,
+        extraction: asyncio.Future,
+        extractor: concurrent.futures.Executor,
+    ):
+        """
+        Closes the extraction pipe, after any write still running, and waits
+        for the extraction to end.
+        :param sink: The writing end of the pipe.
+        :type sink: io.BufferedWriter
+        :param writer: The executor writing to the pipe.
+        :type writer: concurrent.futures.Executor
+        :param extraction: The extraction.
+        :type extraction: asyncio.Future
+        :param extractor: The executor running the extraction.
+        :type extractor: concurrent.futures.Executor
+        """
+        try:
+            await asyncio.get_running_loop().run_in_executor(writer, self._close, sink)
+            await extraction
+        finally:
+            writer.shutdown(wait=False)
+            extractor.shutdown(wait=False)
+
+    async def _attempt(
+        self,
+        repository: Repository,
+        path: str,
+        ref: str,
+        archive: str,
+        extractTo: Union[str, None],
+    ) -> bool:
+        """
+        Downloads an archive, resuming from any partial file left behind.
+        :param repository: The repository.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param path: The archive file.
+        :type path: str
+        :param ref: The branch, tag or commit, or empty for the default branch.
+        :type ref: str
+        :param archive: Either "tarball" or "zipball".
+        :type archive: str
+        :param extractTo: The folder to extract the tarball to, if any.
+        :type extractTo: Union[str, None]
+        :return: True if the archive is complete.
+        :rtype: bool
+        :raise ConnectionError: If Github answers with bytes other than the
+        missing ones. The partial file is discarded, so a retry starts over.
+        """
+        partial = f"{path}.part"
+        # The ETag of the partial file, so a resumed transfer can't splice two archives.
+        validator = f"{partial}.etag"
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        etag = None
+        if offset and os.path.exists(validator):
+            with open(validator, "r", encoding="utf-8") as source:
+                etag = source.read().strip() or None
+        headers = {"Authorization": f"token {self.token}"}
+        if etag is not None:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = etag
+        url = f"{self.api_url}/repos/{repository.org}/{repository.name}/{archive}"
+        if ref:
+            url = f"{url}/{quote(ref)}"
+
+        loop = asyncio.get_running_loop()
+        async with self._track(
+            "GET", f"/repos/{{org}}/{{name}}/{archive}/{{ref}}"
+        ) as observe:
+            async with self.transport.request("GET", url, headers) as response:
+                observe(response.status, response.headers)
+                if response.status in (206, 416) and etag is not None:
+                    # Either the missing bytes, or none if the partial file was
+                    # already complete. Anything else can't be spliced.
+                    content_range = response.headers.get("Content-Range", "")
+                    if response.status == 206:
+                        expected = f"bytes {offset}-"
+                        mode = "ab"
+                    else:
+                        expected = f"bytes */{offset}"
+                        mode = None
+                    if not content_range.startswith(expected):
+                        for stale in (partial, validator):
+                            with contextlib.suppress(FileNotFoundError):
+                                os.unlink(stale)
+                        raise ConnectionError(
+                            f"Expected {expected}..., got {content_range or 'nothing'}"
+                        )
+                elif response.status == 200:
+                    mode = "wb"
+                    with open(validator, "w", encoding="utf-8") as output:
+                        output.write(response.headers.get("ETag", ""))
+                else:
+                    return False
+
+                sink = None
+                extraction = None
+                if extractTo is not None:
+                    # Extraction always starts from the first byte of the archive,
+                    # so a resumed transfer replays the partial file first.
+                    # Both the extraction and the writes feeding it block, so each
+                    # gets its own thread, never one of the loop's shared executor.
+                    source, target = os.pipe()
+                    sink = os.fdopen(target, "wb")
+                    extractor = concurrent.futures.ThreadPoolExecutor(
+                        1, thread_name_prefix="archive-extract"
+                    )
+                    writer = concurrent.futures.ThreadPoolExecutor(
+                        1, thread_name_prefix="archive-write"
+                    )
+                    extraction = loop.run_in_executor(
+                        extractor, self._extract, source, extractTo
+                    )
+                try:
+                    if sink is not None and mode != "wb":
+                        with open(partial, "rb") as previous:
+                            for chunk in iter(
+                                lambda: previous.read(self._chunk_size), b""
+                            ):
+                                await loop.run_in_executor(writer, sink.write, chunk)
+                    if mode is not None:
+                        with open(partial, mode) as output:
+                            async for chunk in response.iter_chunked(self._chunk_size):
+                                output.write(chunk)
+                                if sink is not None:
+                                    await loop.run_in_executor(
+                                        writer, sink.write, chunk
+                                    )
+                                await self._throttle(len(chunk))
+                except BrokenPipeError:
+                    # The extraction failed; its own error is raised below.
+                    pass
+                except BaseException:
+                    if sink is not None:
+                        # Let the extraction see the end of its input and stop.
+                        with contextlib.suppress(Exception):
+                            await self._finish(sink, writer, extraction, extractor)
+                    raise
+                if sink is not None:
+                    await self._finish(sink, writer, extraction, extractor)
+
+        os.replace(partial, path)
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(validator)
+        return True
+
+    async def download(
+        self,
+        repository: Repository,
+        path: str,
+        ref: str = "",
+        archive: str = "tarball",
+        extractTo: Union[str, None] = None,
+        retries: int = 3,
+    ) -> bool:
+        """
+        Downloads the archive of a repository to a file, without holding it in
+        memory. An interrupted transfer is resumed from the bytes already on disk,
+        both within this call and across calls.
+        :param repository: The repository.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param path: The archive file. Bytes are written to [path].part until complete.
+        :type path: str
+        :param ref: The branch, tag or commit, or empty for the default branch.
+        :type ref: str
+        :param archive: Either "tarball" or "zipball".
+        :type archive: str
+        :param extractTo: The folder to extract the archive to while it
+        downloads, if any. Only tarballs can be extracted as a stream.
+        :type extractTo: Union[str, None]
+        :param retries: How many times to resume a broken transfer.
+        :type retries: int
+        :return: True if the archive was downloaded.
+        :rtype: bool
+        """
+        if archive not in self.ARCHIVES:
+            raise ValueError(f"Unsupported archive: {archive}")
+        if extractTo is not None and archive != "tarball":
+            raise ValueError("Only tarballs can be extracted while downloading")
+        transient = self.transport.transient_errors
+
+        async with self._semaphore(self._concurrency):
+            for attempt in range(retries + 1):
+                try:
+                    return await self._attempt(
+                        repository, path, ref, archive, extractTo
+                    )
+                except transient:
+                    if attempt == retries:
+                        raise
+        return False
+
+    async def download_many(
+        self,
+        downloads: Iterable[Tuple[Repository, str]],
+        ref: str = "",
+        archive: str = "tarball",
+    ) -> Dict[str, bool]:
+        """
+        Downloads the archives of many repositories, within the concurrency and
+        byte-rate caps.
+        :param downloads: Tuples of repository and archive file.
+        :type downloads: Iterable[Tuple[pythoneda.shared.git.github.Repository, str]]
+        :param ref: The branch, tag or commit, or empty for the default branch.
+        :type ref: str
+        :param archive: Either "tarball" or "zipball".
+        :type archive: str
+        :return: Whether each archive was downloaded, by file.
+        :rtype: Dict[str, bool]
+        """
+        downloads = list(downloads)
+        results = await asyncio.gather(
+            *[
+                self.download(repository, path, ref, archive)
+                for repository, path in downloads
+            ],
+            return_exceptions=True,
+        )
+        return {path: result is True for (_, path), result in zip(downloads, results)}
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,158 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/blob_store.py
+
+This file defines the BlobStore class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import hashlib
+import os
+from pythoneda.shared import BaseObject
+import tempfile
+from typing import Union
+
+
+class BlobStore(BaseObject):
+    """
+    On-disk store of git blobs, addressed by their sha.
+
+    Class name: BlobStore
+
+    Responsibilities:
+        - Keep each distinct file contents once, no matter how many repositories share it.
+        - Check contents against their sha before storing them, and when reading them back.
+
+    Collaborators:
+        - None
+    """
+
+    def __init__(self, path: str):
+        """
+        Creates a new BlobStore instance.
+        :param path: The root folder of the store. It's created if needed.
+        :type path: str
+        """
+        super().__init__()
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def path(self) -> str:
+        """
+        Retrieves the root folder of the store.
+        :return: Such folder.
+        :rtype: str
+        """
+        return self._path
+
+    @staticmethod
+    def sha_of(content: bytes) -> str:
+        """
+        Computes the git blob sha of some contents.
+        :param content: The contents.
+        :type content: bytes
+        :return: The sha, as git computes it.
+        :rtype: str
+        """
+        return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+    def path_of(self, sha: str) -> str:
+        """
+        Retrieves the file a blob is stored in, fanned out by its first two hex digits.
+        :param sha: The blob sha.
+        :type sha: str
+        :return: The path of the file.
+        :rtype: str
+        """
+        return os.path.join(self._path, sha[:2], sha[2:])
+
+    def __contains__(self, sha: str) -> bool:
+        return os.path.exists(self.path_of(sha))
+
+    def get(self, sha: str) -> Union[bytes, None]:
+        """
+        Retrieves a blob. A stored file whose contents no longer match its sha
+        is discarded, as if it had never been stored.
+        :param sha: The blob sha.
+        :type sha: str
+        :return: The contents, if stored and intact.
+        :rtype: Union[bytes, None]
+        """
+        path = self.path_of(sha)
+        try:
+            with open(path, "rb") as source:
+                content = source.read()
+        except FileNotFoundError:
+            return None
+        if self.sha_of(content) != sha:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            return None
+        return content
+
+    def verify(self, sha: str) -> bool:
+        """
+        Checks whether a blob is stored intact, discarding it otherwise.
+        :param sha: The blob sha.
+        :type sha: str
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self.get(sha) is not None
+
+    def put(self, content: bytes, sha: Union[str, None] = None) -> str:
+        """
+        Stores a blob, unless it's already there intact. A stored file whose
+        contents changed is rewritten.
+        :param content: The contents.
+        :type content: bytes
+        :param sha: The expected sha, if known.
+        :type sha: Union[str, None]
+        :return: The blob sha.
+        :rtype: str
+        """
+        actual = self.sha_of(content)
+        if sha is not None and sha != actual:
+            raise ValueError(f"Blob {sha} has sha {actual}")
+        if self.verify(actual):
+            return actual
+        target = self.path_of(actual)
+        folder = os.path.dirname(target)
+        os.makedirs(folder, exist_ok=True)
+        # Write aside and rename, so concurrent readers never see a partial blob.
+        descriptor, temporary = tempfile.mkstemp(dir=folder, prefix=".tmp-")
+        try:
+            with os.fdopen(descriptor, "wb") as output:
+                output.write(content)
+            os.replace(temporary, target)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+        return actual
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,221 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/cassette.py
+
+This file defines the Cassette class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import base64
+import gzip
+import hashlib
+import json
+from pythoneda.shared import BaseObject
+from typing import Dict, Iterable, Iterator, Tuple, Union
+from urllib.parse import urlsplit
+
+
+class Cassette(BaseObject):
+    """
+    A compact file of recorded HTTP request/response pairs.
+
+    Class name: Cassette
+
+    Responsibilities:
+        - Append recorded exchanges as gzip-compressed, newline-delimited JSON.
+        - Read them back, one at a time.
+        - Build the key used to match requests with recorded responses.
+
+    Collaborators:
+        - pythoneda.shared.git.github.RecordingTransport: Writes cassettes.
+        - pythoneda.shared.git.github.ReplayTransport: Reads cassettes.
+    """
+
+    # Request headers never written to disk.
+    REDACTED_HEADERS = frozenset(["authorization", "cookie", "proxy-authorization"])
+
+    # Request headers that change the response, so they're part of the key:
+    # a conditional request can be answered with a 304 instead of a 200.
+    MATCHED_HEADERS = ("if-none-match", "if-range", "range")
+
+    def __init__(self, path: str):
+        """
+        Creates a new Cassette instance.
+        :param path: The path of the cassette file.
+        :type path: str
+        """
+        super().__init__()
+        self._path = path
+        self._writer = None
+
+    @property
+    def path(self) -> str:
+        """
+        Retrieves the path of the cassette file.
+        :return: Such path.
+        :rtype: str
+        """
+        return self._path
+
+    @classmethod
+    def key(
+        cls,
+        method: str,
+        url: str,
+        data: Union[bytes, None] = None,
+        headers: Union[Dict[str, str], None] = None,
+    ) -> Tuple[str, str, str, str]:
+        """
+        Builds the key identifying a request, regardless of the API host.
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The url.
+        :type url: str
+        :param data: The request body.
+        :type data: Union[bytes, None]
+        :param headers: The request headers.
+        :type headers: Union[Dict[str, str], None]
+        :return: The method, the path and query, a digest of the body, and the
+        headers in MATCHED_HEADERS.
+        :rtype: Tuple[str, str, str, str]
+        """
+        parts = urlsplit(url)
+        target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        digest = hashlib.sha1(data).hexdigest()[:16] if data else ""
+        conditions = ""
+        if headers:
+            matched = {
+                name.lower(): value
+                for name, value in headers.items()
+                if name.lower() in cls.MATCHED_HEADERS
+            }
+            conditions = "\n".join(
+                f"{name}: {matched[name]}"
+                for name in cls.MATCHED_HEADERS
+                if name in matched
+            )
+        return (method.upper(), target, digest, conditions)
+
+    @staticmethod
+    def key_of(entry: Dict) -> Tuple[str, str, str, str]:
+        """
+        Retrieves the key of a recorded exchange.
+        :param entry: The exchange, as decoded.
+        :type entry: Dict
+        :return: The key, as built by key().
+        :rtype: Tuple[str, str, str, str]
+        """
+        return (entry["m"], entry["u"], entry["d"], entry.get("c", ""))
+
+    def append(
+        self,
+        method: str,
+        url: str,
+        requestHeaders: Union[Dict[str, str], None],
+        data: Union[bytes, None],
+        status: int,
+        headers: Iterable[Tuple[str, str]],
+        body: bytes,
+        latency: float,
+    ):
+        """
+        Records an exchange.
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The url.
+        :type url: str
+        :param requestHeaders: The request headers. Credentials are not recorded.
+        :type requestHeaders: Union[Dict[str, str], None]
+        :param data: The request body.
+        :type data: Union[bytes, None]
+        :param status: The HTTP status.
+        :type status: int
+        :param headers: The response headers.
+        :type headers: Iterable[Tuple[str, str]]
+        :param body: The response body.
+        :type body: bytes
+        :param latency: The time it took to get the whole response, in seconds.
+        :type latency: float
+        """
+        method, target, digest, conditions = self.key(method, url, data, requestHeaders)
+        entry = {
+            "m": method,
+            "u": target,
+            "d": digest,
+            "q": [
+                [name, value]
+                for name, value in (requestHeaders or {}).items()
+                if name.lower() not in self.REDACTED_HEADERS
+            ],
+            "s": status,
+            "h": [[name, value] for name, value in headers],
+            "l": round(latency, 6),
+        }
+        if conditions:
+            entry["c"] = conditions
+        try:
+            entry["b"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["x"] = base64.b64encode(body).decode("ascii")
+        if self._writer is None:
+            self._writer = gzip.open(self._path, "at", encoding="utf-8")
+        self._writer.write(json.dumps(entry, separators=(",", ":")))
+        self._writer.write("\n")
+
+    def close(self):
+        """
+        Flushes and closes the cassette, if it was being written.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def lines(self) -> Iterator[str]:
+        """
+        Iterates over the raw recorded exchanges.
+        :return: The JSON lines.
+        :rtype: Iterator[str]
+        """
+        with gzip.open(self._path, "rt", encoding="utf-8") as reader:
+            for line in reader:
+                if line.strip():
+                    yield line
+
+    @staticmethod
+    def decode(line: str) -> Dict:
+        """
+        Decodes a recorded exchange.
+        :param line: The JSON line.
+        :type line: str
+        :return: The exchange, with the response body as "body" bytes.
+        :rtype: Dict
+        """
+        entry = json.loads(line)
+        if "x" in entry:
+            entry["body"] = base64.b64decode(entry.pop("x"))
+        else:
+            entry["body"] = entry.pop("b", "").encode("utf-8")
+        return entry
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
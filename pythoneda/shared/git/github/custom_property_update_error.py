@@ -0,0 +1,78 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/custom_property_update_error.py
+
+This file defines the CustomPropertyUpdateError class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from typing import Dict, List, Tuple, Union
+
+
+class CustomPropertyUpdateError(Exception):
+    """
+    A bulk update of custom property values some of whose batches failed.
+
+    Class name: CustomPropertyUpdateError
+
+    Responsibilities:
+        - Tell callers which repositories were updated, and which weren't and why.
+
+    Collaborators:
+        - pythoneda.shared.git.github.CustomPropertyValues: Raises it.
+    """
+
+    def __init__(self, results: List[Tuple[List[str], Dict, Union[Exception, None]]]):
+        """
+        Creates a new CustomPropertyUpdateError instance.
+        :param results: The repository names of each batch, its changes, and
+        its error, or None if it succeeded.
+        :type results: List[Tuple[List[str], Dict, Union[Exception, None]]]
+        """
+        failed = [error for _, _, error in results if error is not None]
+        super().__init__(
+            f"{len(failed)} of {len(results)} custom property updates failed: {failed[0]}"
+        )
+        self._results = results
+
+    @property
+    def results(self) -> List[Tuple[List[str], Dict, Union[Exception, None]]]:
+        """
+        Retrieves the result of each batch.
+        :return: The repository names of each batch, its changes, and its
+        error, or None if it succeeded.
+        :rtype: List[Tuple[List[str], Dict, Union[Exception, None]]]
+        """
+        return self._results
+
+    @property
+    def failed(self) -> List[str]:
+        """
+        Retrieves the repositories that weren't updated.
+        :return: Their names.
+        :rtype: List[str]
+        """
+        return [name for names, _, error in self._results if error for name in names]
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
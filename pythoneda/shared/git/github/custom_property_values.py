@@ -0,0 +1,229 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/custom_property_values.py
+
+This file defines the CustomPropertyValues class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from .custom_property_update_error import CustomPropertyUpdateError
+from .github_api_error import GithubApiError
+from .github_client import GithubClient
+import json
+from .metrics import GithubMetrics
+from .transport import Transport
+from typing import AsyncIterator, Dict, Iterable, List, Tuple, Union
+from urllib.parse import quote
+
+
+class CustomPropertyValues(GithubClient):
+    """
+    Interacts with the /orgs/[org]/properties/values endpoint of github API.
+
+    Class name: CustomPropertyValues
+
+    Responsibilities:
+        - Read the custom property values of all repositories of an organization.
+        - Change them in bulk, with as few requests as possible.
+
+    Collaborators:
+        - pythoneda.shared.git.github.CustomPropertyUpdateError: Reports failed updates.
+        - pythoneda.shared.git.github.GithubClient: Sends and tracks the requests.
+    """
+
+    # The maximum number of repositories Github accepts in a single update.
+    MAX_REPOSITORIES = 30
+
+    def __init__(
+        self,
+        token: str,
+        metrics: Union[GithubMetrics, None] = None,
+        apiUrl: str = "https://api.github.com",
+        transport: Union[Transport, None] = None,
+    ):
+        """
+        Creates a new CustomPropertyValues instance.
+        :param token: The Github token.
+        :type token: str
+        :param metrics: The metrics to report requests to, if any.
+        :type metrics: Union[pythoneda.shared.git.github.GithubMetrics, None]
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param transport: How to send requests. Defaults to the network, via aiohttp.
+        :type transport: Union[pythoneda.shared.git.github.Transport, None]
+        """
+        super().__init__(token, metrics, apiUrl, transport)
+
+    async def stream(
+        self, org: str, perPage: int = 100, query: Union[str, None] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Retrieves the custom property values of all repositories of an
+        organization, following pagination.
+        :param org: The organization name.
+        :type org: str
+        :param perPage: The number of repositories per page (at most 100).
+        :type perPage: int
+        :param query: A repository search query to narrow the results, if any.
+        :type query: Union[str, None]
+        :return: Tuples of repository name and its property values, by property name.
+        :rtype: AsyncIterator[Tuple[str, Dict]]
+        :raise GithubApiError: If any page can't be retrieved.
+        """
+        headers = {"Authorization": f"token {self.token}"}
+        url = f"{self.api_url}/orgs/{org}/properties/values?per_page={perPage}"
+        if query:
+            url = f"{url}&repository_query={quote(query)}"
+        async for item in self._items(url, "/orgs/{org}/properties/values", headers):
+            yield item["repository_name"], {
+                value["property_name"]: value["value"]
+                for value in item.get("properties", None) or []
+            }
+
+    async def read(self, org: str) -> Dict[str, Dict]:
+        """
+        Retrieves the custom property values of all repositories of an organization.
+        :param org: The organization name.
+        :type org: str
+        :return: The property values, by property name, by repository name.
+        :rtype: Dict[str, Dict]
+        :raise GithubApiError: If any page can't be retrieved.
+        """
+        return {name: values async for name, values in self.stream(org)}
+
+    @classmethod
+    def batches(cls, changes: Dict[str, Dict]) -> List[Tuple[List[str], Dict]]:
+        """
+        Groups the repositories sharing the same changes, in batches Github
+        accepts in a single request.
+        :param changes: The new property values (None to unset), by property
+        name, by repository name.
+        :type changes: Dict[str, Dict]
+        :return: Tuples of repository names and the changes to apply to all of them.
+        :rtype: List[Tuple[List[str], Dict]]
+        """
+        groups = {}
+        for name, properties in changes.items():
+            if not properties:
+                continue
+            # Multi-select values are lists, so compare the canonical JSON instead.
+            key = json.dumps(properties, sort_keys=True)
+            groups.setdefault(key, (properties, []))[1].append(name)
+        result = []
+        for properties, names in groups.values():
+            for start in range(0, len(names), cls.MAX_REPOSITORIES):
+                result.append((names[start : start + cls.MAX_REPOSITORIES], properties))
+        return result
+
+    async def _update(self, org: str, names: List[str], properties: Dict):
+        """
+        Sends a single update.
+        :param org: The organization name.
+        :type org: str
+        :param names: The repository names, at most MAX_REPOSITORIES.
+        :type names: List[str]
+        :param properties: The new property values, by property name.
+        :type properties: Dict
+        :raise GithubApiError: If Github rejects the update.
+        """
+        headers = {
+            "Authorization": f"token {self.token}",
+            "Content-Type": "application/json",
+        }
+        url = f"{self.api_url}/orgs/{org}/properties/values"
+        data = {
+            "repository_names": names,
+            "properties": [
+                {"property_name": name, "value": value}
+                for name, value in properties.items()
+            ],
+        }
+        async with self._track("PATCH", "/orgs/{org}/properties/values") as observe:
+            async with self.transport.request(
+                "PATCH", url, headers, json.dumps(data).encode("utf-8")
+            ) as response:
+                observe(response.status, response.headers)
+                if response.status != 204:
+                    raise await GithubApiError.from_response("PATCH", url, response)
+
+    async def update(
+        self, org: str, changes: Dict[str, Dict], concurrency: int = 4
+    ) -> List[Tuple[List[str], Dict]]:
+        """
+        Changes the custom property values of many repositories. Repositories
+        sharing the same changes are updated together, up to MAX_REPOSITORIES
+        per request, and up to [concurrency] requests are sent at once.
+        Every batch is sent, even if some of them fail.
+        :param org: The organization name.
+        :type org: str
+        :param changes: The new property values (None to unset), by property
+        name, by repository name.
+        :type changes: Dict[str, Dict]
+        :param concurrency: The maximum number of concurrent requests.
+        :type concurrency: int
+        :return: Tuples of the repository names of each batch and its changes.
+        :rtype: List[Tuple[List[str], Dict]]
+        :raise CustomPropertyUpdateError: If any batch fails, with the result of each one.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        batches = self.batches(changes)
+
+        async def send(names: List[str], properties: Dict):
+            async with semaphore:
+                await self._update(org, names, properties)
+
+        errors = await asyncio.gather(
+            *[send(names, properties) for names, properties in batches],
+            return_exceptions=True,
+        )
+        if any(error is not None for error in errors):
+            raise CustomPropertyUpdateError(
+                [
+                    (names, properties, error)
+                    for (names, properties), error in zip(batches, errors)
+                ]
+            )
+        return batches
+
+    async def set(
+        self, org: str, names: Iterable[str], properties: Dict, concurrency: int = 4
+    ) -> List[Tuple[List[str], Dict]]:
+        """
+        Sets the same custom property values on many repositories.
+        :param org: The organization name.
+        :type org: str
+        :param names: The repository names.
+        :type names: Iterable[str]
+        :param properties: The new property values (None to unset), by property name.
+        :type properties: Dict
+        :param concurrency: The maximum number of concurrent requests.
+        :type concurrency: int
+        :return: Tuples of the repository names of each batch and its changes.
+        :rtype: List[Tuple[List[str], Dict]]
+        :raise CustomPropertyUpdateError: If any batch fails, with the result of each one.
+        """
+        return await self.update(org, {name: properties for name in names}, concurrency)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
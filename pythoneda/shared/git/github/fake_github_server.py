@@ -0,0 +1,947 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/fake_github_server.py
+
+This file defines the FakeGithubServer class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from aiohttp import web
+import asyncio
+import base64
+import gzip
+import hashlib
+import io
+import json
+from pythoneda.shared import BaseObject
+import random
+import socket
+import tarfile
+import time
+from typing import AsyncIterator, Dict, List, Union
+import zipfile
+
+
+class FakeGithubServer(BaseObject):
+    """
+    In-process stand-in for the subset of the Github REST API this package uses.
+
+    Class name: FakeGithubServer
+
+    Responsibilities:
+        - Serve repos get/create/patch, org repository listing, teams, team repositories and custom property values, with pagination.
+        - Serve git trees and blobs of the files added to repositories, and their tarballs and zipballs, honouring Range.
+        - Emit ETags (honouring If-None-Match), rate-limit headers and 301 redirects for renamed repositories.
+        - Inject latency, slow bodies and errors on demand, to exercise clients offline.
+
+    Collaborators:
+        - aiohttp.web: Serves the requests.
+    """
+
+    REPOSITORY_FIELDS = (
+        "description",
+        "homepage",
+        "private",
+        "visibility",
+        "has_issues",
+        "has_wiki",
+        "has_downloads",
+        "has_projects",
+        "team_id",
+        "auto_init",
+        "license_template",
+        "gitignore_template",
+        "allow_squash_merge",
+        "allow_merge_commit",
+        "allow_rebase_merge",
+        "allow_auto_merge",
+        "delete_branch_on_merge",
+        "use_squash_pr_title_as_default",
+        "squash_merge_commit_title",
+        "squash_merge_commit_message",
+        "merge_commit_title",
+        "merge_commit_message",
+        "custom_properties",
+    )
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        errorRate: float = 0.0,
+        rateLimit: int = 5000,
+        token: Union[str, None] = None,
+        seed: Union[int, None] = None,
+        treeLimit: int = 100000,
+        chunkLatency: float = 0.0,
+        chunkSize: int = 4096,
+    ):
+        """
+        Creates a new FakeGithubServer instance.
+        :param latency: The delay added to every response, in seconds.
+        :type latency: float
+        :param jitter: The maximum random delay added on top of the latency, in seconds.
+        :type jitter: float
+        :param errorRate: The probability of answering any request with a 500 error.
+        :type errorRate: float
+        :param rateLimit: The rate budget per token and window.
+        :type rateLimit: int
+        :param token: The only token accepted, if any. Otherwise, any token is accepted.
+        :type token: Union[str, None]
+        :param seed: The seed for the random latency and error injection.
+        :type seed: Union[int, None]
+        :param treeLimit: The number of entries beyond which trees are truncated.
+        :type treeLimit: int
+        :param chunkLatency: The delay between chunks of JSON response bodies, in seconds.
+        :type chunkLatency: float
+        :param chunkSize: The size of such chunks, in bytes.
+        :type chunkSize: int
+        """
+        super().__init__()
+        self._latency = latency
+        self._jitter = jitter
+        self._error_rate = errorRate
+        self._rate_limit = rateLimit
+        self._token = token
+        self._random = random.Random(seed)
+        self._tree_limit = treeLimit
+        self._chunk_latency = chunkLatency
+        self._chunk_size = chunkSize
+        # org -> name -> payload
+        self._repositories = {}
+        # id -> (org, name)
+        self._repositories_by_id = {}
+        # (org, old name) -> id
+        self._renames = {}
+        # org -> list of team payloads
+        self._teams = {}
+        # (org, team slug) -> repository id -> role name
+        self._grants = {}
+        # repository id -> path -> blob sha
+        self._files = {}
+        # blob sha -> content
+        self._blobs = {}
+        # token -> [remaining, reset]
+        self._budgets = {}
+        # list of pending (status, message) failures
+        self._failures = []
+        self._next_id = 1
+        self._request_count = 0
+        self._runner = None
+        self._url = None
+
+    @property
+    def url(self) -> Union[str, None]:
+        """
+        Retrieves the base url of the running server.
+        :return: Such url, or None if not started.
+        :rtype: Union[str, None]
+        """
+        return self._url
+
+    @property
+    def request_count(self) -> int:
+        """
+        Retrieves the number of requests served so far.
+        :return: Such count.
+        :rtype: int
+        """
+        return self._request_count
+
+    @property
+    def latency(self) -> float:
+        """
+        Retrieves the injected latency.
+        :return: Such latency, in seconds.
+        :rtype: float
+        """
+        return self._latency
+
+    @latency.setter
+    def latency(self, value: float):
+        """
+        Changes the injected latency.
+        :param value: The new latency, in seconds.
+        :type value: float
+        """
+        self._latency = value
+
+    @property
+    def error_rate(self) -> float:
+        """
+        Retrieves the probability of injected 500 errors.
+        :return: Such probability.
+        :rtype: float
+        """
+        return self._error_rate
+
+    @error_rate.setter
+    def error_rate(self, value: float):
+        """
+        Changes the probability of injected 500 errors.
+        :param value: The new probability.
+        :type value: float
+        """
+        self._error_rate = value
+
+    def fail_next(self, count: int = 1, status: int = 500, message: str = "Injected"):
+        """
+        Makes the next requests fail.
+        :param count: How many requests should fail.
+        :type count: int
+        :param status: The HTTP status of the failures.
+        :type status: int
+        :param message: The error message.
+        :type message: str
+        """
+        self._failures.extend([(status, message)] * count)
+
+    def add_repository(self, org: str, name: str, **fields) -> Dict:
+        """
+        Adds a repository.
+        :param org: The organization.
+        :type org: str
+        :param name: The repository name.
+        :type name: str
+        :param fields: Any Github repository fields, in snake_case.
+        :type fields: Dict
+        :return: The repository payload.
+        :rtype: Dict
+        """
+        repository_id = self._next_id
+        self._next_id += 1
+        payload = {
+            "id": repository_id,
+            "node_id": f"R_{repository_id}",
+            "name": name,
+            "full_name": f"{org}/{name}",
+            "owner": {"login": org, "type": "Organization"},
+            "html_url": f"https://github.com/{org}/{name}",
+            "description": None,
+            "homepage": None,
+            "private": False,
+            "visibility": "public",
+            "has_issues": True,
+            "has_wiki": True,
+            "has_downloads": True,
+            "has_projects": True,
+            "allow_squash_merge": True,
+            "allow_merge_commit": True,
+            "allow_rebase_merge": True,
+            "allow_auto_merge": False,
+            "delete_branch_on_merge": False,
+            "use_squash_pr_title_as_default": False,
+            "squash_merge_commit_title": "COMMIT_OR_PR_TITLE",
+            "squash_merge_commit_message": "COMMIT_MESSAGES",
+            "merge_commit_title": "MERGE_MESSAGE",
+            "merge_commit_message": "PR_TITLE",
+            "custom_properties": {},
+            "default_branch": "main",
+        }
+        payload.update(fields)
+        self._repositories.setdefault(org, {})[name] = payload
+        self._repositories_by_id[repository_id] = (org, name)
+        return payload
+
+    def populate(self, org: str, count: int, prefix: str = "repo") -> List[str]:
+        """
+        Adds many repositories at once.
+        :param org: The organization.
+        :type org: str
+        :param count: How many repositories to add.
+        :type count: int
+        :param prefix: The prefix of their names.
+        :type prefix: str
+        :return: The names of the new repositories.
+        :rtype: List[str]
+        """
+        names = [f"{prefix}-{index:06d}" for index in range(count)]
+        for name in names:
+            self.add_repository(
+                org, name, description=f"Repository {name}", homepage=""
+            )
+        return names
+
+    def add_team(
+        self,
+        org: str,
+        name: str,
+        slug: Union[str, None] = None,
+        parent: Union[str, None] = None,
+        **fields,
+    ) -> Dict:
+        """
+        Adds a team.
+        :param org: The organization.
+        :type org: str
+        :param name: The team name.
+        :type name: str
+        :param slug: The team slug. Defaults to the lower-cased name.
+        :type slug: Union[str, None]
+        :param parent: The slug of the parent team, if any.
+        :type parent: Union[str, None]
+        :param fields: Any other Github team fields.
+        :type fields: Dict
+        :return: The team payload.
+        :rtype: Dict
+        """
+        team_id = self._next_id
+        self._next_id += 1
+        slug = slug or name.lower().replace(" ", "-")
+        teams = self._teams.setdefault(org, [])
+        parent_payload = None
+        if parent is not None:
+            parent_payload = next(
+                (
+                    {"id": team["id"], "slug": team["slug"], "name": team["name"]}
+                    for team in teams
+                    if team["slug"] == parent
+                ),
+                None,
+            )
+        payload = {
+            "id": team_id,
+            "node_id": f"T_{team_id}",
+            "name": name,
+            "slug": slug,
+            "description": "",
+            "privacy": "closed",
+            "permission": "pull",
+            "parent": parent_payload,
+        }
+        payload.update(fields)
+        teams.append(payload)
+        return payload
+
+    def grant(self, org: str, slug: str, name: str, permission: str = "push"):
+        """
+        Grants a team access to a repository, replacing any previous grant.
+        :param org: The organization.
+        :type org: str
+        :param slug: The team slug.
+        :type slug: str
+        :param name: The repository name.
+        :type name: str
+        :param permission: The role: pull, triage, push, maintain, admin, or a custom one.
+        :type permission: str
+        """
+        payload = self.repository(org, name)
+        if payload is None:
+            raise KeyError(f"{org}/{name}")
+        self._grants.setdefault((org, slug), {})[payload["id"]] = permission
+
+    def revoke(self, org: str, slug: str, name: str):
+        """
+        Revokes the access of a team to a repository.
+        :param org: The organization.
+        :type org: str
+        :param slug: The team slug.
+        :type slug: str
+        :param name: The repository name.
+        :type name: str
+        """
+        payload = self.repository(org, name)
+        if payload is not None:
+            self._grants.get((org, slug), {}).pop(payload["id"], None)
+
+    def add_file(self, org: str, name: str, path: str, content: bytes) -> str:
+        """
+        Adds a file to a repository, replacing any previous one at the same path.
+        :param org: The organization.
+        :type org: str
+        :param name: The repository name.
+        :type name: str
+        :param path: The path of the file.
+        :type path: str
+        :param content: The file contents.
+        :type content: bytes
+        :return: The git blob sha.
+        :rtype: str
+        """
+        payload = self.repository(org, name)
+        if payload is None:
+            raise KeyError(f"{org}/{name}")
+        sha = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+        self._blobs[sha] = content
+        self._files.setdefault(payload["id"], {})[path] = sha
+        return sha
+
+    def repository(self, org: str, name: str) -> Union[Dict, None]:
+        """
+        Retrieves a repository payload.
+        :param org: The organization.
+        :type org: str
+        :param name: The repository name.
+        :type name: str
+        :return: The payload, if the repository exists.
+        :rtype: Union[Dict, None]
+        """
+        return self._repositories.get(org, {}).get(name, None)
+
+    def _application(self) -> web.Application:
+        """
+        Builds the aiohttp application.
+        :return: Such application.
+        :rtype: aiohttp.web.Application
+        """
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/repos/{org}/{name}", self._get_repository)
+        app.router.add_patch("/repos/{org}/{name}", self._patch_repository)
+        app.router.add_get("/repositories/{id}", self._get_repository_by_id)
+        app.router.add_get("/repos/{org}/{name}/git/trees/{ref:.+}", self._get_tree)
+        app.router.add_get("/repos/{org}/{name}/git/blobs/{sha}", self._get_blob)
+        app.router.add_get("/repos/{org}/{name}/tarball", self._get_archive)
+        app.router.add_get("/repos/{org}/{name}/tarball/{ref:.+}", self._get_archive)
+        app.router.add_get("/repos/{org}/{name}/zipball", self._get_archive)
+        app.router.add_get("/repos/{org}/{name}/zipball/{ref:.+}", self._get_archive)
+        app.router.add_get("/orgs/{org}/repos", self._list_repositories)
+        app.router.add_post("/orgs/{org}/repos", self._create_repository)
+        app.router.add_get("/orgs/{org}/teams", self._list_teams)
+        app.router.add_get(
+            "/orgs/{org}/teams/{slug}/repos", self._list_team_repositories
+        )
+        app.router.add_get(
+            "/orgs/{org}/properties/values", self._list_custom_property_values
+        )
+        app.router.add_patch(
+            "/orgs/{org}/properties/values", self._patch_custom_property_values
+        )
+        app.router.add_get("/rate_limit", self._get_rate_limit)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Starts serving in the running event loop.
+        :param host: The address to bind to.
+        :type host: str
+        :param port: The port to listen on. Defaults to any free port.
+        :type port: int
+        :return: The base url, to be used as apiUrl by clients.
+        :rtype: str
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        self._runner = web.AppRunner(self._application(), access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, sock).start()
+        bound_host, bound_port = sock.getsockname()[:2]
+        self._url = f"http://{bound_host}:{bound_port}"
+        return self._url
+
+    async def stop(self):
+        """
+        Stops serving.
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            self._url = None
+
+    async def __aenter__(self) -> "FakeGithubServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, excType, exc, tb):
+        await self.stop()
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        """
+        Applies authentication, latency, error injection and rate limiting.
+        :param request: The request.
+        :type request: aiohttp.web.Request
+        :param handler: The route handler.
+        :type handler: Callable
+        :return: The response.
+        :rtype: aiohttp.web.StreamResponse
+        """
+        self._request_count += 1
+        delay = self._latency
+        if self._jitter:
+            delay += self._random.uniform(0, self._jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        authorization = request.headers.get("Authorization", "")
+        token = authorization.split(" ", 1)[-1] if authorization else ""
+        if not token or (self._token is not None and token != self._token):
+            return self._error(401, "Bad credentials")
+
+        budget = self._budgets.get(token)
+        now = int(time.time())
+        if budget is None or budget[1] <= now:
+            budget = [self._rate_limit, now + 3600]
+            self._budgets[token] = budget
+        rate_headers = {
+            "X-RateLimit-Limit": str(self._rate_limit),
+            "X-RateLimit-Reset": str(budget[1]),
+            "X-RateLimit-Resource": "core",
+        }
+        if budget[0] <= 0:
+            rate_headers["X-RateLimit-Remaining"] = "0"
+            rate_headers["X-RateLimit-Used"] = str(self._rate_limit)
+            return self._error(403, "API rate limit exceeded", rate_headers)
+
+        if self._failures:
+            status, message = self._failures.pop(0)
+            response = self._error(status, message)
+        elif self._error_rate and self._random.random() < self._error_rate:
+            response = self._error(500, "Injected error")
+        else:
+            response = await handler(request)
+
+        # Conditional requests answered with 304 don't count against the budget.
+        if response.status != 304:
+            budget[0] -= 1
+        rate_headers["X-RateLimit-Remaining"] = str(budget[0])
+        rate_headers["X-RateLimit-Used"] = str(self._rate_limit - budget[0])
+        response.headers.update(rate_headers)
+        return response
+
+    @staticmethod
+    def _error(
+        status: int, message: str, headers: Union[Dict[str, str], None] = None
+    ) -> web.Response:
+        """
+        Builds an error response the way Github does.
+        :param status: The HTTP status.
+        :type status: int
+        :param message: The error message.
+        :type message: str
+        :param headers: Additional headers.
+        :type headers: Union[Dict[str, str], None]
+        :return: The response.
+        :rtype: aiohttp.web.Response
+        """
+        return web.json_response(
+            {
+                "message": message,
+                "documentation_url": "https://docs.github.com/rest",
+            },
+            status=status,
+            headers=headers,
+        )
+
+    @staticmethod
+    def _etag(body: bytes) -> str:
+        """
+        Computes the ETag of a response body.
+        :param body: The body.
+        :type body: bytes
+        :return: The ETag.
+        :rtype: str
+        """
+        return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+    def _json(self, request: web.Request, payload, status: int = 200, headers=None):
+        """
+        Builds a JSON response with an ETag, or a 304 if the client already has it.
+        :param request: The request.
+        :type request: aiohttp.web.Request
+        :param payload: The JSON payload.
+        :type payload: object
+        :param status: The HTTP status.
+        :type status: int
+        :param headers: Additional headers.
+        :type headers: Union[Dict[str, str], None]
+        :return: The response.
+        :rtype: aiohttp.web.Response
+        """
+        body = json.dumps(payload).encode("utf-8")
+        etag = self._etag(body)
+        all_headers = {"ETag": etag}
+        if headers:
+            all_headers.update(headers)
+        if status == 200 and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers=all_headers)
+        return web.Response(
+            body=self._trickle(body) if self._chunk_latency else body,
+            status=status,
+            content_type="application/json",
+            headers=all_headers,
+        )
+
+    async def _trickle(self, body: bytes) -> AsyncIterator[bytes]:
+        """
+        Sends a body in chunks, pausing between them.
+        :param body: The body.
+        :type body: bytes
+        :return: The chunks.
+        :rtype: AsyncIterator[bytes]
+        """
+        for start in range(0, len(body), self._chunk_size):
+            if start:
+                await asyncio.sleep(self._chunk_latency)
+            yield body[start : start + self._chunk_size]
+
+    def _page(self, request: web.Request, items: List) -> web.Response:
+        """
+        Answers with a page of items, and the Link header pointing to the others.
+        :param request: The request.
+        :type request: aiohttp.web.Request
+        :param items: All items.
+        :type items: List
+        :return: The response.
+        :rtype: aiohttp.web.Response
+        """
+        try:
+            per_page = min(max(int(request.query.get("per_page", 30)), 1), 100)
+            page = max(int(request.query.get("page", 1)), 1)
+        except ValueError:
+            return self._error(422, "Validation Failed")
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        start = (page - 1) * per_page
+        links = []
+        base = request.url.with_query(None)
+
+        def link(number: int, rel: str):
+            url = base.with_query(
+                {**request.query, "per_page": per_page, "page": number}
+            )
+            links.append(f'<{url}>; rel="{rel}"')
+
+        if page > 1:
+            link(1, "first")
+            link(page - 1, "prev")
+        if page < last:
+            link(page + 1, "next")
+            link(last, "last")
+        headers = {"Link": ", ".join(links)} if links else None
+        return self._json(request, items[start : start + per_page], headers=headers)
+
+    async def _get_repository(self, request: web.Request) -> web.Response:
+        org = request.match_info["org"]
+        name = request.match_info["name"]
+        payload = self.repository(org, name)
+        if payload is None:
+            repository_id = self._renames.get((org, name), None)
+            if repository_id is not None:
+                location = request.url.with_path(
+                    f"/repositories/{repository_id}"
+                ).with_query(None)
+                return self._error(
+                    301, "Moved Permanently", {"Location": str(location)}
+                )
+            return self._error(404, "Not Found")
+        return self._json(request, payload)
+
+    async def _get_repository_by_id(self, request: web.Request) -> web.Response:
+        try:
+            key = self._repositories_by_id.get(int(request.match_info["id"]), None)
+        except ValueError:
+            key = None
+        payload = self.repository(*key) if key is not None else None
+        if payload is None:
+            return self._error(404, "Not Found")
+        return self._json(request, payload)
+
+    async def _patch_repository(self, request: web.Request) -> web.Response:
+        org = request.match_info["org"]
+        name = request.match_info["name"]
+        payload = self.repository(org, name)
+        if payload is None:
+            return self._error(404, "Not Found")
+        try:
+            changes = await request.json()
+        except ValueError:
+            return self._error(400, "Problems parsing JSON")
+        new_name = changes.get("name", name)
+        if new_name != name:
+            if self.repository(org, new_name) is not None:
+                return self._error(422, "Repository creation failed.")
+            del self._repositories[org][name]
+            self._repositories[org][new_name] = payload
+            self._repositories_by_id[payload["id"]] = (org, new_name)
+            self._renames[(org, name)] = payload["id"]
+            payload["name"] = new_name
+            payload["full_name"] = f"{org}/{new_name}"
+            payload["html_url"] = f"https://github.com/{org}/{new_name}"
+        for field in self.REPOSITORY_FIELDS:
+            if field in changes:
+                payload[field] = changes[field]
+        return self._json(request, payload)
+
+    @staticmethod
+    def _tree_sha(payload: Dict, directory: str) -> str:
+        """
+        Computes the sha of a directory of a repository.
+        :param payload: The repository payload.
+        :type payload: Dict
+        :param directory: The directory path, empty for the root.
+        :type directory: str
+        :return: The tree sha.
+        :rtype: str
+        """
+        return hashlib.sha1(f"{payload['id']}:{directory}".encode("utf-8")).hexdigest()
+
+    async def _get_tree(self, request: web.Request) -> web.Response:
+        payload = self.repository(request.match_info["org"], request.match_info["name"])
+        if payload is None:
+            return self._error(404, "Not Found")
+        files = self._files.get(payload["id"], {})
+        # The ref is either a branch, served as the root, or a directory sha.
+        ref = request.match_info["ref"]
+        root = ""
+        for path in files:
+            parts = path.split("/")
+            for depth in range(1, len(parts)):
+                directory = "/".join(parts[:depth])
+                if self._tree_sha(payload, directory) == ref:
+                    root = directory
+        prefix = f"{root}/" if root else ""
+        recursive = request.query.get("recursive", "") not in ("", "0", "false")
+        entries = {}
+        for path, sha in sorted(files.items()):
+            if not path.startswith(prefix):
+                continue
+            parts = path[len(prefix) :].split("/")
+            for depth in range(1, len(parts) if recursive else min(len(parts), 2)):
+                directory = "/".join(parts[:depth])
+                entries.setdefault(
+                    directory,
+                    {
+                        "path": directory,
+                        "mode": "040000",
+                        "type": "tree",
+                        "sha": self._tree_sha(payload, f"{prefix}{directory}"),
+                    },
+                )
+            if recursive or len(parts) == 1:
+                entries["/".join(parts)] = {
+                    "path": "/".join(parts),
+                    "mode": "100644",
+                    "type": "blob",
+                    "sha": sha,
+                    "size": len(self._blobs[sha]),
+                }
+        tree = [entries[path] for path in sorted(entries)]
+        return self._json(
+            request,
+            {
+                "sha": self._tree_sha(payload, root),
+                "tree": tree[: self._tree_limit],
+                "truncated": len(tree) > self._tree_limit,
+            },
+        )
+
+    async def _get_blob(self, request: web.Request) -> web.Response:
+        payload = self.repository(request.match_info["org"], request.match_info["name"])
+        sha = request.match_info["sha"]
+        if payload is None or sha not in self._files.get(payload["id"], {}).values():
+            return self._error(404, "Not Found")
+        content = self._blobs[sha]
+        if "raw" in request.headers.get("Accept", ""):
+            return web.Response(
+                body=content,
+                content_type="application/vnd.github.raw",
+                headers={"ETag": f'"{sha}"'},
+            )
+        return self._json(
+            request,
+            {
+                "sha": sha,
+                "size": len(content),
+                "encoding": "base64",
+                "content": base64.b64encode(content).decode("ascii"),
+            },
+        )
+
+    def _archive(self, payload: Dict, zipball: bool) -> bytes:
+        """
+        Builds the archive of the files of a repository, deterministically.
+        :param payload: The repository payload.
+        :type payload: Dict
+        :param zipball: Whether to build a zip file instead of a gzipped tarball.
+        :type zipball: bool
+        :return: The archive.
+        :rtype: bytes
+        """
+        files = sorted(self._files.get(payload["id"], {}).items())
+        prefix = f"{payload['full_name'].replace('/', '-')}-{payload['id']:07d}"
+        output = io.BytesIO()
+        if zipball:
+            with zipfile.ZipFile(output, "w") as archive:
+                for path, sha in files:
+                    info = zipfile.ZipInfo(f"{prefix}/{path}", (1980, 1, 1, 0, 0, 0))
+                    archive.writestr(info, self._blobs[sha])
+            return output.getvalue()
+        with gzip.GzipFile(fileobj=output, mode="wb", mtime=0) as compressed:
+            with tarfile.open(fileobj=compressed, mode="w") as archive:
+                for path, sha in files:
+                    content = self._blobs[sha]
+                    info = tarfile.TarInfo(f"{prefix}/{path}")
+                    info.size = len(content)
+                    archive.addfile(info, io.BytesIO(content))
+        return output.getvalue()
+
+    async def _get_archive(self, request: web.Request) -> web.Response:
+        payload = self.repository(request.match_info["org"], request.match_info["name"])
+        if payload is None:
+            return self._error(404, "Not Found")
+        # Github redirects to codeload.github.com, which serves the archive itself.
+        zipball = "/zipball" in request.path
+        body = self._archive(payload, zipball)
+        etag = self._etag(body)
+        headers = {
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Content-Type": "application/zip" if zipball else "application/x-gzip",
+        }
+        requested = request.headers.get("Range", "")
+        if_range = request.headers.get("If-Range", None)
+        if requested.startswith("bytes=") and if_range in (None, etag):
+            try:
+                start = int(requested[len("bytes=") :].split("-", 1)[0])
+            except ValueError:
+                start = 0
+            if start >= len(body):
+                headers["Content-Range"] = f"bytes */{len(body)}"
+                return web.Response(status=416, headers=headers)
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            return web.Response(body=body[start:], status=206, headers=headers)
+        return web.Response(body=body, headers=headers)
+
+    async def _list_repositories(self, request: web.Request) -> web.Response:
+        org = request.match_info["org"]
+        if org not in self._repositories and org not in self._teams:
+            return self._error(404, "Not Found")
+        items = list(self._repositories.get(org, {}).values())
+        # Without a sort, repositories are listed as they were added.
+        sort = request.query.get("sort", None)
+        if sort is not None:
+            if sort not in ("created", "updated", "pushed", "full_name"):
+                return self._error(422, "Validation Failed")
+            direction = request.query.get(
+                "direction", "asc" if sort == "full_name" else "desc"
+            )
+            if direction not in ("asc", "desc"):
+                return self._error(422, "Validation Failed")
+            if sort == "full_name":
+                items.sort(key=lambda payload: payload["full_name"].lower())
+            else:
+                # No other dates are tracked, and ids grow with creation.
+                items.sort(key=lambda payload: payload["id"])
+            if direction == "desc":
+                items.reverse()
+        return self._page(request, items)
+
+    async def _create_repository(self, request: web.Request) -> web.Response:
+        org = request.match_info["org"]
+        try:
+            data = await request.json()
+        except ValueError:
+            return self._error(400, "Problems parsing JSON")
+        name = data.get("name", None)
+        if not name:
+            return self._error(422, "Validation Failed")
+        if self.repository(org, name) is not None:
+            return self._error(422, "Repository creation failed.")
+        fields = {
+            field: data[field] for field in self.REPOSITORY_FIELDS if field in data
+        }
+        return self._json(request, self.add_repository(org, name, **fields), 201)
+
+    async def _list_teams(self, request: web.Request) -> web.Response:
+        org = request.match_info["org"]
+        if org not in self._repositories and org not in self._teams:
+            return self._error(404, "Not Found")
+        return self._page(request, self._teams.get(org, []))
+
+    async def _list_team_repositories(self, request: web.Request) -> web.Response:
+        org = request.match_info["org"]
+        slug = request.match_info["slug"]
+        if not any(team["slug"] == slug for team in self._teams.get(org, [])):
+            return self._error(404, "Not Found")
+        roles = ("pull", "triage", "push", "maintain", "admin")
+        items = []
+        for repository_id, role in self._grants.get((org, slug), {}).items():
+            key = self._repositories_by_id.get(repository_id, None)
+            payload = self.repository(*key) if key is not None else None
+            if payload is None:
+                continue
+            level = roles.index(role) if role in roles else 0
+            item = dict(payload)
+            item["role_name"] = role
+            item["permissions"] = {
+                name: index <= level for index, name in enumerate(roles)
+            }
+            items.append(item)
+        return self._page(request, items)
+
+    async def _list_custom_property_values(self, request: web.Request) -> web.Response:
+        org = request.match_info["org"]
+        if org not in self._repositories and org not in self._teams:
+            return self._error(404, "Not Found")
+        items = [
+            {
+                "repository_id": payload["id"],
+                "repository_name": payload["name"],
+                "repository_full_name": payload["full_name"],
+                "properties": [
+                    {"property_name": name, "value": value}
+                    for name, value in (payload.get("custom_properties") or {}).items()
+                ],
+            }
+            for payload in self._repositories.get(org, {}).values()
+        ]
+        return self._page(request, items)
+
+    async def _patch_custom_property_values(self, request: web.Request) -> web.Response:
+        org = request.match_info["org"]
+        try:
+            data = await request.json()
+        except ValueError:
+            return self._error(400, "Problems parsing JSON")
+        names = data.get("repository_names", None) or []
+        properties = data.get("properties", None) or []
+        if not names or len(names) > 30 or not properties:
+            return self._error(422, "Validation Failed")
+        payloads = [self.repository(org, name) for name in names]
+        if any(payload is None for payload in payloads):
+            return self._error(422, "Validation Failed")
+        for payload in payloads:
+            values = payload.get("custom_properties") or {}
+            for item in properties:
+                if item.get("value", None) is None:
+                    values.pop(item["property_name"], None)
+                else:
+                    values[item["property_name"]] = item["value"]
+            payload["custom_properties"] = values
+        return web.Response(status=204)
+
+    async def _get_rate_limit(self, request: web.Request) -> web.Response:
+        authorization = request.headers.get("Authorization", "")
+        budget = self._budgets.get(authorization.split(" ", 1)[-1], None)
+        remaining = budget[0] if budget else self._rate_limit
+        reset = budget[1] if budget else int(time.time()) + 3600
+        core = {
+            "limit": self._rate_limit,
+            "remaining": remaining,
+            "reset": reset,
+            "used": self._rate_limit - remaining,
+        }
+        return self._json(request, {"resources": {"core": core}, "rate": core})
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,136 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/github_api_error.py
+
+This file defines the GithubApiError class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .transport_response import TransportResponse
+
+
+class GithubApiError(Exception):
+    """
+    A request the Github API didn't answer successfully.
+
+    Class name: GithubApiError
+
+    Responsibilities:
+        - Stop callers from taking a partial result for a complete one.
+        - Carry the request, the HTTP status and Github's message.
+
+    Collaborators:
+        - pythoneda.shared.git.github.TransportResponse: The failed response.
+    """
+
+    def __init__(self, method: str, url: str, status: int, message: str = ""):
+        """
+        Creates a new GithubApiError instance.
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The url.
+        :type url: str
+        :param status: The HTTP status.
+        :type status: int
+        :param message: Github's message, if any.
+        :type message: str
+        """
+        super().__init__(f"{method} {url}: {status} {message}".rstrip())
+        self._method = method
+        self._url = url
+        self._status = status
+        self._message = message
+
+    def __reduce__(self):
+        # Rebuilt from its fields, so it survives being sent between processes.
+        return (
+            self.__class__,
+            (self._method, self._url, self._status, self._message),
+        )
+
+    @property
+    def method(self) -> str:
+        """
+        Retrieves the HTTP method.
+        :return: Such method.
+        :rtype: str
+        """
+        return self._method
+
+    @property
+    def url(self) -> str:
+        """
+        Retrieves the url.
+        :return: Such url.
+        :rtype: str
+        """
+        return self._url
+
+    @property
+    def status(self) -> int:
+        """
+        Retrieves the HTTP status.
+        :return: Such status.
+        :rtype: int
+        """
+        return self._status
+
+    @property
+    def message(self) -> str:
+        """
+        Retrieves Github's message.
+        :return: Such message, or an empty string.
+        :rtype: str
+        """
+        return self._message
+
+    @classmethod
+    async def from_response(
+        cls, method: str, url: str, response: "TransportResponse"
+    ) -> "GithubApiError":
+        """
+        Builds an error from a response, reading Github's message from its body.
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The url.
+        :type url: str
+        :param response: The response.
+        :type response: pythoneda.shared.git.github.TransportResponse
+        :return: The error.
+        :rtype: pythoneda.shared.git.github.GithubApiError
+        """
+        message = ""
+        try:
+            payload = json.loads(await response.read() or b"{}")
+            if isinstance(payload, dict):
+                message = str(payload.get("message", ""))
+        except ValueError:
+            pass
+        return cls(method, url, response.status, message)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
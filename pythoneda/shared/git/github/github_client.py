@@ -0,0 +1,198 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/github_client.py
+
+This file defines the GithubClient class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .aiohttp_transport import AiohttpTransport
+import contextlib
+from .github_api_error import GithubApiError
+from .metrics import GithubMetrics
+from pythoneda.shared import BaseObject
+from .transport import Transport
+from typing import AsyncIterator, Dict, TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+class GithubClient(BaseObject):
+    """
+    Base of the classes sending requests to the Github API.
+
+    Class name: GithubClient
+
+    Responsibilities:
+        - Keep the token, the base url, the transport and the metrics of a client.
+        - Track each request in the metrics, if any.
+        - Follow paginated listings item by item, raising on any page that fails.
+
+    Collaborators:
+        - pythoneda.shared.git.github.GithubApiError: Raised for failed pages.
+        - pythoneda.shared.git.github.GithubMetrics: Optionally collects usage metrics.
+        - pythoneda.shared.git.github.Transport: Sends the requests.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        metrics: Union[GithubMetrics, None] = None,
+        apiUrl: str = "https://api.github.com",
+        transport: Union[Transport, None] = None,
+    ):
+        """
+        Creates a new GithubClient instance.
+        :param token: The Github token.
+        :type token: str
+        :param metrics: The metrics to report requests to, if any.
+        :type metrics: Union[pythoneda.shared.git.github.GithubMetrics, None]
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param transport: How to send requests. Defaults to the network, via
+        aiohttp, reporting its connections as a pool named after the class.
+        :type transport: Union[pythoneda.shared.git.github.Transport, None]
+        """
+        super().__init__()
+        self._token = token
+        self._metrics = metrics
+        self._api_url = apiUrl.rstrip("/")
+        if transport is None:
+            transport = AiohttpTransport(metrics=metrics, pool=type(self).__name__)
+        self._transport = transport
+        # The running loop, and the semaphore created in it.
+        self._limit = None
+
+    @property
+    def token(self) -> str:
+        """
+        Retrieves the github token.
+        :return: Such token.
+        :rtype: str
+        """
+        return self._token
+
+    @property
+    def metrics(self) -> Union[GithubMetrics, None]:
+        """
+        Retrieves the metrics requests are reported to.
+        :return: Such metrics, if any.
+        :rtype: Union[pythoneda.shared.git.github.GithubMetrics, None]
+        """
+        return self._metrics
+
+    @property
+    def api_url(self) -> str:
+        """
+        Retrieves the base url of the Github API.
+        :return: Such url.
+        :rtype: str
+        """
+        return self._api_url
+
+    @property
+    def transport(self) -> Transport:
+        """
+        Retrieves the transport used to send requests.
+        :return: Such transport.
+        :rtype: pythoneda.shared.git.github.Transport
+        """
+        return self._transport
+
+    def _track(self, method: str, endpoint: str):
+        """
+        Tracks a request in the metrics, if any.
+        :param method: The HTTP method.
+        :type method: str
+        :param endpoint: The templated endpoint.
+        :type endpoint: str
+        :return: An async context manager yielding a callable to report the response.
+        :rtype: contextlib.AbstractAsyncContextManager
+        """
+        if self._metrics is None:
+            return contextlib.nullcontext(GithubMetrics.ignore)
+        return self._metrics.track(method, endpoint, self._token)
+
+    def _semaphore(self, concurrency: int) -> "asyncio.Semaphore":
+        """
+        Retrieves the semaphore capping the concurrent requests of this client.
+        It's created in the running loop, so the client can be used from one
+        loop after another, as asyncio.run() does.
+        :param concurrency: The maximum number of concurrent requests.
+        :type concurrency: int
+        :return: Such semaphore.
+        :rtype: asyncio.Semaphore
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        if self._limit is None or self._limit[0] is not loop:
+            self._limit = (loop, asyncio.Semaphore(concurrency))
+        return self._limit[1]
+
+    async def _items(
+        self,
+        url: str,
+        endpoint: str,
+        headers: Dict[str, str],
+        maxPages: Union[int, None] = None,
+    ) -> AsyncIterator:
+        """
+        Retrieves a paginated listing, following the "next" links.
+        Each item is yielded as soon as its bytes arrive, while the rest of its
+        page is still downloading. Requests are timed up to their headers, so
+        neither the body nor the caller's own work count as request latency.
+        :param url: The url of the first page.
+        :type url: str
+        :param endpoint: The templated endpoint, for the metrics.
+        :type endpoint: str
+        :param headers: The request headers.
+        :type headers: Dict[str, str]
+        :param maxPages: How many pages to retrieve at most, or None to follow all of them.
+        :type maxPages: Union[int, None]
+        :return: The items of all pages.
+        :rtype: AsyncIterator
+        :raise GithubApiError: If any page can't be retrieved, so that a partial
+        listing is never taken for a complete one.
+        """
+        pages = 0
+        while url is not None and (maxPages is None or pages < maxPages):
+            async with contextlib.AsyncExitStack() as connection:
+                async with contextlib.AsyncExitStack() as tracking:
+                    observe = await tracking.enter_async_context(
+                        self._track("GET", endpoint)
+                    )
+                    response = await connection.enter_async_context(
+                        self.transport.request("GET", url, headers)
+                    )
+                    observe(response.status, response.headers)
+                    if response.status != 200:
+                        raise await GithubApiError.from_response("GET", url, response)
+                    url = response.next_link
+                async for item in response.iter_json_array():
+                    yield item
+            pages += 1
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
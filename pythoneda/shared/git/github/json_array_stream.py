@@ -0,0 +1,184 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/json_array_stream.py
+
+This file defines the JsonArrayStream class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import codecs
+import json
+from pythoneda.shared import BaseObject
+from typing import List
+
+
+class JsonArrayStream(BaseObject):
+    """
+    Incremental parser of a top-level JSON array, fed with bytes as they arrive.
+
+    Class name: JsonArrayStream
+
+    Responsibilities:
+        - Decode each element of the array as soon as its last byte is fed.
+        - Keep in memory only the bytes of the element being received.
+        - Reject anything but a single, well-formed array.
+
+    Collaborators:
+        - None
+    """
+
+    _WHITESPACE = " \t\r\n"
+    _VALUE_START = '{["-0123456789tfn'
+    _NUMBER = "0123456789+-.eE"
+
+    # What the parser expects next.
+    _ARRAY = 0
+    _FIRST = 1
+    _ELEMENT = 2
+    _SEPARATOR = 3
+    _END = 4
+
+    def __init__(self):
+        """
+        Creates a new JsonArrayStream instance.
+        """
+        super().__init__()
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._text = ""
+        # Don't try to decode the pending element again until the text is this long.
+        self._retry_at = 0
+        self._state = self._ARRAY
+
+    @property
+    def finished(self) -> bool:
+        """
+        Checks whether the closing bracket of the array has been fed.
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self._state == self._END
+
+    def feed(self, chunk: bytes) -> List:
+        """
+        Feeds the next bytes of the document.
+        :param chunk: The bytes.
+        :type chunk: bytes
+        :return: The elements completed by these bytes, decoded.
+        :rtype: List
+        :raise ValueError: If the bytes can't be part of a JSON array.
+        """
+        self._text += self._utf8.decode(chunk)
+        if len(self._text) < self._retry_at:
+            return []
+        return self._parse(False)
+
+    def close(self) -> List:
+        """
+        Checks the whole array has been fed, and decodes any element still pending.
+        :return: Such elements.
+        :rtype: List
+        :raise ValueError: If the document is not a complete JSON array.
+        """
+        self._text += self._utf8.decode(b"", final=True)
+        elements = self._parse(True)
+        if self._state != self._END:
+            raise ValueError("Truncated JSON array")
+        return elements
+
+    def _parse(self, final: bool) -> List:
+        """
+        Decodes the elements completed in the pending text.
+        :param final: Whether no more text will come.
+        :type final: bool
+        :return: Such elements.
+        :rtype: List
+        :raise ValueError: If the text can't be part of a JSON array.
+        """
+        text = self._text
+        size = len(text)
+        position = 0
+        elements = []
+        self._retry_at = 0
+
+        while position < size:
+            character = text[position]
+            if character in self._WHITESPACE:
+                position += 1
+                continue
+            state = self._state
+            if state == self._ARRAY:
+                if character != "[":
+                    raise ValueError(f"Expecting '[' at {position}")
+                self._state = self._FIRST
+                position += 1
+                continue
+            if state == self._END:
+                raise ValueError("Extra data after the JSON array")
+            if state == self._SEPARATOR:
+                if character == ",":
+                    self._state = self._ELEMENT
+                elif character == "]":
+                    self._state = self._END
+                else:
+                    raise ValueError("Expecting ',' or ']' between elements")
+                position += 1
+                continue
+            if character == "]" and state == self._FIRST:
+                self._state = self._END
+                position += 1
+                continue
+            if character not in self._VALUE_START:
+                raise ValueError("Expecting a value")
+            try:
+                element, end = self._decoder.raw_decode(text, position)
+            except ValueError:
+                if final:
+                    raise
+                # The element is still incomplete. Waiting until the pending
+                # text doubles keeps retries linear for very large elements.
+                self._retry_at = 2 * size - position
+                break
+            if (
+                not final
+                and character in self._NUMBER
+                and (
+                    end == size
+                    or text[end] in self._NUMBER
+                    and not text[end:].strip(self._NUMBER)
+                )
+            ):
+                # A number at the end of the text may still have digits to come.
+                self._retry_at = size + 1
+                break
+            elements.append(element)
+            self._state = self._SEPARATOR
+            position = end
+
+        # Drop the text no longer needed.
+        self._text = text[position:]
+        self._retry_at = max(self._retry_at - position, 0)
+        return elements
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,508 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/metrics.py
+
+This file defines the GithubMetrics class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from contextlib import asynccontextmanager
+import hashlib
+from pythoneda.shared import BaseObject
+import threading
+import time
+from typing import Mapping, Tuple, Union
+
+
+class GithubMetrics(BaseObject):
+    """
+    Aggregates Github API usage metrics and exposes them in Prometheus text format.
+
+    Class name: GithubMetrics
+
+    Responsibilities:
+        - Keep per-endpoint latency histograms, request and error counters.
+        - Keep the remaining rate budget per token, in-flight requests, connection pool utilisation, in-flight client calls and cache hit ratios.
+        - Render them in Prometheus text exposition format, and optionally serve them over HTTP.
+
+    Collaborators:
+        - pythoneda.shared.git.github.AiohttpTransport: Reports its connection pool.
+        - pythoneda.shared.git.github.RepositoryAccess: Reports its requests.
+        - pythoneda.shared.git.github.Team: Reports its requests.
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Creates a new GithubMetrics instance.
+        :param buckets: The upper bounds of the latency histogram buckets, in seconds.
+        :type buckets: Tuple[float, ...]
+        """
+        super().__init__()
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # (method, endpoint) -> [bucket counts..., +Inf count], sum
+        self._latency_buckets = {}
+        self._latency_sums = {}
+        # (method, endpoint, status class) -> count
+        self._requests = {}
+        self._errors = {}
+        # (method, endpoint) -> count
+        self._in_flight = {}
+        # token fingerprint -> (remaining, limit, reset)
+        self._rate_limits = {}
+        # pool -> (connections in use, connection limit)
+        self._pools = {}
+        # client -> (calls in flight, connection limit)
+        self._clients = {}
+        # cache -> [hits, misses]
+        self._caches = {}
+        self._server = None
+        self._server_thread = None
+
+    @property
+    def buckets(self) -> Tuple[float, ...]:
+        """
+        Retrieves the histogram bucket bounds.
+        :return: Such bounds.
+        :rtype: Tuple[float, ...]
+        """
+        return self._buckets
+
+    @staticmethod
+    def ignore(status: Union[int, None], headers: Union[Mapping[str, str], None]):
+        """
+        Discards a response observation. Used when no metrics are collected.
+        :param status: The HTTP status.
+        :type status: Union[int, None]
+        :param headers: The response headers.
+        :type headers: Union[Mapping[str, str], None]
+        """
+        pass
+
+    @staticmethod
+    def status_class(status: Union[int, None]) -> str:
+        """
+        Classifies a HTTP status.
+        :param status: The HTTP status, or None if the request failed before any response.
+        :type status: Union[int, None]
+        :return: "1xx" .. "5xx", or "exception".
+        :rtype: str
+        """
+        if status is None:
+            return "exception"
+        return f"{status // 100}xx"
+
+    @staticmethod
+    def fingerprint(token: str) -> str:
+        """
+        Builds a non-reversible label for a token, so it never leaks into metrics.
+        :param token: The Github token.
+        :type token: str
+        :return: The fingerprint.
+        :rtype: str
+        """
+        return hashlib.sha256(str(token).encode("utf-8")).hexdigest()[:12]
+
+    @asynccontextmanager
+    async def track(self, method: str, endpoint: str, token: str):
+        """
+        Tracks a request: accounts it as in-flight while running, and records its
+        latency, status and rate-limit headers once done.
+        Usage:
+            async with metrics.track("GET", "/repos/{org}/{name}", token) as observe:
+                async with session.get(url) as response:
+                    observe(response.status, response.headers)
+        :param method: The HTTP method.
+        :type method: str
+        :param endpoint: The templated endpoint (e.g. "/repos/{org}/{name}").
+        :type endpoint: str
+        :param token: The token used in the request.
+        :type token: str
+        :return: A callable to report the response status and headers.
+        :rtype: Callable[[int, Mapping[str, str]], None]
+        """
+        key = (method, endpoint)
+        outcome = {"status": None, "headers": None}
+
+        def observe(status: Union[int, None], headers: Union[Mapping[str, str], None]):
+            outcome["status"] = status
+            outcome["headers"] = headers
+
+        with self._lock:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield observe
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_flight[key] -= 1
+            self.observe_request(
+                method, endpoint, outcome["status"], elapsed, outcome["headers"], token
+            )
+
+    def observe_request(
+        self,
+        method: str,
+        endpoint: str,
+        status: Union[int, None],
+        elapsed: float,
+        headers: Union[Mapping[str, str], None] = None,
+        token: Union[str, None] = None,
+    ):
+        """
+        Records a finished request.
+        :param method: The HTTP method.
+        :type method: str
+        :param endpoint: The templated endpoint.
+        :type endpoint: str
+        :param status: The HTTP status, or None if the request raised.
+        :type status: Union[int, None]
+        :param elapsed: The latency, in seconds.
+        :type elapsed: float
+        :param headers: The response headers.
+        :type headers: Union[Mapping[str, str], None]
+        :param token: The token used in the request.
+        :type token: Union[str, None]
+        """
+        key = (method, endpoint)
+        status_key = (method, endpoint, self.status_class(status))
+        with self._lock:
+            counts = self._latency_buckets.get(key)
+            if counts is None:
+                counts = [0] * (len(self._buckets) + 1)
+                self._latency_buckets[key] = counts
+                self._latency_sums[key] = 0.0
+            for index, bound in enumerate(self._buckets):
+                if elapsed <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._latency_sums[key] += elapsed
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+            if status is None or status >= 400:
+                self._errors[status_key] = self._errors.get(status_key, 0) + 1
+        if headers is not None and token is not None:
+            self.observe_rate_limit(token, headers)
+
+    def observe_rate_limit(self, token: str, headers: Mapping[str, str]):
+        """
+        Records the rate budget advertised by Github's X-RateLimit-* headers.
+        :param token: The token the budget belongs to.
+        :type token: str
+        :param headers: The response headers.
+        :type headers: Mapping[str, str]
+        """
+        remaining = headers.get("X-RateLimit-Remaining", None)
+        if remaining is None:
+            return
+        try:
+            entry = (
+                int(remaining),
+                int(headers.get("X-RateLimit-Limit", 0)),
+                int(headers.get("X-RateLimit-Reset", 0)),
+            )
+        except ValueError:
+            return
+        with self._lock:
+            self._rate_limits[self.fingerprint(token)] = entry
+
+    def observe_pool(self, pool: str, inUse: int, limit: int):
+        """
+        Records the connections checked out of a connection pool.
+        :param pool: The pool name.
+        :type pool: str
+        :param inUse: The connections currently in use.
+        :type inUse: int
+        :param limit: The maximum number of connections of the pool, or 0 if unlimited.
+        :type limit: int
+        """
+        with self._lock:
+            self._pools[pool] = (inUse, limit)
+
+    def observe_calls(self, client: str, inFlight: int, connections: int):
+        """
+        Records the calls a client is running, against the size of its
+        connection pool. Calls beyond that size wait for a connection.
+        :param client: The client name.
+        :type client: str
+        :param inFlight: The calls currently running.
+        :type inFlight: int
+        :param connections: The maximum number of connections of the client.
+        :type connections: int
+        """
+        with self._lock:
+            self._clients[client] = (inFlight, connections)
+
+    def observe_cache(self, cache: str, hit: bool):
+        """
+        Records a cache lookup.
+        :param cache: The cache name.
+        :type cache: str
+        :param hit: Whether the lookup was a hit.
+        :type hit: bool
+        """
+        with self._lock:
+            counts = self._caches.setdefault(cache, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        """
+        Formats Prometheus labels.
+        :param labels: The labels.
+        :type labels: Dict[str, str]
+        :return: The formatted labels, including the braces.
+        :rtype: str
+        """
+        escaped = []
+        for name, value in labels.items():
+            value = (
+                str(value)
+                .replace("\\", "\\\\")
+                .replace("\n", "\\n")
+                .replace('"', '\\"')
+            )
+            escaped.append(f'{name}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def _number(value: float) -> str:
+        """
+        Formats a sample value.
+        :param value: The value.
+        :type value: float
+        :return: The formatted value.
+        :rtype: str
+        """
+        if value == float("inf"):
+            return "+Inf"
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def render(self) -> str:
+        """
+        Renders all metrics in Prometheus text exposition format (version 0.0.4).
+        :return: The metrics.
+        :rtype: str
+        """
+        lines = []
+        with self._lock:
+            lines.append(
+                "# HELP github_api_request_duration_seconds Github API request latency."
+            )
+            lines.append("# TYPE github_api_request_duration_seconds histogram")
+            for (method, endpoint), counts in sorted(self._latency_buckets.items()):
+                cumulative = 0
+                for bound, count in zip(self._buckets + (float("inf"),), counts):
+                    cumulative += count
+                    labels = self._labels(
+                        method=method, endpoint=endpoint, le=self._number(bound)
+                    )
+                    lines.append(
+                        f"github_api_request_duration_seconds_bucket{labels} {cumulative}"
+                    )
+                labels = self._labels(method=method, endpoint=endpoint)
+                lines.append(
+                    f"github_api_request_duration_seconds_sum{labels} {self._latency_sums[(method, endpoint)]!r}"
+                )
+                lines.append(
+                    f"github_api_request_duration_seconds_count{labels} {cumulative}"
+                )
+
+            for name, help_text, samples in (
+                (
+                    "github_api_requests_total",
+                    "Github API requests, by status class.",
+                    self._requests,
+                ),
+                (
+                    "github_api_errors_total",
+                    "Failed Github API requests, by status class.",
+                    self._errors,
+                ),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for (method, endpoint, status), count in sorted(samples.items()):
+                    labels = self._labels(
+                        method=method, endpoint=endpoint, status_class=status
+                    )
+                    lines.append(f"{name}{labels} {count}")
+
+            lines.append(
+                "# HELP github_api_requests_in_flight Github API requests currently running."
+            )
+            lines.append("# TYPE github_api_requests_in_flight gauge")
+            for (method, endpoint), count in sorted(self._in_flight.items()):
+                labels = self._labels(method=method, endpoint=endpoint)
+                lines.append(f"github_api_requests_in_flight{labels} {count}")
+
+            for name, help_text, position in (
+                (
+                    "github_api_rate_limit_remaining",
+                    "Remaining Github API rate budget, per token.",
+                    0,
+                ),
+                (
+                    "github_api_rate_limit_limit",
+                    "Github API rate budget, per token.",
+                    1,
+                ),
+                (
+                    "github_api_rate_limit_reset_timestamp_seconds",
+                    "When the Github API rate budget resets, per token.",
+                    2,
+                ),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                for token, entry in sorted(self._rate_limits.items()):
+                    labels = self._labels(token=token)
+                    lines.append(f"{name}{labels} {entry[position]}")
+
+            for name, help_text, position in (
+                (
+                    "github_api_pool_connections_in_use",
+                    "Connections checked out of the pool, per pool.",
+                    0,
+                ),
+                (
+                    "github_api_pool_connections_limit",
+                    "Maximum connections of the pool, per pool. 0 means unlimited.",
+                    1,
+                ),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                for pool, entry in sorted(self._pools.items()):
+                    labels = self._labels(pool=pool)
+                    lines.append(f"{name}{labels} {entry[position]}")
+            lines.append(
+                "# HELP github_api_pool_utilization_ratio Connections in use over"
+                " the limit, per limited pool."
+            )
+            lines.append("# TYPE github_api_pool_utilization_ratio gauge")
+            for pool, (in_use, limit) in sorted(self._pools.items()):
+                if limit:
+                    labels = self._labels(pool=pool)
+                    lines.append(
+                        f"github_api_pool_utilization_ratio{labels} {in_use / limit!r}"
+                    )
+
+            lines.append(
+                "# HELP github_api_client_calls_in_flight Calls running, per client."
+            )
+            lines.append("# TYPE github_api_client_calls_in_flight gauge")
+            for client, (in_flight, _) in sorted(self._clients.items()):
+                labels = self._labels(client=client)
+                lines.append(f"github_api_client_calls_in_flight{labels} {in_flight}")
+            lines.append(
+                "# HELP github_api_client_call_pressure_ratio Calls running over the"
+                " connection limit, per client. Above 1, calls wait for connections."
+            )
+            lines.append("# TYPE github_api_client_call_pressure_ratio gauge")
+            for client, (in_flight, connections) in sorted(self._clients.items()):
+                labels = self._labels(client=client)
+                ratio = in_flight / connections if connections else 0.0
+                lines.append(f"github_api_client_call_pressure_ratio{labels} {ratio!r}")
+
+            for name, help_text, position in (
+                ("github_api_cache_hits_total", "Cache hits, per cache.", 0),
+                ("github_api_cache_misses_total", "Cache misses, per cache.", 1),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for cache, counts in sorted(self._caches.items()):
+                    labels = self._labels(cache=cache)
+                    lines.append(f"{name}{labels} {counts[position]}")
+            lines.append(
+                "# HELP github_api_cache_hit_ratio Cache hits over lookups, per cache."
+            )
+            lines.append("# TYPE github_api_cache_hit_ratio gauge")
+            for cache, (hits, misses) in sorted(self._caches.items()):
+                labels = self._labels(cache=cache)
+                total = hits + misses
+                ratio = hits / total if total else 0.0
+                lines.append(f"github_api_cache_hit_ratio{labels} {ratio!r}")
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9464) -> Tuple[str, int]:
+        """
+        Serves the metrics at http://[host]:[port]/metrics, from a daemon thread.
+        :param host: The address to bind to. Defaults to localhost only.
+        :type host: str
+        :param port: The port to listen on. Use 0 to pick a free one.
+        :type port: int
+        :return: The actual address and port.
+        :rtype: Tuple[str, int]
+        """
+        if self._server is not None:
+            return self._server.server_address[:2]
+
+        # Imported here, so that only processes serving metrics pay for it.
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+                )
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._server_thread = threading.Thread(
+            target=self._server.serve_forever, name="github-metrics", daemon=True
+        )
+        self._server_thread.start()
+        return self._server.server_address[:2]
+
+    def stop(self):
+        """
+        Stops serving the metrics, if it was.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server_thread.join()
+            self._server = None
+            self._server_thread = None
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,436 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/org_scanner.py
+
+This file defines the OrgScanner class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .aiohttp_transport import AiohttpTransport
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+from pythoneda.shared import BaseObject
+import queue as queues
+from .repository import Repository
+from .repository_access import RepositoryAccess
+from .repository_inventory import RepositoryInventory
+from .shared_token_bucket import SharedTokenBucket
+from .throttled_transport import ThrottledTransport
+from typing import Iterable, Iterator, List, Tuple, Union
+
+# An organization, and the first and last pages to scan (None for all the rest).
+Shard = Tuple[str, int, Union[int, None]]
+
+
+class OrgScanner(BaseObject):
+    """
+    Lists the repositories of many organizations, or of a very large one, in
+    several processes.
+
+    Shards are pages of the listing sorted by creation, oldest first, so that
+    repositories created while scanning only add pages at the end, which the
+    last shard of each organization follows. A repository deleted while
+    scanning shifts the later ones back a position, so one of them can move
+    into a page already scanned and be missed.
+
+    Scanning blocks, and so do shards(), lines(), repositories() and
+    scan_to(); they refuse to run in a thread with a running event loop.
+    Coroutines can await shards_async(), or run the rest in a worker thread,
+    for instance with asyncio.to_thread().
+
+    Class name: OrgScanner
+
+    Responsibilities:
+        - Split organizations into shards of pages, and spread them over a process pool.
+        - Give each worker process its own session, and all requests, counting included, a shared budget.
+        - Stream the repositories back as encoded inventory lines, and merge them.
+
+    Collaborators:
+        - pythoneda.shared.git.github.RepositoryAccess: Lists the repositories of each shard.
+        - pythoneda.shared.git.github.RepositoryInventory: The format of the records, and where they can be merged.
+        - pythoneda.shared.git.github.SharedTokenBucket: The request budget shared by all workers.
+        - pythoneda.shared.git.github.ThrottledTransport: Draws each request from that budget.
+    """
+
+    # The number of records sent to the parent at once.
+    BATCH = 200
+
+    # The order shards are taken from, stable while repositories are created.
+    SORT = "created"
+    DIRECTION = "asc"
+
+    # The shared request budget and the result queue, in each worker process.
+    _worker_state = None
+
+    def __init__(
+        self,
+        token: str,
+        apiUrl: str = "https://api.github.com",
+        processes: Union[int, None] = None,
+        requestsPerSecond: Union[float, None] = None,
+        perPage: int = 100,
+        pagesPerShard: Union[int, None] = 10,
+        concurrency: int = 4,
+        mpContext: Union[str, None] = None,
+    ):
+        """
+        Creates a new OrgScanner instance.
+        :param token: The Github token.
+        :type token: str
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param processes: The number of worker processes. Defaults to the CPU count.
+        :type processes: Union[int, None]
+        :param requestsPerSecond: The request rate of all workers together, if limited.
+        :type requestsPerSecond: Union[float, None]
+        :param perPage: The number of repositories per page (at most 100).
+        :type perPage: int
+        :param pagesPerShard: The number of pages of each shard, or None to
+        scan each organization as a single shard.
+        :type pagesPerShard: Union[int, None]
+        :param concurrency: The number of shards each worker scans at once.
+        :type concurrency: int
+        :param mpContext: The multiprocessing start method, if not the default.
+        :type mpContext: Union[str, None]
+        """
+        super().__init__()
+        self._token = token
+        self._api_url = apiUrl
+        self._processes = processes or os.cpu_count() or 1
+        self._requests_per_second = requestsPerSecond
+        self._per_page = perPage
+        self._pages_per_shard = pagesPerShard
+        self._concurrency = concurrency
+        self._mp_context = mpContext
+
+    @property
+    def processes(self) -> int:
+        """
+        Retrieves the number of worker processes.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._processes
+
+    @property
+    def requests_per_second(self) -> Union[float, None]:
+        """
+        Retrieves the request rate of all workers together.
+        :return: Such rate, if limited.
+        :rtype: Union[float, None]
+        """
+        return self._requests_per_second
+
+    @staticmethod
+    def _blocking(method: str):
+        """
+        Refuses to block a running event loop.
+        :param method: The name of the blocking method.
+        :type method: str
+        :raise RuntimeError: If called from a thread running an event loop.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        raise RuntimeError(
+            f"OrgScanner.{method}() blocks, so it can't run inside an event loop: "
+            "await shards_async(), or run it with asyncio.to_thread()"
+        )
+
+    def _bucket(self, context) -> Union[SharedTokenBucket, None]:
+        """
+        Creates the request budget of a scan, if its rate is limited.
+        :param context: The multiprocessing context of the workers.
+        :type context: multiprocessing.context.BaseContext
+        :return: Such budget, if any.
+        :rtype: Union[pythoneda.shared.git.github.SharedTokenBucket, None]
+        """
+        if not self._requests_per_second:
+            return None
+        return SharedTokenBucket(self._requests_per_second, context=context)
+
+    async def _shards(
+        self, orgs: Iterable[str], bucket: Union[SharedTokenBucket, None]
+    ) -> List[Shard]:
+        """
+        Splits organizations into shards of pages, counting their repositories
+        within a request budget.
+        :param orgs: The organizations.
+        :type orgs: Iterable[str]
+        :param bucket: The request budget, if any.
+        :type bucket: Union[pythoneda.shared.git.github.SharedTokenBucket, None]
+        :return: The shards.
+        :rtype: List[Tuple[str, int, Union[int, None]]]
+        :raise GithubApiError: If any organization can't be listed.
+        """
+        orgs = list(orgs)
+        if not self._pages_per_shard:
+            return [(org, 1, None) for org in orgs]
+        transport = AiohttpTransport()
+        if bucket is not None:
+            transport = ThrottledTransport(transport, bucket)
+        access = RepositoryAccess(
+            self._token, apiUrl=self._api_url, transport=transport
+        )
+        counts = await asyncio.gather(*[access.count(org) for org in orgs])
+        result = []
+        for org, count in zip(orgs, counts):
+            pages = max((count + self._per_page - 1) // self._per_page, 1)
+            for first in range(1, pages + 1, self._pages_per_shard):
+                last = first + self._pages_per_shard - 1
+                # Pages of repositories created since counting come last.
+                result.append((org, first, last if last < pages else None))
+        return result
+
+    async def shards_async(self, orgs: Iterable[str]) -> List[Shard]:
+        """
+        Splits organizations into shards of pages. The requests counting their
+        repositories keep to the request rate.
+        :param orgs: The organizations.
+        :type orgs: Iterable[str]
+        :return: The shards.
+        :rtype: List[Tuple[str, int, Union[int, None]]]
+        :raise GithubApiError: If any organization can't be listed.
+        """
+        context = multiprocessing.get_context(self._mp_context)
+        return await self._shards(orgs, self._bucket(context))
+
+    def shards(self, orgs: Iterable[str]) -> List[Shard]:
+        """
+        Splits organizations into shards of pages, blocking until done.
+        :param orgs: The organizations.
+        :type orgs: Iterable[str]
+        :return: The shards.
+        :rtype: List[Tuple[str, int, Union[int, None]]]
+        :raise GithubApiError: If any organization can't be listed.
+        :raise RuntimeError: If called from a running event loop.
+        """
+        self._blocking("shards")
+        return asyncio.run(self.shards_async(orgs))
+
+    @staticmethod
+    def _initialize(bucket: Union[SharedTokenBucket, None], results):
+        """
+        Keeps the shared state in a worker process.
+        :param bucket: The shared request budget, if any.
+        :type bucket: Union[pythoneda.shared.git.github.SharedTokenBucket, None]
+        :param results: The queue to send records through.
+        :type results: multiprocessing.Queue
+        """
+        OrgScanner._worker_state = (bucket, results)
+
+    @staticmethod
+    def _work(
+        shards: List[Shard], token: str, apiUrl: str, perPage: int, concurrency: int
+    ) -> int:
+        """
+        Scans some shards, in a worker process.
+        :param shards: The shards.
+        :type shards: List[Tuple[str, int, Union[int, None]]]
+        :param token: The Github token.
+        :type token: str
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param perPage: The number of repositories per page.
+        :type perPage: int
+        :param concurrency: The number of shards scanned at once.
+        :type concurrency: int
+        :return: The number of repositories found.
+        :rtype: int
+        """
+        bucket, results = OrgScanner._worker_state
+        return asyncio.run(
+            OrgScanner._scan(
+                shards, token, apiUrl, perPage, concurrency, bucket, results
+            )
+        )
+
+    @staticmethod
+    async def _scan(
+        shards: List[Shard],
+        token: str,
+        apiUrl: str,
+        perPage: int,
+        concurrency: int,
+        bucket: Union[SharedTokenBucket, None],
+        results,
+    ) -> int:
+        """
+        Scans some shards over a single session, sending the records to the parent.
+        Every shard ends with a None batch, even if it fails.
+        :param shards: The shards.
+        :type shards: List[Tuple[str, int, Union[int, None]]]
+        :param token: The Github token.
+        :type token: str
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param perPage: The number of repositories per page.
+        :type perPage: int
+        :param concurrency: The number of shards scanned at once.
+        :type concurrency: int
+        :param bucket: The shared request budget, if any.
+        :type bucket: Union[pythoneda.shared.git.github.SharedTokenBucket, None]
+        :param results: The queue to send records through.
+        :type results: multiprocessing.Queue
+        :return: The number of repositories found.
+        :rtype: int
+        """
+        import aiohttp
+
+        semaphore = asyncio.Semaphore(concurrency)
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency)
+        ) as session:
+            transport = AiohttpTransport(session)
+            if bucket is not None:
+                transport = ThrottledTransport(transport, bucket)
+            access = RepositoryAccess(token, None, apiUrl, transport)
+
+            async def scan(org: str, first: int, last: Union[int, None]) -> int:
+                count = 0
+                batch = []
+                try:
+                    async with semaphore:
+                        async for repository in access.stream(
+                            org,
+                            perPage,
+                            first,
+                            last,
+                            OrgScanner.SORT,
+                            OrgScanner.DIRECTION,
+                        ):
+                            batch.append(RepositoryInventory.encode(repository))
+                            count += 1
+                            if len(batch) >= OrgScanner.BATCH:
+                                results.put(batch)
+                                batch = []
+                finally:
+                    if batch:
+                        results.put(batch)
+                    results.put(None)
+                return count
+
+            counts = await asyncio.gather(*[scan(*shard) for shard in shards])
+        return sum(counts)
+
+    def lines(self, orgs: Iterable[str]) -> Iterator[str]:
+        """
+        Lists the repositories of some organizations, as encoded inventory lines,
+        in the order the workers send them.
+        :param orgs: The organizations.
+        :type orgs: Iterable[str]
+        :return: The lines.
+        :rtype: Iterator[str]
+        :raise GithubApiError: If any organization or shard can't be listed.
+        :raise RuntimeError: If called from a running event loop.
+        """
+        self._blocking("lines")
+        context = multiprocessing.get_context(self._mp_context)
+        # Counting and scanning draw from the same budget.
+        bucket = self._bucket(context)
+        shards = asyncio.run(self._shards(orgs, bucket))
+        if not shards:
+            return
+        results = context.Queue()
+        workers = min(self._processes, len(shards))
+        assignments = [shards[index::workers] for index in range(workers)]
+        pending = len(shards)
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=context,
+            initializer=OrgScanner._initialize,
+            initargs=(bucket, results),
+        ) as pool:
+            futures = [
+                pool.submit(
+                    OrgScanner._work,
+                    assignment,
+                    self._token,
+                    self._api_url,
+                    self._per_page,
+                    self._concurrency,
+                )
+                for assignment in assignments
+            ]
+            try:
+                while pending:
+                    try:
+                        batch = results.get(timeout=0.5)
+                    except queues.Empty:
+                        # A worker that died never sends its end markers.
+                        for future in futures:
+                            if future.done() and future.exception() is not None:
+                                raise future.exception()
+                        continue
+                    if batch is None:
+                        pending -= 1
+                    else:
+                        yield from batch
+                for future in futures:
+                    future.result()
+            finally:
+                # Workers can't exit while their queued records are unread.
+                while pending:
+                    try:
+                        if results.get(timeout=0.5) is None:
+                            pending -= 1
+                    except queues.Empty:
+                        if all(future.done() for future in futures):
+                            break
+
+    def repositories(self, orgs: Iterable[str]) -> Iterator[Repository]:
+        """
+        Lists the repositories of some organizations.
+        :param orgs: The organizations.
+        :type orgs: Iterable[str]
+        :return: The repositories.
+        :rtype: Iterator[pythoneda.shared.git.github.Repository]
+        :raise GithubApiError: If any organization or shard can't be listed.
+        :raise RuntimeError: If called from a running event loop.
+        """
+        self._blocking("repositories")
+        for line in self.lines(orgs):
+            yield RepositoryInventory.decode(line)
+
+    def scan_to(self, inventory: RepositoryInventory, orgs: Iterable[str]) -> int:
+        """
+        Writes the repositories of some organizations to an inventory, without
+        decoding them in this process.
+        :param inventory: The inventory.
+        :type inventory: pythoneda.shared.git.github.RepositoryInventory
+        :param orgs: The organizations.
+        :type orgs: Iterable[str]
+        :return: The number of repositories written.
+        :rtype: int
+        :raise GithubApiError: If any organization or shard can't be listed.
+        The inventory is left as it was then.
+        :raise RuntimeError: If called from a running event loop.
+        """
+        self._blocking("scan_to")
+        return inventory.write_encoded(self.lines(orgs))
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
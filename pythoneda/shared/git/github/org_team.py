@@ -0,0 +1,206 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/org_team.py
+
+This file defines the OrgTeam class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared import attribute, primary_key_attribute, ValueObject
+from typing import Dict, Union
+
+
+class OrgTeam(ValueObject):
+    """
+    Represents a team of a Github organization.
+
+    Class name: OrgTeam
+
+    Responsibilities:
+        - Hold the attributes of a team, including its parent.
+
+    Collaborators:
+        - pythoneda.shared.git.github.Team: Retrieves teams.
+        - pythoneda.shared.git.github.TeamHierarchy: Indexes teams by parent.
+    """
+
+    def __init__(
+        self,
+        org: str,
+        slug: str,
+        id: int,
+        name: str,
+        description: Union[str, None] = None,
+        privacy: Union[str, None] = None,
+        permission: Union[str, None] = None,
+        parentSlug: Union[str, None] = None,
+        parentId: Union[int, None] = None,
+    ):
+        """
+        Creates a new OrgTeam instance.
+        :param org: The name of the organization.
+        :type org: str
+        :param slug: The team slug.
+        :type slug: str
+        :param id: The team id.
+        :type id: int
+        :param name: The team name.
+        :type name: str
+        :param description: The team description.
+        :type description: Union[str, None]
+        :param privacy: Either "secret" or "closed".
+        :type privacy: Union[str, None]
+        :param permission: The default permission of the team on new repositories.
+        :type permission: Union[str, None]
+        :param parentSlug: The slug of the parent team, if any.
+        :type parentSlug: Union[str, None]
+        :param parentId: The id of the parent team, if any.
+        :type parentId: Union[int, None]
+        """
+        super().__init__()
+        self._org = org
+        self._slug = slug
+        self._id = id
+        self._name = name
+        self._description = description
+        self._privacy = privacy
+        self._permission = permission
+        self._parent_slug = parentSlug
+        self._parent_id = parentId
+
+    @classmethod
+    def from_github(cls, org: str, payload: Dict) -> "OrgTeam":
+        """
+        Builds an OrgTeam from its Github API representation.
+        :param org: The name of the organization.
+        :type org: str
+        :param payload: The team, as returned by the Github API.
+        :type payload: Dict
+        :return: The team.
+        :rtype: pythoneda.shared.git.github.OrgTeam
+        """
+        parent = payload.get("parent", None) or {}
+        return cls(
+            org,
+            payload.get("slug", None),
+            payload.get("id", None),
+            payload.get("name", None),
+            payload.get("description", None),
+            payload.get("privacy", None),
+            payload.get("permission", None),
+            parent.get("slug", None),
+            parent.get("id", None),
+        )
+
+    @property
+    @primary_key_attribute
+    def org(self) -> str:
+        """
+        Retrieves the organization name.
+        :return: Such name.
+        :rtype: str
+        """
+        return self._org
+
+    @property
+    @primary_key_attribute
+    def slug(self) -> str:
+        """
+        Retrieves the team slug.
+        :return: Such slug.
+        :rtype: str
+        """
+        return self._slug
+
+    @property
+    @attribute
+    def id(self) -> int:
+        """
+        Retrieves the team id.
+        :return: Such id.
+        :rtype: int
+        """
+        return self._id
+
+    @property
+    @attribute
+    def name(self) -> str:
+        """
+        Retrieves the team name.
+        :return: Such name.
+        :rtype: str
+        """
+        return self._name
+
+    @property
+    @attribute
+    def description(self) -> Union[str, None]:
+        """
+        Retrieves the team description.
+        :return: Such description.
+        :rtype: Union[str, None]
+        """
+        return self._description
+
+    @property
+    @attribute
+    def privacy(self) -> Union[str, None]:
+        """
+        Retrieves the team privacy.
+        :return: Either "secret" or "closed".
+        :rtype: Union[str, None]
+        """
+        return self._privacy
+
+    @property
+    @attribute
+    def permission(self) -> Union[str, None]:
+        """
+        Retrieves the default permission of the team.
+        :return: Such permission.
+        :rtype: Union[str, None]
+        """
+        return self._permission
+
+    @property
+    @attribute
+    def parent_slug(self) -> Union[str, None]:
+        """
+        Retrieves the slug of the parent team.
+        :return: Such slug, or None for top-level teams.
+        :rtype: Union[str, None]
+        """
+        return self._parent_slug
+
+    @property
+    @attribute
+    def parent_id(self) -> Union[int, None]:
+        """
+        Retrieves the id of the parent team.
+        :return: Such id, or None for top-level teams.
+        :rtype: Union[int, None]
+        """
+        return self._parent_id
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,133 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/recording_transport.py
+
+This file defines the RecordingTransport class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .cassette import Cassette
+from contextlib import asynccontextmanager
+from .transport import Transport
+from .transport_response import TransportResponse
+import time
+from typing import Dict, Tuple, Type, Union
+
+
+class RecordingTransport(Transport):
+    """
+    Records every exchange of another transport into a cassette.
+
+    Class name: RecordingTransport
+
+    Responsibilities:
+        - Forward requests to the wrapped transport.
+        - Write each request and its full response, with headers and latency, to a cassette.
+
+    Collaborators:
+        - pythoneda.shared.git.github.Transport: The wrapped transport.
+        - pythoneda.shared.git.github.Cassette: Where exchanges are written.
+    """
+
+    def __init__(self, transport: Transport, path: str):
+        """
+        Creates a new RecordingTransport instance.
+        :param transport: The transport to record.
+        :type transport: pythoneda.shared.git.github.Transport
+        :param path: The cassette file. New exchanges are appended to it.
+        :type path: str
+        """
+        super().__init__()
+        self._transport = transport
+        self._cassette = Cassette(path)
+
+    @property
+    def transport(self) -> Transport:
+        """
+        Retrieves the wrapped transport.
+        :return: Such transport.
+        :rtype: pythoneda.shared.git.github.Transport
+        """
+        return self._transport
+
+    @property
+    def transient_errors(self) -> Tuple[Type[BaseException], ...]:
+        """
+        Retrieves the errors of the wrapped transport worth retrying a request for.
+        :return: Such error types.
+        :rtype: Tuple[Type[BaseException], ...]
+        """
+        return self._transport.transient_errors
+
+    @property
+    def cassette(self) -> Cassette:
+        """
+        Retrieves the cassette.
+        :return: Such cassette.
+        :rtype: pythoneda.shared.git.github.Cassette
+        """
+        return self._cassette
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Union[Dict[str, str], None] = None,
+        data: Union[bytes, None] = None,
+    ):
+        """
+        Sends a request through the wrapped transport, and records it.
+        The whole body is read before yielding the response, so it can be recorded.
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The url.
+        :type url: str
+        :param headers: The request headers.
+        :type headers: Union[Dict[str, str], None]
+        :param data: The request body.
+        :type data: Union[bytes, None]
+        :return: An async context manager yielding the response.
+        :rtype: AsyncContextManager[pythoneda.shared.git.github.TransportResponse]
+        """
+        start = time.perf_counter()
+        async with self._transport.request(method, url, headers, data) as response:
+            body = await response.read()
+            status = response.status
+            response_headers = list(response.headers.items())
+            response_url = response.url
+        latency = time.perf_counter() - start
+        self._cassette.append(
+            method, url, headers, data, status, response_headers, body, latency
+        )
+        yield TransportResponse(status, response_headers, body, response_url)
+
+    async def close(self):
+        """
+        Closes the cassette and the wrapped transport.
+        """
+        self._cassette.close()
+        await self._transport.close()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,193 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/replay_transport.py
+
+This file defines the ReplayTransport class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from .cassette import Cassette
+from collections import deque
+from contextlib import asynccontextmanager
+from .transport import Transport
+from .transport_response import TransportResponse
+from typing import Dict, Tuple, Union
+
+
+class ReplayTransport(Transport):
+    """
+    Serves recorded responses from a cassette, without any network.
+
+    Class name: ReplayTransport
+
+    Responsibilities:
+        - Match each request with the next recorded response for the same method, path, query, body and conditional headers.
+        - Read the cassette as requests arrive, holding only the exchanges recorded ahead of them.
+        - Optionally reproduce the recorded latencies, scaled.
+
+    Collaborators:
+        - pythoneda.shared.git.github.Cassette: Where exchanges are read from.
+    """
+
+    def __init__(self, path: str, timeScale: float = 0.0, lookAhead: int = 10000):
+        """
+        Creates a new ReplayTransport instance.
+        :param path: The cassette file.
+        :type path: str
+        :param timeScale: The factor applied to recorded latencies. 0 replays at
+        full speed, 1 in real time, 0.5 twice as fast.
+        :type timeScale: float
+        :param lookAhead: How many exchanges, recorded before the one a request
+        matches, can be held in memory until their own requests arrive.
+        :type lookAhead: int
+        """
+        super().__init__()
+        self._cassette = Cassette(path)
+        self._time_scale = timeScale
+        self._look_ahead = lookAhead
+        # The recorded lines not read yet, opened on the first request.
+        self._lines = None
+        # key -> exchanges read past while looking for another request's, in order.
+        self._ahead = {}
+        self._ahead_count = 0
+        self._served = 0
+        self._recorded = None
+
+    @property
+    def cassette(self) -> Cassette:
+        """
+        Retrieves the cassette.
+        :return: Such cassette.
+        :rtype: pythoneda.shared.git.github.Cassette
+        """
+        return self._cassette
+
+    @property
+    def time_scale(self) -> float:
+        """
+        Retrieves the factor applied to recorded latencies.
+        :return: Such factor.
+        :rtype: float
+        """
+        return self._time_scale
+
+    @property
+    def served(self) -> int:
+        """
+        Retrieves how many recorded exchanges have been served.
+        :return: Such count.
+        :rtype: int
+        """
+        return self._served
+
+    @property
+    def held(self) -> int:
+        """
+        Retrieves how many exchanges are held in memory, read ahead of their requests.
+        :return: Such count.
+        :rtype: int
+        """
+        return self._ahead_count
+
+    @property
+    def pending(self) -> int:
+        """
+        Retrieves how many recorded exchanges haven't been served yet.
+        The first call counts the exchanges, reading the cassette through once.
+        :return: Such count.
+        :rtype: int
+        """
+        if self._recorded is None:
+            self._recorded = sum(1 for _ in self._cassette.lines())
+        return self._recorded - self._served
+
+    def _next(self, key: Tuple[str, str, str, str]) -> Dict:
+        """
+        Retrieves the next recorded exchange for a request, reading the
+        cassette forward if it's not among those read ahead.
+        :param key: The key of the request.
+        :type key: Tuple[str, str, str, str]
+        :return: The exchange, as decoded.
+        :rtype: Dict
+        """
+        entries = self._ahead.get(key, None)
+        if entries:
+            entry = entries.popleft()
+            if not entries:
+                del self._ahead[key]
+            self._ahead_count -= 1
+            return entry
+        if self._lines is None:
+            self._lines = self._cassette.lines()
+        while self._ahead_count < self._look_ahead:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            entry = Cassette.decode(line)
+            entry_key = Cassette.key_of(entry)
+            if entry_key == key:
+                return entry
+            self._ahead.setdefault(entry_key, deque()).append(entry)
+            self._ahead_count += 1
+        raise LookupError(f"No recorded exchange for {key[0]} {key[1]}")
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Union[Dict[str, str], None] = None,
+        data: Union[bytes, None] = None,
+    ):
+        """
+        Serves the recorded response for a request. Each recorded exchange is
+        served once; exchanges recorded several times for the same request
+        are served in order.
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The url.
+        :type url: str
+        :param headers: The request headers.
+        :type headers: Union[Dict[str, str], None]
+        :param data: The request body.
+        :type data: Union[bytes, None]
+        :return: An async context manager yielding the response.
+        :rtype: AsyncContextManager[pythoneda.shared.git.github.TransportResponse]
+        """
+        entry = self._next(Cassette.key(method, url, data, headers))
+        self._served += 1
+        if self._time_scale > 0:
+            await asyncio.sleep(entry["l"] * self._time_scale)
+        yield TransportResponse(entry["s"], entry["h"], entry["body"], url)
+
+    async def close(self):
+        """
+        Closes the cassette, if it was being read.
+        """
+        if self._lines is not None:
+            self._lines.close()
+            self._lines = None
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
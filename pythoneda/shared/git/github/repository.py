@@ -397,6 +397,83 @@ class Repository(GitRepo):
         """
         return self._custom_properties
 
+    @classmethod
+    def from_github(
+        cls, org: str, payload: Dict, name: Union[str, None] = None
+    ) -> "Repository":
+        """
+        Builds a Repository from its Github API representation.
+        :param org: The name of the organization.
+        :type org: str
+        :param payload: The repository, as returned by the Github API.
+        :type payload: Dict
+        :param name: The name of the repository. Defaults to the one in the payload.
+        :type name: Union[str, None]
+        :return: The repository instance.
+        :rtype: pythoneda.shared.git.github.Repository
+        """
+        return cls(
+            org,
+            name if name is not None else payload.get("name", None),
+            payload.get("description", None),
+            payload.get("homepage", None),
+            payload.get("private", False),
+            payload.get("visibility", False),
+            payload.get("has_issues", False),
+            payload.get("has_wiki", False),
+            payload.get("has_downloads", False),
+            payload.get("has_projects", False),
+            payload.get("team_id", None),
+            payload.get("auto_init", None),
+            payload.get("license_template", None),
+            payload.get("gitignore_template", None),
+            payload.get("allow_squash_merge", False),
+            payload.get("allow_merge_commit", False),
+            payload.get("allow_rebase_merge", False),
+            payload.get("allow_auto_merge", False),
+            payload.get("delete_branch_on_merge", None),
+            payload.get("use_squash_pr_title_as_default", None),
+            payload.get("squash_merge_commit_title", None),
+            payload.get("squash_merge_commit_message", None),
+            payload.get("merge_commit_title", None),
+            payload.get("merge_commit_message", None),
+            payload.get("custom_properties", {}),
+        )
+
+    def to_github(self) -> Dict:
+        """
+        Builds the Github API representation of this repository, plus its organization.
+        :return: Such representation, in Github's snake_case field names.
+        :rtype: Dict
+        """
+        return {
+            "org": self._org,
+            "name": self._name,
+            "description": self._description,
+            "homepage": self._homepage,
+            "private": self._private,
+            "visibility": self._visibility,
+            "has_issues": self._has_issues,
+            "has_wiki": self._has_wiki,
+            "has_downloads": self._has_downloads,
+            "has_projects": self._has_projects,
+            "team_id": self._team_id,
+            "auto_init": self._auto_init,
+            "license_template": self._license_template,
+            "gitignore_template": self._gitignore_template,
+            "allow_squash_merge": self._allow_squash_merge,
+            "allow_merge_commit": self._allow_merge_commit,
+            "allow_rebase_merge": self._allow_rebase_merge,
+            "allow_auto_merge": self._allow_auto_merge,
+            "delete_branch_on_merge": self._delete_branch_on_merge,
+            "use_squash_pr_title_as_default": self._use_squash_pr_title_as_default,
+            "squash_merge_commit_title": self._squash_merge_commit_title,
+            "squash_merge_commit_message": self._squash_merge_commit_message,
+            "merge_commit_title": self._merge_commit_title,
+            "merge_commit_message": self._merge_commit_message,
+            "custom_properties": self._custom_properties,
+        }
+
     async def renamed_to(self, newName: str) -> bool:
         """
         Checks if this repository has been renamed.
@@ -19,15 +19,22 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
-import aiohttp
-import asyncio
+from .github_api_error import GithubApiError
+from .github_client import GithubClient
 import json
-from pythoneda.shared import attribute, BaseObject, sensitive
+from .metrics import GithubMetrics
+from pythoneda.shared import attribute, sensitive
 from .repository import Repository
-from typing import Dict, Union
+from .repository_cache import RepositoryCache
+from .transport import Transport
+from typing import AsyncIterator, Dict, TYPE_CHECKING, Union
+from urllib.parse import parse_qs, urlsplit
 
+if TYPE_CHECKING:
+    import asyncio
 
-class RepositoryAccess(BaseObject):
+
+class RepositoryAccess(GithubClient):
     """
     Interacts with the /orgs/[org]/repos endpoint of github API.
 
@@ -37,17 +44,36 @@ class RepositoryAccess(BaseObject):
         - Know how to use the github API to access repositories.
 
     Collaborators:
-        - None
+        - pythoneda.shared.git.github.GithubClient: Sends and tracks the requests.
+        - pythoneda.shared.git.github.RepositoryCache: Optionally keeps fetched repositories.
     """
 
-    def __init__(self, token: str):
+    def __init__(
+        self,
+        token: str,
+        metrics: Union[GithubMetrics, None] = None,
+        apiUrl: str = "https://api.github.com",
+        transport: Union[Transport, None] = None,
+        cache: Union[RepositoryCache, None] = None,
+    ):
         """
         Creates a new RepositoryAccess instance.
         :param token: The Github token.
         :type token: str
+        :param metrics: The metrics to report requests to, if any.
+        :type metrics: Union[pythoneda.shared.git.github.GithubMetrics, None]
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param transport: How to send requests. Defaults to the network, via aiohttp.
+        :type transport: Union[pythoneda.shared.git.github.Transport, None]
+        :param cache: Where to keep fetched repositories, to revalidate them
+        with conditional requests and serve them while stale, if anywhere.
+        :type cache: Union[pythoneda.shared.git.github.RepositoryCache, None]
         """
-        super().__init__()
-        self._token = token
+        super().__init__(token, metrics, apiUrl, transport)
+        self._cache = cache
+        # (org, name) -> revalidation in progress
+        self._revalidations = {}
 
     @property
     @attribute
@@ -60,61 +86,120 @@ class RepositoryAccess(BaseObject):
         """
         return self._token
 
-    async def fetch(self, org: str, name: str) -> Repository:
+    @property
+    def cache(self) -> Union[RepositoryCache, None]:
+        """
+        Retrieves the cache of fetched repositories.
+        :return: Such cache, if any.
+        :rtype: Union[pythoneda.shared.git.github.RepositoryCache, None]
+        """
+        return self._cache
+
+    async def fetch(
+        self, org: str, name: str, staleWhileRevalidate: bool = False
+    ) -> Repository:
         """
         Retrieves a Github repository.
+        With a cache, cached repositories are revalidated with a conditional
+        request, which Github doesn't charge against the rate limit when the
+        repository is unchanged.
         :param org: The name of the organization.
         :type org: str
         :param name: The name of the repository.
         :type name: str
+        :param staleWhileRevalidate: Whether to answer straight from the cache
+        while the entry is within its staleness window, revalidating it in the
+        background once past its soft TTL. Only misses and expired entries wait
+        for Github. It requires a cache.
+        :type staleWhileRevalidate: bool
         :return: The repository instance.
         :rtype: pythoneda.shared.git.github.Repository
         """
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"token {self.token.get()}",
-                "Content-Type": "application/json",
-            }
-            url = f"https://api.github.com/repos/{org}/{name}"
+        if self._cache is None or not staleWhileRevalidate:
+            return await self._validate(org, name)
 
-            result = None
+        cached = self._cache.get(org, name)
+        hit = cached is not None and cached[2] != RepositoryCache.EXPIRED
+        if self._metrics is not None:
+            self._metrics.observe_cache("repositories", hit)
+        if hit:
+            if cached[2] == RepositoryCache.STALE:
+                self._revalidate(org, name)
+            return cached[0]
+        import asyncio
 
-            async with session.get(url, headers=headers) as response:
-                json_response = await response.json()
-                bad_credentials = (
-                    json_response.get("message", None) == "Bad credentials"
-                )
-                # print(json_response)
-                if response.status in [200, 201] and not bad_credentials:
-                    result = Repository(
-                        org,
-                        name,
-                        json_response.get("description", None),
-                        json_response.get("homepage", None),
-                        json_response.get("private", False),
-                        json_response.get("visibility", False),
-                        json_response.get("has_issues", False),
-                        json_response.get("has_wiki", False),
-                        json_response.get("has_downloads", False),
-                        json_response.get("has_projects", False),
-                        json_response.get("team_id", None),
-                        json_response.get("auto_init", None),
-                        json_response.get("license_template", None),
-                        json_response.get("gitignore_template", None),
-                        json_response.get("allow_squash_merge", False),
-                        json_response.get("allow_merge_commit", False),
-                        json_response.get("allow_rebase_merge", False),
-                        json_response.get("allow_auto_merge", False),
-                        json_response.get("delete_branch_on_merge", None),
-                        json_response.get("use_squash_pr_title_as_default", None),
-                        json_response.get("squash_merge_commit_title", None),
-                        json_response.get("squash_merge_commit_message", None),
-                        json_response.get("merge_commit_title", None),
-                        json_response.get("merge_commit_message", None),
-                        json_response.get("custom_properties", {}),
-                    )
-
-            return result
+        # Shielded, so that a cancelled caller doesn't cancel the others waiting on it.
+        return await asyncio.shield(self._revalidate(org, name))
+
+    def _revalidate(self, org: str, name: str) -> "asyncio.Future":
+        """
+        Revalidates a repository in the background, unless it's already being revalidated.
+        :param org: The name of the organization.
+        :type org: str
+        :param name: The name of the repository.
+        :type name: str
+        :return: The revalidation in progress.
+        :rtype: asyncio.Future
+        """
+        import asyncio
+
+        key = (org, name)
+        task = self._revalidations.get(key, None)
+        if task is None:
+            task = asyncio.ensure_future(self._validate(org, name))
+            self._revalidations[key] = task
+
+            def done(task: "asyncio.Future"):
+                self._revalidations.pop(key, None)
+                # Nobody may be awaiting a background revalidation; a failed
+                # one leaves the stale entry in place, to be retried later.
+                if not task.cancelled():
+                    task.exception()
+
+            task.add_done_callback(done)
+        return task
+
+    async def _validate(self, org: str, name: str) -> Repository:
+        """
+        Retrieves a Github repository, conditionally if it's cached, and
+        updates the cache.
+        :param org: The name of the organization.
+        :type org: str
+        :param name: The name of the repository.
+        :type name: str
+        :return: The repository instance.
+        :rtype: pythoneda.shared.git.github.Repository
+        """
+        headers = {
+            "Authorization": f"token {self.token.get()}",
+            "Content-Type": "application/json",
+        }
+        url = f"{self.api_url}/repos/{org}/{name}"
+        cached = self._cache.get(org, name) if self._cache is not None else None
+        if cached is not None and cached[1]:
+            headers["If-None-Match"] = cached[1]
+
+        result = None
+
+        async with self._track("GET", "/repos/{org}/{name}") as observe:
+            async with self.transport.request("GET", url, headers) as response:
+                observe(response.status, response.headers)
+                if response.status == 304 and cached is not None:
+                    self._cache.touch(org, name)
+                    return cached[0]
+                body = await response.read()
+                etag = response.headers.get("ETag", None)
+            json_response = json.loads(body) if body else {}
+            bad_credentials = json_response.get("message", None) == "Bad credentials"
+            # print(json_response)
+            if response.status in [200, 201] and not bad_credentials:
+                result = Repository.from_github(org, json_response, name)
+                if self._cache is not None:
+                    self._cache.put(org, name, result, etag, len(body))
+            elif response.status == 404 and self._cache is not None:
+                self._cache.discard(org, name)
+
+        return result
 
     async def create(
         self,
@@ -201,77 +286,76 @@ class RepositoryAccess(BaseObject):
         :return: The repository instance.
         :rtype: pythoneda.shared.git.github.Repository
         """
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"token {self.token.get()}",
-                "Content-Type": "application/json",
-            }
-            url = f"https://api.github.com/orgs/{org}/repos"
-            data = {
-                "name": name,
-                "description": description,
-                "private": private,
-                "visibility": visibility,
-                "hasIssues": hasIssues,
-                "hasWiki": hasWiki,
-                "hasDownloads": hasDownloads,
-                "hasProjects": hasProjects,
-                "teamId": teamId,
-                "autoInit": autoInit,
-                "licenseTemplate": licenseTemplate,
-                "gitignoreTemplate": gitignoreTemplate,
-                "allowSquashMerge": allowSquashMerge,
-                "allowMergeCommit": allowMergeCommit,
-                "allowRebaseMerge": allowRebaseMerge,
-                "allowAutoMerge": allowAutoMerge,
-                "deleteBranchOnMerge": deleteBranchOnMerge,
-                "useSquashPrTitleAsDefault": useSquashPrTitleAsDefault,
-                "squashMergeCommitTitle": squashMergeCommitTitle,
-                "squashMergeCommitMessage": squashMergeCommitMessage,
-                "mergeCommitTitle": mergeCommitTitle,
-                "mergeCommitMessage": mergeCommitMessage,
-                "customProperties": customProperties,
-            }
-
-            result = None
-
-            async with session.post(
-                url, headers=headers, data=json.dumps(data)
+        headers = {
+            "Authorization": f"token {self.token.get()}",
+            "Content-Type": "application/json",
+        }
+        url = f"{self.api_url}/orgs/{org}/repos"
+        data = {
+            "name": name,
+            "description": description,
+            "private": private,
+            "visibility": visibility,
+            "hasIssues": hasIssues,
+            "hasWiki": hasWiki,
+            "hasDownloads": hasDownloads,
+            "hasProjects": hasProjects,
+            "teamId": teamId,
+            "autoInit": autoInit,
+            "licenseTemplate": licenseTemplate,
+            "gitignoreTemplate": gitignoreTemplate,
+            "allowSquashMerge": allowSquashMerge,
+            "allowMergeCommit": allowMergeCommit,
+            "allowRebaseMerge": allowRebaseMerge,
+            "allowAutoMerge": allowAutoMerge,
+            "deleteBranchOnMerge": deleteBranchOnMerge,
+            "useSquashPrTitleAsDefault": useSquashPrTitleAsDefault,
+            "squashMergeCommitTitle": squashMergeCommitTitle,
+            "squashMergeCommitMessage": squashMergeCommitMessage,
+            "mergeCommitTitle": mergeCommitTitle,
+            "mergeCommitMessage": mergeCommitMessage,
+            "customProperties": customProperties,
+        }
+
+        result = None
+
+        async with self._track("POST", "/orgs/{org}/repos") as observe:
+            async with self.transport.request(
+                "POST", url, headers, json.dumps(data).encode("utf-8")
             ) as response:
+                observe(response.status, response.headers)
                 json_response = await response.json()
-                bad_credentials = (
-                    json_response.get("message", None) == "Bad credentials"
+            bad_credentials = json_response.get("message", None) == "Bad credentials"
+            if response.status in [200, 201] and not bad_credentials:
+                result = Repository(
+                    org,
+                    name,
+                    description,
+                    homepage,
+                    private,
+                    visibility,
+                    hasIssues,
+                    hasWiki,
+                    hasDownloads,
+                    hasProjects,
+                    teamId,
+                    autoInit,
+                    licenseTemplate,
+                    gitignoreTemplate,
+                    allowSquashMerge,
+                    allowMergeCommit,
+                    allowRebaseMerge,
+                    allowAutoMerge,
+                    deleteBranchOnMerge,
+                    useSquashPrTitleAsDefault,
+                    squashMergeCommitTitle,
+                    squashMergeCommitMessage,
+                    mergeCommitTitle,
+                    mergeCommitMessage,
+                    customProperties,
                 )
-                if response.status in [200, 201] and not bad_credentials:
-                    result = Repository(
-                        org,
-                        name,
-                        description,
-                        homepage,
-                        private,
-                        visibility,
-                        hasIssues,
-                        hasWiki,
-                        hasDownloads,
-                        hasProjects,
-                        teamId,
-                        autoInit,
-                        licenseTemplate,
-                        gitignoreTemplate,
-                        allowSquashMerge,
-                        allowMergeCommit,
-                        allowRebaseMerge,
-                        allowAutoMerge,
-                        deleteBranchOnMerge,
-                        useSquashPrTitleAsDefault,
-                        squashMergeCommitTitle,
-                        squashMergeCommitMessage,
-                        mergeCommitTitle,
-                        mergeCommitMessage,
-                        customProperties,
-                    )
-
-            return result
+
+        return result
 
     async def rename_to(self, org: str, name: str, newName: str) -> bool:
         """
@@ -285,25 +369,103 @@ class RepositoryAccess(BaseObject):
         :return: True if the operation was successful.
         :rtype: bool
         """
-        async with aiohttp.ClientSession() as session:
-            result = False
-            headers = {
-                "Authorization": f"token {self.token.get()}",
-                "Content-Type": "application/json",
-            }
-            url = f"https://api.github.com/repos/{org}/{name}"
+        result = False
+        headers = {
+            "Authorization": f"token {self.token.get()}",
+            "Content-Type": "application/json",
+        }
+        url = f"{self.api_url}/repos/{org}/{name}"
 
-            data = {"name": newName}
+        data = {"name": newName}
 
-            async with session.patch(url, headers=headers, json=data) as response:
+        async with self._track("PATCH", "/repos/{org}/{name}") as observe:
+            async with self.transport.request(
+                "PATCH", url, headers, json.dumps(data).encode("utf-8")
+            ) as response:
+                observe(response.status, response.headers)
                 json_response = await response.json()
-                bad_credentials = (
-                    json_response.get("message", None) == "Bad credentials"
-                )
-                if response.status in [200, 201] and not bad_credentials:
-                    result = True
+            bad_credentials = json_response.get("message", None) == "Bad credentials"
+            if response.status in [200, 201] and not bad_credentials:
+                result = True
+                if self._cache is not None:
+                    self._cache.discard(org, name)
+
+        return result
+
+    async def stream(
+        self,
+        org: str,
+        perPage: int = 100,
+        firstPage: int = 1,
+        lastPage: Union[int, None] = None,
+        sort: Union[str, None] = None,
+        direction: Union[str, None] = None,
+    ) -> AsyncIterator[Repository]:
+        """
+        Retrieves all repositories of an organization, page by page.
+        Each repository is built and yielded as soon as its bytes arrive, so
+        callers start on the first ones while the rest of the page downloads,
+        and process organizations of any size holding a single repository.
+        :param org: The name of the organization.
+        :type org: str
+        :param perPage: The number of repositories per page (at most 100).
+        :type perPage: int
+        :param firstPage: The first page to retrieve.
+        :type firstPage: int
+        :param lastPage: The last page to retrieve, or None to follow all pages.
+        :type lastPage: Union[int, None]
+        :param sort: Either "created", "updated", "pushed" or "full_name", or
+        None for Github's default (newest first).
+        :type sort: Union[str, None]
+        :param direction: Either "asc" or "desc", or None for the sort's default.
+        :type direction: Union[str, None]
+        :return: The repositories.
+        :rtype: AsyncIterator[pythoneda.shared.git.github.Repository]
+        :raise GithubApiError: If any page can't be retrieved, so that a partial
+        listing is never taken for a complete one.
+        """
+        headers = {
+            "Authorization": f"token {self.token.get()}",
+            "Content-Type": "application/json",
+        }
+        url = f"{self.api_url}/orgs/{org}/repos?per_page={perPage}"
+        if sort is not None:
+            url = f"{url}&sort={sort}"
+        if direction is not None:
+            url = f"{url}&direction={direction}"
+        if firstPage > 1:
+            url = f"{url}&page={firstPage}"
+        pages = None if lastPage is None else max(lastPage - firstPage + 1, 0)
+
+        async for item in self._items(url, "/orgs/{org}/repos", headers, pages):
+            yield Repository.from_github(org, item)
+
+    async def count(self, org: str) -> int:
+        """
+        Retrieves the number of repositories of an organization, with a single
+        one-repository page whose "last" link gives away the total.
+        :param org: The name of the organization.
+        :type org: str
+        :return: Such number.
+        :rtype: int
+        :raise GithubApiError: If the organization can't be listed.
+        """
+        headers = {
+            "Authorization": f"token {self.token.get()}",
+            "Content-Type": "application/json",
+        }
+        url = f"{self.api_url}/orgs/{org}/repos?per_page=1"
 
-            return result
+        async with self._track("GET", "/orgs/{org}/repos") as observe:
+            async with self.transport.request("GET", url, headers) as response:
+                observe(response.status, response.headers)
+                if response.status != 200:
+                    raise await GithubApiError.from_response("GET", url, response)
+                last = response.link("last")
+                if last is None:
+                    return len(await response.json() or [])
+                page = parse_qs(urlsplit(last).query).get("page", ["1"])[0]
+                return int(page)
 
 
 # vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
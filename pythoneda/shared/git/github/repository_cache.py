@@ -0,0 +1,206 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/repository_cache.py
+
+This file defines the RepositoryCache class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from collections import OrderedDict
+from pythoneda.shared import BaseObject
+from .repository import Repository
+import time
+from typing import List, Tuple, Union
+
+
+class RepositoryCache(BaseObject):
+    """
+    Least-recently-used cache of repositories, bounded by entries and by bytes.
+
+    Class name: RepositoryCache
+
+    Responsibilities:
+        - Keep each repository with its ETag and the time it was last validated.
+        - Tell fresh entries from stale ones, and stale ones from expired ones.
+        - Evict the least recently used entries beyond its limits.
+
+    Collaborators:
+        - pythoneda.shared.git.github.Repository: The cached values.
+        - pythoneda.shared.git.github.RepositoryAccess: Fills and revalidates the cache.
+    """
+
+    FRESH = "fresh"
+    STALE = "stale"
+    EXPIRED = "expired"
+
+    def __init__(
+        self,
+        maxEntries: int = 10000,
+        maxBytes: int = 64 * 1024 * 1024,
+        softTtl: float = 30.0,
+        maxStale: float = 300.0,
+    ):
+        """
+        Creates a new RepositoryCache instance.
+        :param maxEntries: The maximum number of repositories kept.
+        :type maxEntries: int
+        :param maxBytes: The maximum size of the repositories kept, measured
+        as the size of their Github API responses.
+        :type maxBytes: int
+        :param softTtl: For how long, in seconds, an entry is served without revalidation.
+        :type softTtl: float
+        :param maxStale: For how long, in seconds, an entry is served while
+        it's revalidated in the background. Older entries wait for Github.
+        :type maxStale: float
+        """
+        super().__init__()
+        self._max_entries = maxEntries
+        self._max_bytes = maxBytes
+        self._soft_ttl = softTtl
+        self._max_stale = maxStale
+        # (org, name) -> [repository, etag, validated at, size]
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def soft_ttl(self) -> float:
+        """
+        Retrieves for how long an entry is served without revalidation.
+        :return: Such time, in seconds.
+        :rtype: float
+        """
+        return self._soft_ttl
+
+    @property
+    def max_stale(self) -> float:
+        """
+        Retrieves for how long an entry is served while it's revalidated.
+        :return: Such time, in seconds.
+        :rtype: float
+        """
+        return self._max_stale
+
+    @property
+    def size(self) -> int:
+        """
+        Retrieves the size of the cached repositories.
+        :return: Such size, in bytes.
+        :rtype: int
+        """
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, org: str, name: str, now: Union[float, None] = None
+    ) -> Union[Tuple[Repository, Union[str, None], str], None]:
+        """
+        Retrieves a repository, marking it as recently used.
+        :param org: The name of the organization.
+        :type org: str
+        :param name: The name of the repository.
+        :type name: str
+        :param now: The current monotonic time, if already known.
+        :type now: Union[float, None]
+        :return: The repository, its ETag and its state (FRESH, STALE or
+        EXPIRED), or None if it's not cached.
+        :rtype: Union[Tuple[pythoneda.shared.git.github.Repository, Union[str, None], str], None]
+        """
+        entry = self._entries.get((org, name), None)
+        if entry is None:
+            return None
+        self._entries.move_to_end((org, name))
+        age = (time.monotonic() if now is None else now) - entry[2]
+        if age <= self._soft_ttl:
+            state = self.FRESH
+        elif age <= self._max_stale:
+            state = self.STALE
+        else:
+            state = self.EXPIRED
+        return entry[0], entry[1], state
+
+    def put(
+        self,
+        org: str,
+        name: str,
+        repository: Repository,
+        etag: Union[str, None],
+        size: int,
+    ):
+        """
+        Stores a repository just validated, evicting others if needed.
+        :param org: The name of the organization.
+        :type org: str
+        :param name: The name of the repository.
+        :type name: str
+        :param repository: The repository.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param etag: Its ETag, if any.
+        :type etag: Union[str, None]
+        :param size: The size of its Github API response.
+        :type size: int
+        """
+        self.discard(org, name)
+        if size > self._max_bytes:
+            return
+        self._entries[(org, name)] = [repository, etag, time.monotonic(), size]
+        self._bytes += size
+        while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted[3]
+
+    def touch(self, org: str, name: str):
+        """
+        Marks a repository as just validated, after Github answered it's unchanged.
+        :param org: The name of the organization.
+        :type org: str
+        :param name: The name of the repository.
+        :type name: str
+        """
+        entry = self._entries.get((org, name), None)
+        if entry is not None:
+            entry[2] = time.monotonic()
+
+    def discard(self, org: str, name: str):
+        """
+        Removes a repository.
+        :param org: The name of the organization.
+        :type org: str
+        :param name: The name of the repository.
+        :type name: str
+        """
+        entry = self._entries.pop((org, name), None)
+        if entry is not None:
+            self._bytes -= entry[3]
+
+    def keys(self) -> List[Tuple[str, str]]:
+        """
+        Retrieves the cached repositories, least recently used first.
+        :return: Their organization and name.
+        :rtype: List[Tuple[str, str]]
+        """
+        return list(self._entries)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,329 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/repository_inventory.py
+
+This file defines the RepositoryInventory class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import contextlib
+import gzip
+import io
+import itertools
+import json
+import os
+from pythoneda.shared import BaseObject
+from .repository import Repository
+from typing import AsyncIterable, Iterable, Iterator, IO, Union
+
+
+class RepositoryInventory(BaseObject):
+    """
+    A snapshot of repositories, stored as newline-delimited JSON.
+
+    Class name: RepositoryInventory
+
+    Responsibilities:
+        - Write repositories one line at a time, as they arrive, optionally gzip- or zstd-compressed.
+        - Read them back lazily, one Repository at a time.
+        - Feed a snapshot back into Github, creating its repositories.
+
+    Collaborators:
+        - pythoneda.shared.git.github.Repository: The records.
+        - pythoneda.shared.git.github.RepositoryAccess: Lists and creates repositories.
+    """
+
+    COMPRESSIONS = (None, "gzip", "zstd")
+
+    # The number of records written at once, off the event loop.
+    BATCH = 500
+
+    def __init__(self, path: str, compression: Union[str, None] = "auto"):
+        """
+        Creates a new RepositoryInventory instance.
+        :param path: The path of the NDJSON file.
+        :type path: str
+        :param compression: None, "gzip", "zstd", or "auto" to infer it from
+        the file suffix (.gz, .zst).
+        :type compression: Union[str, None]
+        """
+        super().__init__()
+        if compression == "auto":
+            if path.endswith(".gz"):
+                compression = "gzip"
+            elif path.endswith(".zst"):
+                compression = "zstd"
+            else:
+                compression = None
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self._path = path
+        self._compression = compression
+
+    @property
+    def path(self) -> str:
+        """
+        Retrieves the path of the NDJSON file.
+        :return: Such path.
+        :rtype: str
+        """
+        return self._path
+
+    @property
+    def compression(self) -> Union[str, None]:
+        """
+        Retrieves the compression of the file.
+        :return: None, "gzip" or "zstd".
+        :rtype: Union[str, None]
+        """
+        return self._compression
+
+    def _open(self, mode: str, path: Union[str, None] = None) -> IO[str]:
+        """
+        Opens the file as text, (de)compressing on the fly.
+        :param mode: Either "r" or "w".
+        :type mode: str
+        :param path: The file to open, if not the inventory's own.
+        :type path: Union[str, None]
+        :return: The text stream.
+        :rtype: IO[str]
+        """
+        if path is None:
+            path = self._path
+        if self._compression == "gzip":
+            # gzip's default level 9 costs far more CPU than it saves on JSON.
+            return gzip.open(path, f"{mode}t", encoding="utf-8", compresslevel=6)
+        if self._compression == "zstd":
+            # zstandard is an optional dependency, only needed for .zst inventories.
+            import zstandard
+
+            raw = open(path, f"{mode}b")
+            if mode == "w":
+                stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+            else:
+                stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+            return io.TextIOWrapper(stream, encoding="utf-8")
+        return open(path, mode, encoding="utf-8")
+
+    @contextlib.contextmanager
+    def _replace(self) -> Iterator[IO[str]]:
+        """
+        Opens a file aside for writing, and moves it over the inventory only once
+        complete, so a failed write never leaves a truncated inventory behind.
+        :return: The text stream.
+        :rtype: Iterator[IO[str]]
+        """
+        partial = f"{self._path}.part"
+        try:
+            with self._open("w", partial) as output:
+                yield output
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(partial)
+            raise
+        os.replace(partial, self._path)
+
+    @staticmethod
+    def encode(repository: Repository) -> str:
+        """
+        Encodes a repository as a single JSON line.
+        :param repository: The repository.
+        :type repository: pythoneda.shared.git.github.Repository
+        :return: The line, including the trailing newline.
+        :rtype: str
+        """
+        return json.dumps(repository.to_github(), separators=(",", ":")) + "\n"
+
+    @staticmethod
+    def decode(line: str) -> Repository:
+        """
+        Decodes a JSON line into a repository.
+        :param line: The line.
+        :type line: str
+        :return: The repository.
+        :rtype: pythoneda.shared.git.github.Repository
+        """
+        record = json.loads(line)
+        return Repository.from_github(record.pop("org"), record)
+
+    def write(self, repositories: Iterable[Repository]) -> int:
+        """
+        Writes repositories, replacing the file contents.
+        :param repositories: The repositories.
+        :type repositories: Iterable[pythoneda.shared.git.github.Repository]
+        :return: The number of repositories written.
+        :rtype: int
+        """
+        return self.write_encoded(
+            self.encode(repository) for repository in repositories
+        )
+
+    def write_encoded(self, lines: Iterable[str]) -> int:
+        """
+        Writes already encoded repositories, replacing the file contents.
+        :param lines: The lines, as produced by encode().
+        :type lines: Iterable[str]
+        :return: The number of repositories written.
+        :rtype: int
+        """
+        count = 0
+        with self._replace() as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        return count
+
+    async def export(self, repositories: AsyncIterable[Repository]) -> int:
+        """
+        Writes repositories as they arrive, replacing the file contents once
+        all of them are written. Nothing but a batch of encoded records is kept
+        in memory, and batches are written, and compressed, in a worker thread.
+        :param repositories: The repositories.
+        :type repositories: AsyncIterable[pythoneda.shared.git.github.Repository]
+        :return: The number of repositories written.
+        :rtype: int
+        """
+        loop = asyncio.get_running_loop()
+        count = 0
+        with self._replace() as output:
+            batch = []
+            async for repository in repositories:
+                batch.append(self.encode(repository))
+                if len(batch) >= self.BATCH:
+                    await loop.run_in_executor(None, output.writelines, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                await loop.run_in_executor(None, output.writelines, batch)
+                count += len(batch)
+        return count
+
+    async def export_org(self, access, org: str) -> int:
+        """
+        Writes all repositories of an organization, straight from its paginated
+        listing. If any page fails, the error is raised and the file is left as it was.
+        :param access: The repository access.
+        :type access: pythoneda.shared.git.github.RepositoryAccess
+        :param org: The name of the organization.
+        :type org: str
+        :return: The number of repositories written.
+        :rtype: int
+        :raise GithubApiError: If the listing can't be completed.
+        """
+        return await self.export(access.stream(org))
+
+    def read(self) -> Iterator[Repository]:
+        """
+        Reads the repositories lazily, one line at a time.
+        :return: The repositories.
+        :rtype: Iterator[pythoneda.shared.git.github.Repository]
+        """
+        with self._open("r") as source:
+            for line in source:
+                if line.strip():
+                    yield self.decode(line)
+
+    async def restore(self, access, concurrency: int = 8) -> int:
+        """
+        Creates every repository in the inventory, keeping at most [concurrency]
+        requests in flight and reading further records, in a worker thread, only
+        as they complete. If any creation raises, the ones in flight are
+        cancelled and the error is raised.
+        :param access: The repository access.
+        :type access: pythoneda.shared.git.github.RepositoryAccess
+        :param concurrency: The maximum number of concurrent requests.
+        :type concurrency: int
+        :return: The number of repositories created.
+        :rtype: int
+        """
+        created = 0
+        pending = set()
+
+        async def create(repository: Repository) -> bool:
+            result = await access.create(
+                repository.org,
+                repository.name,
+                description=repository.description,
+                homepage=repository.homepage,
+                private=repository.private,
+                visibility=repository.visibility,
+                hasIssues=repository.has_issues,
+                hasWiki=repository.has_wiki,
+                hasDownloads=repository.has_downloads,
+                hasProjects=repository.has_projects,
+                teamId=repository.team_id,
+                autoInit=repository.auto_init,
+                licenseTemplate=repository.license_template,
+                gitignoreTemplate=repository.gitignore_template,
+                allowSquashMerge=repository.allow_squash_merge,
+                allowMergeCommit=repository.allow_merge_commit,
+                allowRebaseMerge=repository.allow_rebase_merge,
+                allowAutoMerge=repository.allow_auto_merge,
+                deleteBranchOnMerge=repository.delete_branch_on_merge,
+                useSquashPrTitleAsDefault=repository.use_squash_pr_title_as_default,
+                squashMergeCommitTitle=repository.squash_merge_commit_title,
+                squashMergeCommitMessage=repository.squash_merge_commit_message,
+                mergeCommitTitle=repository.merge_commit_title,
+                mergeCommitMessage=repository.merge_commit_message,
+                customProperties=repository.custom_properties,
+            )
+            return result is not None
+
+        def tally(done) -> int:
+            # Retrieve every error, so none is reported as never retrieved.
+            errors = [task.exception() for task in done]
+            for error in errors:
+                if error is not None:
+                    raise error
+            return sum(1 for task in done if task.result())
+
+        loop = asyncio.get_running_loop()
+        records = self.read()
+        try:
+            while True:
+                batch = await loop.run_in_executor(
+                    None, list, itertools.islice(records, concurrency)
+                )
+                if not batch:
+                    break
+                for repository in batch:
+                    if len(pending) >= concurrency:
+                        done, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        created += tally(done)
+                    pending.add(asyncio.ensure_future(create(repository)))
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                created += tally(done)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            records.close()
+        return created
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,326 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/repository_tree.py
+
+This file defines the RepositoryTree class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from .blob_store import BlobStore
+import fnmatch
+from .github_api_error import GithubApiError
+from .github_client import GithubClient
+from .metrics import GithubMetrics
+from .repository import Repository
+from .transport import Transport
+from typing import Dict, Iterable, List, Union
+from urllib.parse import quote
+
+
+class RepositoryTree(GithubClient):
+    """
+    Interacts with the /repos/[org]/[name]/git endpoints of github API, to read files.
+
+    Class name: RepositoryTree
+
+    Responsibilities:
+        - Retrieve the whole tree of a repository in a single request, or
+          directory by directory when Github truncates it.
+        - Download only the blobs matching some path patterns, with bounded concurrency.
+        - Never download a blob already in the store, or already being downloaded.
+
+    Collaborators:
+        - pythoneda.shared.git.github.BlobStore: Keeps the downloaded blobs.
+        - pythoneda.shared.git.github.GithubClient: Sends and tracks the requests.
+        - pythoneda.shared.git.github.Repository: The repositories to read.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        store: BlobStore,
+        metrics: Union[GithubMetrics, None] = None,
+        apiUrl: str = "https://api.github.com",
+        transport: Union[Transport, None] = None,
+        concurrency: int = 16,
+    ):
+        """
+        Creates a new RepositoryTree instance.
+        :param token: The Github token.
+        :type token: str
+        :param store: Where to keep the blobs.
+        :type store: pythoneda.shared.git.github.BlobStore
+        :param metrics: The metrics to report requests to, if any.
+        :type metrics: Union[pythoneda.shared.git.github.GithubMetrics, None]
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param transport: How to send requests. Defaults to the network, via aiohttp.
+        :type transport: Union[pythoneda.shared.git.github.Transport, None]
+        :param concurrency: The maximum number of blobs, or directories, downloaded at once.
+        :type concurrency: int
+        """
+        super().__init__(token, metrics, apiUrl, transport)
+        self._store = store
+        self._concurrency = concurrency
+        # blob sha -> download in progress
+        self._pending = {}
+
+    @property
+    def store(self) -> BlobStore:
+        """
+        Retrieves the blob store.
+        :return: Such store.
+        :rtype: pythoneda.shared.git.github.BlobStore
+        """
+        return self._store
+
+    @staticmethod
+    def matches(path: str, patterns: Iterable[str]) -> bool:
+        """
+        Checks whether a path matches any of some shell-style patterns.
+        Patterns apply to the whole path: "LICENSE*" matches only top-level files,
+        while "*/CODEOWNERS" matches at any depth below the root.
+        :param path: The path.
+        :type path: str
+        :param patterns: The patterns.
+        :type patterns: Iterable[str]
+        :return: True in such case.
+        :rtype: bool
+        """
+        return any(fnmatch.fnmatchcase(path, pattern) for pattern in patterns)
+
+    async def _tree(
+        self, repository: Repository, ref: str, recursive: bool
+    ) -> Union[Dict, None]:
+        """
+        Retrieves a tree of a repository.
+        :param repository: The repository.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param ref: The branch, tag, commit or tree sha.
+        :type ref: str
+        :param recursive: Whether to include the entries of all subdirectories.
+        :type recursive: bool
+        :return: The tree, as returned by the Github API, or None if it doesn't exist.
+        :rtype: Union[Dict, None]
+        :raise GithubApiError: If the tree can't be retrieved for any other reason.
+        """
+        headers = {"Authorization": f"token {self.token}"}
+        url = (
+            f"{self.api_url}/repos/{repository.org}/{repository.name}"
+            f"/git/trees/{quote(ref)}"
+        )
+        if recursive:
+            url = f"{url}?recursive=1"
+        async with self._track("GET", "/repos/{org}/{name}/git/trees/{ref}") as observe:
+            async with self.transport.request("GET", url, headers) as response:
+                observe(response.status, response.headers)
+                if response.status == 404:
+                    return None
+                if response.status != 200:
+                    raise await GithubApiError.from_response("GET", url, response)
+                return await response.json()
+
+    async def tree(
+        self, repository: Repository, ref: str = "HEAD"
+    ) -> Union[List[Dict], None]:
+        """
+        Retrieves the whole tree of a repository, in a single request.
+        Github truncates trees of more than 100,000 entries, or 7 MB; those
+        are walked again one directory at a time.
+        :param repository: The repository.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param ref: The branch, tag or commit.
+        :type ref: str
+        :return: The entries, as returned by the Github API, or None if the
+        repository or the ref don't exist.
+        :rtype: Union[List[Dict], None]
+        :raise GithubApiError: If the tree can't be retrieved.
+        :raise ValueError: If a single directory is too large to list.
+        """
+        tree = await self._tree(repository, ref, True)
+        if tree is None:
+            return None
+        if not tree.get("truncated", False):
+            return tree.get("tree", [])
+        return await self._walk(repository, tree["sha"])
+
+    async def _walk(self, repository: Repository, sha: str) -> List[Dict]:
+        """
+        Retrieves a tree one directory at a time, each level concurrently.
+        :param repository: The repository.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param sha: The sha of the root tree.
+        :type sha: str
+        :return: The entries of all directories, with their full paths.
+        :rtype: List[Dict]
+        :raise GithubApiError: If any directory can't be retrieved.
+        :raise ValueError: If any single directory is truncated.
+        """
+        semaphore = self._semaphore(self._concurrency)
+
+        async def directory(prefix: str, sha: str) -> List[Dict]:
+            async with semaphore:
+                tree = await self._tree(repository, sha, False)
+            if tree is None:
+                raise GithubApiError(
+                    "GET", f"{repository.org}/{repository.name}@{sha}", 404, "Not Found"
+                )
+            if tree.get("truncated", False):
+                # Not even Github can list a directory this large.
+                raise ValueError(
+                    f"Tree {sha} of {repository.org}/{repository.name} is too large"
+                )
+            return [
+                {**entry, "path": f"{prefix}{entry['path']}"}
+                for entry in tree.get("tree", [])
+            ]
+
+        result = []
+        level = [("", sha)]
+        while level:
+            listings = await asyncio.gather(
+                *[directory(prefix, sha) for prefix, sha in level]
+            )
+            level = []
+            for entries in listings:
+                result.extend(entries)
+                level.extend(
+                    (f"{entry['path']}/", entry["sha"])
+                    for entry in entries
+                    if entry.get("type", None) == "tree"
+                )
+        return sorted(result, key=lambda entry: entry["path"])
+
+    async def _download(self, repository: Repository, sha: str):
+        """
+        Downloads a blob into the store.
+        :param repository: A repository containing the blob.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param sha: The blob sha.
+        :type sha: str
+        :raise GithubApiError: If the blob can't be retrieved.
+        :raise ValueError: If its contents don't match its sha.
+        """
+        headers = {
+            "Authorization": f"token {self.token}",
+            "Accept": "application/vnd.github.raw+json",
+        }
+        url = f"{self.api_url}/repos/{repository.org}/{repository.name}/git/blobs/{sha}"
+        async with self._semaphore(self._concurrency):
+            async with self._track(
+                "GET", "/repos/{org}/{name}/git/blobs/{sha}"
+            ) as observe:
+                async with self.transport.request("GET", url, headers) as response:
+                    observe(response.status, response.headers)
+                    if response.status != 200:
+                        raise await GithubApiError.from_response("GET", url, response)
+                    content = await response.read()
+        self._store.put(content, sha)
+
+    async def blob(self, repository: Repository, sha: str):
+        """
+        Makes sure a blob is in the store, downloading it only if it's neither
+        stored nor already being downloaded.
+        :param repository: A repository containing the blob.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param sha: The blob sha.
+        :type sha: str
+        :raise GithubApiError: If the blob can't be retrieved.
+        :raise ValueError: If its contents don't match its sha.
+        """
+        # Blobs changed on disk since stored are downloaded again.
+        stored = self._store.verify(sha)
+        if self._metrics is not None:
+            self._metrics.observe_cache("blobs", stored)
+        if stored:
+            return
+        task = self._pending.get(sha, None)
+        if task is None:
+            task = asyncio.ensure_future(self._download(repository, sha))
+            self._pending[sha] = task
+            task.add_done_callback(lambda _: self._pending.pop(sha, None))
+        # Shielded, so that a cancelled caller doesn't cancel the others waiting on it.
+        await asyncio.shield(task)
+
+    async def snapshot(
+        self, repository: Repository, patterns: Iterable[str], ref: str = "HEAD"
+    ) -> Union[Dict[str, str], None]:
+        """
+        Stores the files of a repository matching some patterns.
+        :param repository: The repository.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param patterns: The shell-style path patterns.
+        :type patterns: Iterable[str]
+        :param ref: The branch, tag or commit.
+        :type ref: str
+        :return: The blob sha of each stored file, by path, or None if the
+        repository or the ref don't exist.
+        :rtype: Union[Dict[str, str], None]
+        :raise GithubApiError: If the tree, or any of the files, can't be
+        retrieved, once all other files are stored.
+        :raise ValueError: If the contents of a file don't match its sha.
+        """
+        patterns = list(patterns)
+        entries = await self.tree(repository, ref)
+        if entries is None:
+            return None
+        wanted = {
+            entry["path"]: entry["sha"]
+            for entry in entries
+            if entry.get("type", None) == "blob"
+            and self.matches(entry["path"], patterns)
+        }
+        errors = await asyncio.gather(
+            *[self.blob(repository, sha) for sha in set(wanted.values())],
+            return_exceptions=True,
+        )
+        for error in errors:
+            if error is not None:
+                raise error
+        return wanted
+
+    async def files(
+        self, repository: Repository, patterns: Iterable[str], ref: str = "HEAD"
+    ) -> Union[Dict[str, bytes], None]:
+        """
+        Retrieves the files of a repository matching some patterns.
+        :param repository: The repository.
+        :type repository: pythoneda.shared.git.github.Repository
+        :param patterns: The shell-style path patterns.
+        :type patterns: Iterable[str]
+        :param ref: The branch, tag or commit.
+        :type ref: str
+        :return: The contents of each file, by path, or None if the
+        repository or the ref don't exist.
+        :rtype: Union[Dict[str, bytes], None]
+        :raise GithubApiError: If the tree, or any of the files, can't be retrieved.
+        :raise ValueError: If the contents of a file don't match its sha.
+        """
+        snapshot = await self.snapshot(repository, patterns, ref)
+        if snapshot is None:
+            return None
+        return {path: self._store.get(sha) for path, sha in snapshot.items()}
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
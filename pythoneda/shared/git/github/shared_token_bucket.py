@@ -0,0 +1,121 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/shared_token_bucket.py
+
+This file defines the SharedTokenBucket class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import multiprocessing
+from pythoneda.shared import BaseObject
+import time
+from typing import Union
+
+
+class SharedTokenBucket(BaseObject):
+    """
+    A token bucket living in shared memory, so that several processes draw
+    from the same request budget.
+
+    Class name: SharedTokenBucket
+
+    Responsibilities:
+        - Refill tokens at a fixed rate, up to a burst capacity.
+        - Tell each caller how long to wait for its token, across processes.
+
+    Collaborators:
+        - None
+    """
+
+    def __init__(self, rate: float, capacity: Union[float, None] = None, context=None):
+        """
+        Creates a new SharedTokenBucket instance. It must be handed to worker
+        processes when they start, for instance through a pool initializer.
+        :param rate: The tokens added per second.
+        :type rate: float
+        :param capacity: The maximum number of tokens. Defaults to one second's worth.
+        :type capacity: Union[float, None]
+        :param context: The multiprocessing context of the workers, if not the default.
+        :type context: multiprocessing.context.BaseContext
+        """
+        super().__init__()
+        if context is None:
+            context = multiprocessing.get_context()
+        self._rate = rate
+        self._capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._lock = context.Lock()
+        # Raw values: the lock above already guards both together.
+        self._tokens = context.RawValue("d", self._capacity)
+        # CLOCK_MONOTONIC is system-wide, so all processes share this time base.
+        self._updated = context.RawValue("d", time.monotonic())
+
+    @property
+    def rate(self) -> float:
+        """
+        Retrieves the tokens added per second.
+        :return: Such rate.
+        :rtype: float
+        """
+        return self._rate
+
+    @property
+    def capacity(self) -> float:
+        """
+        Retrieves the maximum number of tokens.
+        :return: Such capacity.
+        :rtype: float
+        """
+        return self._capacity
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Takes tokens from the bucket, going into debt if there aren't enough.
+        :param tokens: The number of tokens.
+        :type tokens: float
+        :return: How long to wait, in seconds, before using them.
+        :rtype: float
+        """
+        with self._lock:
+            now = time.monotonic()
+            available = min(
+                self._capacity,
+                self._tokens.value + (now - self._updated.value) * self._rate,
+            )
+            available -= tokens
+            self._tokens.value = available
+            self._updated.value = now
+        return 0.0 if available >= 0 else -available / self._rate
+
+    async def acquire(self, tokens: float = 1.0):
+        """
+        Waits until tokens are available, without blocking the event loop.
+        :param tokens: The number of tokens.
+        :type tokens: float
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,359 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/sync_client.py
+
+This file defines the SyncClient class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .aiohttp_transport import AiohttpTransport
+import asyncio
+import concurrent.futures
+from .metrics import GithubMetrics
+from pythoneda.shared import BaseObject
+from .repository import Repository
+from .repository_access import RepositoryAccess
+from .team import Team
+import threading
+from typing import Awaitable, Dict, List, Union
+
+
+class SyncClient(BaseObject):
+    """
+    Blocking facade over the async API, for synchronous callers.
+
+    Class name: SyncClient
+
+    Responsibilities:
+        - Run a single event loop in a background thread, for the lifetime of the client.
+        - Share one aiohttp session, and its connection pool, among all calls.
+        - Accept calls from any number of threads at once.
+
+    Collaborators:
+        - pythoneda.shared.git.github.AiohttpTransport: Sends requests through the shared session.
+        - pythoneda.shared.git.github.GithubMetrics: Optionally collects usage metrics.
+        - pythoneda.shared.git.github.RepositoryAccess: Manages repositories.
+        - pythoneda.shared.git.github.Team: Manages teams.
+    """
+
+    # The client name, in the metrics.
+    NAME = "sync_client"
+
+    def __init__(
+        self,
+        token: str,
+        metrics: Union[GithubMetrics, None] = None,
+        apiUrl: str = "https://api.github.com",
+        connections: int = 100,
+        useUvloop: bool = True,
+    ):
+        """
+        Creates a new SyncClient instance. The loop thread starts on first use.
+        :param token: The Github token.
+        :type token: str
+        :param metrics: The metrics to report requests to, if any.
+        :type metrics: Union[pythoneda.shared.git.github.GithubMetrics, None]
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param connections: The size of the shared connection pool.
+        :type connections: int
+        :param useUvloop: Whether to run on uvloop, when it's installed.
+        :type useUvloop: bool
+        """
+        super().__init__()
+        self._token = token
+        self._metrics = metrics
+        self._api_url = apiUrl
+        self._connections = connections
+        self._use_uvloop = useUvloop
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._repository_access = None
+        self._team = None
+        # Only touched from the loop thread.
+        self._in_flight = 0
+
+    @property
+    def running(self) -> bool:
+        """
+        Checks whether the loop thread is running.
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def repository_access(self) -> RepositoryAccess:
+        """
+        Retrieves the repository access bound to the shared session.
+        :return: Such instance.
+        :rtype: pythoneda.shared.git.github.RepositoryAccess
+        """
+        self.start()
+        return self._repository_access
+
+    @property
+    def team(self) -> Team:
+        """
+        Retrieves the team access bound to the shared session.
+        :return: Such instance.
+        :rtype: pythoneda.shared.git.github.Team
+        """
+        self.start()
+        return self._team
+
+    def start(self):
+        """
+        Starts the loop thread and opens the shared session, unless already done.
+        If the session can't be opened, the thread is stopped again and the error raised.
+        """
+        with self._lock:
+            if self.running:
+                return
+            loop = None
+            if self._use_uvloop:
+                try:
+                    import uvloop
+
+                    loop = uvloop.new_event_loop()
+                except ImportError:
+                    pass
+            if loop is None:
+                loop = asyncio.new_event_loop()
+            self._loop = loop
+            self._thread = threading.Thread(
+                target=self._run, name="github-sync-client", daemon=True
+            )
+            self._thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+            except BaseException:
+                self._stop()
+                raise
+
+    def _stop(self):
+        """
+        Stops the loop thread, and forgets it along with the session.
+        """
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._loop = None
+        self._session = None
+        self._repository_access = None
+        self._team = None
+
+    def _run(self):
+        """
+        Runs the event loop, until stopped.
+        """
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _open(self):
+        """
+        Opens the shared session, within the loop.
+        """
+        import aiohttp
+
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self._connections)
+        )
+        transport = AiohttpTransport(self._session, self._metrics, self.NAME)
+        self._repository_access = RepositoryAccess(
+            self._token, self._metrics, self._api_url, transport
+        )
+        self._team = Team(self._token, self._metrics, self._api_url, transport)
+
+    async def _observe(self, awaitable: Awaitable):
+        """
+        Awaits a call, reporting the calls running on the shared session.
+        :param awaitable: The call.
+        :type awaitable: Awaitable
+        :return: Its result.
+        :rtype: object
+        """
+        self._in_flight += 1
+        try:
+            if self._metrics is not None:
+                self._metrics.observe_calls(
+                    self.NAME, self._in_flight, self._connections
+                )
+            return await awaitable
+        finally:
+            self._in_flight -= 1
+            if self._metrics is not None:
+                self._metrics.observe_calls(
+                    self.NAME, self._in_flight, self._connections
+                )
+
+    def submit(self, awaitable: Awaitable) -> concurrent.futures.Future:
+        """
+        Schedules a call on the loop thread, without waiting for it.
+        :param awaitable: The call, for instance client.team.hierarchy(org).
+        :type awaitable: Awaitable
+        :return: A future holding its result.
+        :rtype: concurrent.futures.Future
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._observe(awaitable), self._loop)
+
+    def run(self, awaitable: Awaitable, timeout: Union[float, None] = None):
+        """
+        Runs a call on the loop thread, and waits for its result.
+        :param awaitable: The call, for instance client.team.hierarchy(org).
+        :type awaitable: Awaitable
+        :param timeout: How long to wait, in seconds, if limited.
+        :type timeout: Union[float, None]
+        :return: Its result.
+        :rtype: object
+        :raise TimeoutError: If the call takes longer. It's cancelled then.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("SyncClient can't be called from its own loop")
+        future = self.submit(awaitable)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def fetch(self, org: str, name: str) -> Repository:
+        """
+        Retrieves a repository.
+        :param org: The name of the organization.
+        :type org: str
+        :param name: The name of the repository.
+        :type name: str
+        :return: The repository.
+        :rtype: pythoneda.shared.git.github.Repository
+        """
+        return self.run(self.repository_access.fetch(org, name))
+
+    def create(self, org: str, name: str, **kwargs) -> Repository:
+        """
+        Creates a repository.
+        :param org: The name of the organization.
+        :type org: str
+        :param name: The name of the repository.
+        :type name: str
+        :param kwargs: Any other argument of RepositoryAccess.create.
+        :type kwargs: Dict
+        :return: The repository.
+        :rtype: pythoneda.shared.git.github.Repository
+        """
+        return self.run(self.repository_access.create(org, name, **kwargs))
+
+    def rename_to(self, org: str, name: str, newName: str) -> bool:
+        """
+        Renames a repository.
+        :param org: The name of the organization.
+        :type org: str
+        :param name: The name of the repository.
+        :type name: str
+        :param newName: The new name of the repository.
+        :type newName: str
+        :return: True if the operation was successful.
+        :rtype: bool
+        """
+        return self.run(self.repository_access.rename_to(org, name, newName))
+
+    def list_teams(self, org: str):
+        """
+        Retrieves the first page of teams of an organization, like Team.list.
+        :param org: The organization name.
+        :type org: str
+        :return: The list of teams.
+        :rtype: List
+        """
+        return self.run(self.team.list(org))
+
+    def repositories(self, org: str) -> List[Repository]:
+        """
+        Retrieves all repositories of an organization.
+        :param org: The name of the organization.
+        :type org: str
+        :return: The repositories.
+        :rtype: List[pythoneda.shared.git.github.Repository]
+        """
+
+        async def collect() -> List[Repository]:
+            return [
+                repository async for repository in self.repository_access.stream(org)
+            ]
+
+        return self.run(collect())
+
+    def teams(self, org: str) -> List[Dict]:
+        """
+        Retrieves all teams of an organization.
+        :param org: The organization name.
+        :type org: str
+        :return: The teams, as returned by the Github API.
+        :rtype: List[Dict]
+        """
+
+        async def collect() -> List[Dict]:
+            return [team async for team in self.team.stream(org)]
+
+        return self.run(collect())
+
+    async def _close(self):
+        """
+        Cancels the calls still running, and closes the shared session, within the loop.
+        """
+        tasks = [
+            task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._session.close()
+
+    def close(self):
+        """
+        Cancels the calls still running, closes the shared session and stops
+        the loop thread.
+        """
+        with self._lock:
+            if not self.running:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+            finally:
+                self._stop()
+
+    def __enter__(self) -> "SyncClient":
+        self.start()
+        return self
+
+    def __exit__(self, excType, exc, tb):
+        self.close()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -19,13 +19,15 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
-import aiohttp
-import asyncio
-from pythoneda.shared import BaseObject
-from typing import List
+from .github_client import GithubClient
+from .metrics import GithubMetrics
+from .org_team import OrgTeam
+from .team_hierarchy import TeamHierarchy
+from .transport import Transport
+from typing import AsyncIterator, Dict, List, Union
 
 
-class Team(BaseObject):
+class Team(GithubClient):
     """
     Interacts with the /orgs/[org]/teams endpoint of github API.
 
@@ -35,24 +37,29 @@ class Team(BaseObject):
         - Know how to use the github API to manage organization teams.
 
     Collaborators:
-        - None
+        - pythoneda.shared.git.github.GithubClient: Sends and tracks the requests.
+        - pythoneda.shared.git.github.OrgTeam: The typed teams.
     """
 
-    def __init__(self, token: str):
+    def __init__(
+        self,
+        token: str,
+        metrics: Union[GithubMetrics, None] = None,
+        apiUrl: str = "https://api.github.com",
+        transport: Union[Transport, None] = None,
+    ):
         """
         Creates a new Team instance.
+        :param token: The Github token.
+        :type token: str
+        :param metrics: The metrics to report requests to, if any.
+        :type metrics: Union[pythoneda.shared.git.github.GithubMetrics, None]
+        :param apiUrl: The base url of the Github API.
+        :type apiUrl: str
+        :param transport: How to send requests. Defaults to the network, via aiohttp.
+        :type transport: Union[pythoneda.shared.git.github.Transport, None]
         """
-        super().__init__()
-        self._token = token
-
-    @property
-    def token(self) -> str:
-        """
-        Retrieves the github token.
-        :return: Such token.
-        :rtype: str
-        """
-        return self._token
+        super().__init__(token, metrics, apiUrl, transport)
 
     async def list(self, org: str):
         """
@@ -62,10 +69,11 @@ class Team(BaseObject):
         :return: The list of teams.
         :rtype: List
         """
-        async with aiohttp.ClientSession() as session:
-            headers = {"Authorization": f"token {self.token}"}
-            url = f"https://api.github.com/orgs/{org}/teams"
-            async with session.get(url, headers=headers) as response:
+        headers = {"Authorization": f"token {self.token}"}
+        url = f"{self.api_url}/orgs/{org}/teams"
+        async with self._track("GET", "/orgs/{org}/teams") as observe:
+            async with self.transport.request("GET", url, headers) as response:
+                observe(response.status, response.headers)
                 if response.status == 200:
                     return (
                         await response.json()
@@ -73,6 +81,69 @@ class Team(BaseObject):
                 else:
                     return f"Error: {response.status}, {await response.text()}"
 
+    async def stream(self, org: str, perPage: int = 100) -> AsyncIterator[Dict]:
+        """
+        Retrieves all teams of an organization, following pagination.
+        Each team is yielded as soon as its bytes arrive.
+        :param org: The organization name.
+        :type org: str
+        :param perPage: The number of teams per page (at most 100).
+        :type perPage: int
+        :return: The teams, as returned by the Github API.
+        :rtype: AsyncIterator[Dict]
+        :raise GithubApiError: If any page can't be retrieved.
+        """
+        headers = {"Authorization": f"token {self.token}"}
+        url = f"{self.api_url}/orgs/{org}/teams?per_page={perPage}"
+        async for team in self._items(url, "/orgs/{org}/teams", headers):
+            yield team
+
+    async def teams(self, org: str, perPage: int = 100) -> AsyncIterator[OrgTeam]:
+        """
+        Retrieves all teams of an organization, as typed objects.
+        :param org: The organization name.
+        :type org: str
+        :param perPage: The number of teams per page (at most 100).
+        :type perPage: int
+        :return: The teams.
+        :rtype: AsyncIterator[pythoneda.shared.git.github.OrgTeam]
+        """
+        async for team in self.stream(org, perPage):
+            yield OrgTeam.from_github(org, team)
+
+    async def hierarchy(self, org: str) -> TeamHierarchy:
+        """
+        Retrieves all teams of an organization, indexed by parent.
+        :param org: The organization name.
+        :type org: str
+        :return: The team hierarchy.
+        :rtype: pythoneda.shared.git.github.TeamHierarchy
+        """
+        return TeamHierarchy([team async for team in self.teams(org)])
+
+    async def repositories(
+        self, org: str, slug: str, perPage: int = 100
+    ) -> AsyncIterator[Dict]:
+        """
+        Retrieves the repositories a team has access to, following pagination.
+        :param org: The organization name.
+        :type org: str
+        :param slug: The team slug.
+        :type slug: str
+        :param perPage: The number of repositories per page (at most 100).
+        :type perPage: int
+        :return: The repositories, as returned by the Github API, including
+        the team's "role_name" and "permissions".
+        :rtype: AsyncIterator[Dict]
+        :raise GithubApiError: If any page can't be retrieved.
+        """
+        headers = {"Authorization": f"token {self.token}"}
+        url = f"{self.api_url}/orgs/{org}/teams/{slug}/repos?per_page={perPage}"
+        async for repository in self._items(
+            url, "/orgs/{org}/teams/{team}/repos", headers
+        ):
+            yield repository
+
 
 # vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
 # Local Variables:
@@ -0,0 +1,281 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/team_access_matrix.py
+
+This file defines the TeamAccessMatrix class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from pythoneda.shared import BaseObject
+from .team import Team
+from .team_hierarchy import TeamHierarchy
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+
+class TeamAccessMatrix(BaseObject):
+    """
+    The permission of every team of an organization on every repository.
+
+    Class name: TeamAccessMatrix
+
+    Responsibilities:
+        - Fetch the repositories of all teams concurrently, following pagination.
+        - Store the permissions as sparse rows of integer codes.
+        - Refresh individual teams without rebuilding the whole matrix.
+
+    Collaborators:
+        - pythoneda.shared.git.github.Team: Retrieves teams and their repositories.
+        - pythoneda.shared.git.github.TeamHierarchy: The teams of the organization.
+    """
+
+    PERMISSIONS = ("pull", "triage", "push", "maintain", "admin")
+
+    def __init__(self, team: Team, org: str, concurrency: int = 8):
+        """
+        Creates a new TeamAccessMatrix instance.
+        :param team: The team access.
+        :type team: pythoneda.shared.git.github.Team
+        :param org: The organization name.
+        :type org: str
+        :param concurrency: The maximum number of teams fetched at once.
+        :type concurrency: int
+        """
+        super().__init__()
+        self._team = team
+        self._org = org
+        self._concurrency = concurrency
+        self._hierarchy = TeamHierarchy([])
+        # code -> value, and value -> code, for teams, repositories and permissions
+        self._team_slugs = []
+        self._team_codes = {}
+        self._repository_names = []
+        self._repository_codes = {}
+        self._permission_names = list(self.PERMISSIONS)
+        self._permission_codes = {
+            name: code for code, name in enumerate(self._permission_names)
+        }
+        # team code -> repository code -> permission code
+        self._rows = {}
+
+    @property
+    def org(self) -> str:
+        """
+        Retrieves the organization name.
+        :return: Such name.
+        :rtype: str
+        """
+        return self._org
+
+    @property
+    def hierarchy(self) -> TeamHierarchy:
+        """
+        Retrieves the teams of the organization, as of the last build.
+        :return: Such teams.
+        :rtype: pythoneda.shared.git.github.TeamHierarchy
+        """
+        return self._hierarchy
+
+    def __len__(self) -> int:
+        return sum(len(row) for row in self._rows.values())
+
+    @staticmethod
+    def _intern(value: str, values: List[str], codes: Dict[str, int]) -> int:
+        """
+        Retrieves the code of a value, assigning a new one if needed.
+        :param value: The value.
+        :type value: str
+        :param values: The values, indexed by code.
+        :type values: List[str]
+        :param codes: The codes, indexed by value.
+        :type codes: Dict[str, int]
+        :return: The code.
+        :rtype: int
+        """
+        code = codes.get(value, None)
+        if code is None:
+            code = len(values)
+            values.append(value)
+            codes[value] = code
+        return code
+
+    @classmethod
+    def permission_of(cls, payload: Dict) -> Union[str, None]:
+        """
+        Retrieves the permission of a team on a repository, from the Github API
+        representation of the repository as listed for the team.
+        :param payload: The repository.
+        :type payload: Dict
+        :return: The role name, or the highest permission flag set.
+        :rtype: Union[str, None]
+        """
+        role = payload.get("role_name", None)
+        if role:
+            return role
+        flags = payload.get("permissions", None) or {}
+        for permission in reversed(cls.PERMISSIONS):
+            if flags.get(permission, False):
+                return permission
+        return None
+
+    async def build(self) -> "TeamAccessMatrix":
+        """
+        Retrieves all teams and their repositories, replacing the current contents
+        only once all of them are retrieved.
+        :return: This matrix.
+        :rtype: pythoneda.shared.git.github.TeamAccessMatrix
+        :raise GithubApiError: If any team can't be retrieved. The matrix is left as it was.
+        """
+        hierarchy = await self._team.hierarchy(self._org)
+        rows = await self._fetch([team.slug for team in hierarchy])
+        self._hierarchy = hierarchy
+        self._rows = rows
+        return self
+
+    async def refresh(self, *slugs: str) -> int:
+        """
+        Retrieves the repositories of some teams again, concurrently, and replaces
+        their rows once all of them are retrieved. The rest of the matrix is
+        left untouched.
+        :param slugs: The team slugs.
+        :type slugs: str
+        :return: The number of permissions stored for these teams.
+        :rtype: int
+        :raise GithubApiError: If any team can't be retrieved. The matrix is left as it was.
+        """
+        rows = await self._fetch(slugs)
+        self._rows.update(rows)
+        return sum(len(row) for row in rows.values())
+
+    async def _fetch(self, slugs: Iterable[str]) -> Dict[int, Dict[int, int]]:
+        """
+        Retrieves the repositories of some teams, concurrently. If any of them
+        fails, the others are cancelled.
+        :param slugs: The team slugs.
+        :type slugs: Iterable[str]
+        :return: Their rows, by team code.
+        :rtype: Dict[int, Dict[int, int]]
+        :raise GithubApiError: If any team can't be retrieved.
+        """
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def fetch(slug: str) -> Tuple[int, Dict[int, int]]:
+            row = {}
+            async with semaphore:
+                async for repository in self._team.repositories(self._org, slug):
+                    permission = self.permission_of(repository)
+                    if permission is None:
+                        continue
+                    code = self._intern(
+                        repository["name"],
+                        self._repository_names,
+                        self._repository_codes,
+                    )
+                    row[code] = self._intern(
+                        permission, self._permission_names, self._permission_codes
+                    )
+            return self._intern(slug, self._team_slugs, self._team_codes), row
+
+        tasks = [asyncio.ensure_future(fetch(slug)) for slug in slugs]
+        try:
+            return dict(await asyncio.gather(*tasks))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def forget(self, slug: str):
+        """
+        Removes the row of a team, for instance after it's been deleted.
+        :param slug: The team slug.
+        :type slug: str
+        """
+        code = self._team_codes.get(slug, None)
+        if code is not None:
+            self._rows.pop(code, None)
+
+    def permission(self, slug: str, repository: str) -> Union[str, None]:
+        """
+        Retrieves the permission of a team on a repository.
+        :param slug: The team slug.
+        :type slug: str
+        :param repository: The repository name.
+        :type repository: str
+        :return: The permission, or None if the team has no access.
+        :rtype: Union[str, None]
+        """
+        team_code = self._team_codes.get(slug, None)
+        repository_code = self._repository_codes.get(repository, None)
+        if team_code is None or repository_code is None:
+            return None
+        code = self._rows.get(team_code, {}).get(repository_code, None)
+        return None if code is None else self._permission_names[code]
+
+    def repositories(self, slug: str) -> Dict[str, str]:
+        """
+        Retrieves the repositories a team has access to.
+        :param slug: The team slug.
+        :type slug: str
+        :return: The permission of the team, by repository name.
+        :rtype: Dict[str, str]
+        """
+        code = self._team_codes.get(slug, None)
+        row = self._rows.get(code, {}) if code is not None else {}
+        return {
+            self._repository_names[repository]: self._permission_names[permission]
+            for repository, permission in row.items()
+        }
+
+    def teams(self, repository: str) -> Dict[str, str]:
+        """
+        Retrieves the teams with access to a repository.
+        :param repository: The repository name.
+        :type repository: str
+        :return: The permission on the repository, by team slug.
+        :rtype: Dict[str, str]
+        """
+        code = self._repository_codes.get(repository, None)
+        if code is None:
+            return {}
+        return {
+            self._team_slugs[team]: self._permission_names[row[code]]
+            for team, row in self._rows.items()
+            if code in row
+        }
+
+    def items(self) -> Iterator[Tuple[str, str, str]]:
+        """
+        Iterates over all permissions.
+        :return: Tuples of team slug, repository name and permission.
+        :rtype: Iterator[Tuple[str, str, str]]
+        """
+        for team, row in self._rows.items():
+            for repository, permission in row.items():
+                yield (
+                    self._team_slugs[team],
+                    self._repository_names[repository],
+                    self._permission_names[permission],
+                )
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
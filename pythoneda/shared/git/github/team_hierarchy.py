@@ -0,0 +1,149 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/team_hierarchy.py
+
+This file defines the TeamHierarchy class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .org_team import OrgTeam
+from pythoneda.shared import BaseObject
+from typing import Iterable, Iterator, List, Union
+
+
+class TeamHierarchy(BaseObject):
+    """
+    Indexes the teams of an organization by slug and by parent.
+
+    Class name: TeamHierarchy
+
+    Responsibilities:
+        - Find teams by slug, and their parents, children, ancestors and descendants.
+
+    Collaborators:
+        - pythoneda.shared.git.github.OrgTeam: The indexed teams.
+    """
+
+    def __init__(self, teams: Iterable[OrgTeam]):
+        """
+        Creates a new TeamHierarchy instance.
+        :param teams: The teams of the organization.
+        :type teams: Iterable[pythoneda.shared.git.github.OrgTeam]
+        """
+        super().__init__()
+        self._teams = {}
+        # parent slug (None for top-level teams) -> child slugs
+        self._children = {}
+        for team in teams:
+            self._teams[team.slug] = team
+            self._children.setdefault(team.parent_slug, []).append(team.slug)
+
+    def __len__(self) -> int:
+        return len(self._teams)
+
+    def __iter__(self) -> Iterator[OrgTeam]:
+        return iter(self._teams.values())
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self._teams
+
+    def team(self, slug: str) -> Union[OrgTeam, None]:
+        """
+        Retrieves a team.
+        :param slug: The team slug.
+        :type slug: str
+        :return: The team, if it exists.
+        :rtype: Union[pythoneda.shared.git.github.OrgTeam, None]
+        """
+        return self._teams.get(slug, None)
+
+    def roots(self) -> List[OrgTeam]:
+        """
+        Retrieves the top-level teams.
+        :return: Such teams.
+        :rtype: List[pythoneda.shared.git.github.OrgTeam]
+        """
+        return [self._teams[slug] for slug in self._children.get(None, [])]
+
+    def parent(self, slug: str) -> Union[OrgTeam, None]:
+        """
+        Retrieves the parent of a team.
+        :param slug: The team slug.
+        :type slug: str
+        :return: The parent, or None for top-level or unknown teams.
+        :rtype: Union[pythoneda.shared.git.github.OrgTeam, None]
+        """
+        team = self._teams.get(slug, None)
+        if team is None or team.parent_slug is None:
+            return None
+        return self._teams.get(team.parent_slug, None)
+
+    def children(self, slug: str) -> List[OrgTeam]:
+        """
+        Retrieves the direct children of a team.
+        :param slug: The team slug.
+        :type slug: str
+        :return: Such teams.
+        :rtype: List[pythoneda.shared.git.github.OrgTeam]
+        """
+        return [self._teams[child] for child in self._children.get(slug, [])]
+
+    def ancestors(self, slug: str) -> List[OrgTeam]:
+        """
+        Retrieves the ancestors of a team, closest first.
+        :param slug: The team slug.
+        :type slug: str
+        :return: Such teams.
+        :rtype: List[pythoneda.shared.git.github.OrgTeam]
+        """
+        result = []
+        seen = {slug}
+        parent = self.parent(slug)
+        while parent is not None and parent.slug not in seen:
+            result.append(parent)
+            seen.add(parent.slug)
+            parent = self.parent(parent.slug)
+        return result
+
+    def descendants(self, slug: str) -> List[OrgTeam]:
+        """
+        Retrieves the descendants of a team, breadth-first.
+        :param slug: The team slug.
+        :type slug: str
+        :return: Such teams.
+        :rtype: List[pythoneda.shared.git.github.OrgTeam]
+        """
+        result = []
+        seen = {slug}
+        pending = list(self._children.get(slug, []))
+        while pending:
+            child = pending.pop(0)
+            if child in seen:
+                continue
+            seen.add(child)
+            result.append(self._teams[child])
+            pending.extend(self._children.get(child, []))
+        return result
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
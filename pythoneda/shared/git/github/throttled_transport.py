@@ -0,0 +1,120 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/throttled_transport.py
+
+This file defines the ThrottledTransport class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from contextlib import asynccontextmanager
+from .shared_token_bucket import SharedTokenBucket
+from .transport import Transport
+from typing import Dict, Tuple, Type, Union
+
+
+class ThrottledTransport(Transport):
+    """
+    Takes a token from a request budget before each request of another transport.
+
+    Class name: ThrottledTransport
+
+    Responsibilities:
+        - Delay requests so that all transports drawing from the same bucket stay within its rate.
+
+    Collaborators:
+        - pythoneda.shared.git.github.SharedTokenBucket: The request budget.
+        - pythoneda.shared.git.github.Transport: The wrapped transport.
+    """
+
+    def __init__(self, transport: Transport, bucket: SharedTokenBucket):
+        """
+        Creates a new ThrottledTransport instance.
+        :param transport: The transport to throttle.
+        :type transport: pythoneda.shared.git.github.Transport
+        :param bucket: The request budget.
+        :type bucket: pythoneda.shared.git.github.SharedTokenBucket
+        """
+        super().__init__()
+        self._transport = transport
+        self._bucket = bucket
+
+    @property
+    def transport(self) -> Transport:
+        """
+        Retrieves the wrapped transport.
+        :return: Such transport.
+        :rtype: pythoneda.shared.git.github.Transport
+        """
+        return self._transport
+
+    @property
+    def transient_errors(self) -> Tuple[Type[BaseException], ...]:
+        """
+        Retrieves the errors of the wrapped transport worth retrying a request for.
+        :return: Such error types.
+        :rtype: Tuple[Type[BaseException], ...]
+        """
+        return self._transport.transient_errors
+
+    @property
+    def bucket(self) -> SharedTokenBucket:
+        """
+        Retrieves the request budget.
+        :return: Such bucket.
+        :rtype: pythoneda.shared.git.github.SharedTokenBucket
+        """
+        return self._bucket
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Union[Dict[str, str], None] = None,
+        data: Union[bytes, None] = None,
+    ):
+        """
+        Waits for a token, and sends a request through the wrapped transport.
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The url.
+        :type url: str
+        :param headers: The request headers.
+        :type headers: Union[Dict[str, str], None]
+        :param data: The request body.
+        :type data: Union[bytes, None]
+        :return: An async context manager yielding the response.
+        :rtype: AsyncContextManager[pythoneda.shared.git.github.TransportResponse]
+        """
+        await self._bucket.acquire()
+        async with self._transport.request(method, url, headers, data) as response:
+            yield response
+
+    async def close(self):
+        """
+        Closes the wrapped transport.
+        """
+        await self._transport.close()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
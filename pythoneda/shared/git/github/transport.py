@@ -0,0 +1,103 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/transport.py
+
+This file defines the Transport class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from abc import ABC, abstractmethod
+from pythoneda.shared import BaseObject
+from typing import AsyncContextManager, Dict, Tuple, Type, Union
+
+
+class Transport(BaseObject, ABC):
+    """
+    Sends HTTP requests to the Github API.
+
+    Class name: Transport
+
+    Responsibilities:
+        - Define how clients send requests, so the network can be replaced (recorded, replayed, faked).
+
+    Collaborators:
+        - pythoneda.shared.git.github.TransportResponse: The responses.
+    """
+
+    def __init__(self):
+        """
+        Creates a new Transport instance.
+        """
+        super().__init__()
+
+    @property
+    def transient_errors(self) -> Tuple[Type[BaseException], ...]:
+        """
+        Retrieves the errors of this transport worth retrying a request for.
+        :return: Such error types.
+        :rtype: Tuple[Type[BaseException], ...]
+        """
+        import asyncio
+
+        return (OSError, asyncio.TimeoutError)
+
+    @abstractmethod
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Union[Dict[str, str], None] = None,
+        data: Union[bytes, None] = None,
+    ) -> AsyncContextManager:
+        """
+        Sends a request.
+        Usage:
+            async with transport.request("GET", url, headers) as response:
+                payload = await response.json()
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The url.
+        :type url: str
+        :param headers: The request headers.
+        :type headers: Union[Dict[str, str], None]
+        :param data: The request body.
+        :type data: Union[bytes, None]
+        :return: An async context manager yielding the response. Its body
+        can be read while inside the context.
+        :rtype: AsyncContextManager[pythoneda.shared.git.github.TransportResponse]
+        """
+
+    async def close(self):
+        """
+        Releases any resource held by this transport.
+        """
+        pass
+
+    async def __aenter__(self) -> "Transport":
+        return self
+
+    async def __aexit__(self, excType, exc, tb):
+        await self.close()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,183 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/git/github/transport_response.py
+
+This file defines the TransportResponse class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+from .json_array_stream import JsonArrayStream
+from multidict import CIMultiDict, CIMultiDictProxy
+from pythoneda.shared import BaseObject
+from typing import AsyncIterator, Iterable, Tuple, Union
+
+
+class TransportResponse(BaseObject):
+    """
+    A HTTP response whose body is already in memory.
+
+    Class name: TransportResponse
+
+    Responsibilities:
+        - Expose the status, headers and body of a response, regardless of the transport that produced it.
+
+    Collaborators:
+        - pythoneda.shared.git.github.Transport: Produces responses.
+    """
+
+    def __init__(
+        self,
+        status: int,
+        headers: Iterable[Tuple[str, str]],
+        body: bytes = b"",
+        url: str = "",
+    ):
+        """
+        Creates a new TransportResponse instance.
+        :param status: The HTTP status.
+        :type status: int
+        :param headers: The response headers.
+        :type headers: Iterable[Tuple[str, str]]
+        :param body: The response body.
+        :type body: bytes
+        :param url: The url of the response.
+        :type url: str
+        """
+        super().__init__()
+        self._status = status
+        self._headers = CIMultiDictProxy(CIMultiDict(headers))
+        self._body = body
+        self._url = url
+
+    @property
+    def status(self) -> int:
+        """
+        Retrieves the HTTP status.
+        :return: Such status.
+        :rtype: int
+        """
+        return self._status
+
+    @property
+    def headers(self) -> CIMultiDictProxy:
+        """
+        Retrieves the response headers, case-insensitively.
+        :return: Such headers.
+        :rtype: multidict.CIMultiDictProxy
+        """
+        return self._headers
+
+    @property
+    def url(self) -> str:
+        """
+        Retrieves the url of the response.
+        :return: Such url.
+        :rtype: str
+        """
+        return self._url
+
+    def link(self, rel: str) -> Union[str, None]:
+        """
+        Retrieves a url from the Link header of a paginated response.
+        :param rel: The relation: "next", "prev", "first" or "last".
+        :type rel: str
+        :return: Such url, or None if there's none.
+        :rtype: Union[str, None]
+        """
+        for link in self.headers.get("Link", "").split(","):
+            parts = link.split(";")
+            if len(parts) > 1 and any(
+                part.strip() == f'rel="{rel}"' for part in parts[1:]
+            ):
+                return parts[0].strip().lstrip("<").rstrip(">")
+        return None
+
+    @property
+    def next_link(self) -> Union[str, None]:
+        """
+        Retrieves the url of the next page, from the Link header of a paginated response.
+        :return: Such url, or None if there's no next page.
+        :rtype: Union[str, None]
+        """
+        return self.link("next")
+
+    async def read(self) -> bytes:
+        """
+        Retrieves the whole body.
+        :return: Such body.
+        :rtype: bytes
+        """
+        return self._body
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        """
+        Retrieves the body as text.
+        :param encoding: The encoding of the body.
+        :type encoding: str
+        :return: Such text.
+        :rtype: str
+        """
+        return (await self.read()).decode(encoding, errors="replace")
+
+    async def json(self) -> Union[dict, list, None]:
+        """
+        Retrieves the body as JSON.
+        :return: The decoded body, or None if it's empty.
+        :rtype: Union[dict, list, None]
+        """
+        body = await self.read()
+        if not body:
+            return None
+        return json.loads(body)
+
+    async def iter_chunked(self, size: int = 65536) -> AsyncIterator[bytes]:
+        """
+        Iterates over the body in chunks.
+        :param size: The maximum size of each chunk.
+        :type size: int
+        :return: The chunks.
+        :rtype: AsyncIterator[bytes]
+        """
+        body = await self.read()
+        for start in range(0, len(body), size):
+            yield body[start : start + size]
+
+    async def iter_json_array(self, size: int = 65536) -> AsyncIterator:
+        """
+        Iterates over the elements of a JSON array body, decoding each one as
+        soon as its bytes arrive, instead of waiting for the whole body.
+        :param size: The maximum size of the chunks read.
+        :type size: int
+        :return: The decoded elements.
+        :rtype: AsyncIterator
+        """
+        parser = JsonArrayStream()
+        async for chunk in self.iter_chunked(size):
+            for element in parser.feed(chunk):
+                yield element
+        for element in parser.close():
+            yield element
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,58 @@
+# vim: set fileencoding=utf-8
+"""
+tests/conftest.py
+
+This file defines the fixtures shared by all tests.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from pythoneda.shared.git.github import FakeGithubServer
+import pytest
+
+
+@pytest.fixture
+def github():
+    """
+    Runs a scenario against a fresh fake Github server.
+    Usage:
+        def test_something(github):
+            async def scenario(server):
+                ...
+            github(scenario, latency=0.01)
+    :return: A callable taking the scenario and any FakeGithubServer argument,
+    and returning the scenario's result.
+    :rtype: Callable
+    """
+
+    def run(scenario, **options):
+        async def main():
+            async with FakeGithubServer(**options) as server:
+                return await scenario(server)
+
+        return asyncio.run(main())
+
+    return run
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,205 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_archive_download.py
+
+This file tests the ArchiveDownload class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import aiohttp
+import asyncio
+import concurrent.futures
+import os
+from pythoneda.shared.git.github import (
+    AiohttpTransport,
+    ArchiveDownload,
+    RepositoryAccess,
+    ThrottledTransport,
+    Transport,
+)
+import random
+
+
+async def repositories(server, count: int = 1, size: int = 200000):
+    """
+    Adds repositories, each with a file too large for a pipe buffer.
+    :param server: The fake server.
+    :type server: pythoneda.shared.git.github.FakeGithubServer
+    :param count: The number of repositories.
+    :type count: int
+    :param size: The size of the file.
+    :type size: int
+    :return: The repositories.
+    :rtype: List[pythoneda.shared.git.github.Repository]
+    """
+    noise = random.Random(7)
+    access = RepositoryAccess("secret-token", apiUrl=server.url)
+    result = []
+    for index in range(count):
+        name = f"widget{index}"
+        server.add_repository("acme", name)
+        server.add_file("acme", name, "README.md", b"# Widget")
+        server.add_file("acme", name, "data/noise.bin", noise.randbytes(size))
+        result.append(await access.fetch("acme", name))
+    return result
+
+
+def resume(github, tmp_path, prepare):
+    """
+    Downloads an archive completely, then again from a partial file.
+    :param github: The fixture running scenarios.
+    :type github: Callable
+    :param tmp_path: A temporary folder.
+    :type tmp_path: pathlib.Path
+    :param prepare: Receives the complete archive and its ETag, and returns
+    the partial file contents and the stored ETag.
+    :type prepare: Callable
+    :return: The complete archive, the resumed one, the requests sent to
+    resume, and the extracted folder.
+    :rtype: Tuple[bytes, bytes, int, str]
+    """
+    complete = str(tmp_path / "complete.tar.gz")
+    resumed = str(tmp_path / "resumed.tar.gz")
+    folder = str(tmp_path / "extracted")
+
+    async def scenario(server):
+        (repository,) = await repositories(server)
+        downloads = ArchiveDownload("secret-token", apiUrl=server.url, chunkSize=4096)
+        assert await downloads.download(repository, complete)
+        with open(complete, "rb") as source:
+            body = source.read()
+        partial, etag = prepare(body, server._etag(body))
+        with open(f"{resumed}.part", "wb") as output:
+            output.write(partial)
+        with open(f"{resumed}.part.etag", "w") as output:
+            output.write(etag)
+        before = server.request_count
+        assert await downloads.download(repository, resumed, extractTo=folder)
+        return server.request_count - before
+
+    requests = github(scenario)
+    with open(complete, "rb") as first, open(resumed, "rb") as second:
+        result = first.read(), second.read(), requests, folder
+    assert not os.path.exists(f"{resumed}.part")
+    assert not os.path.exists(f"{resumed}.part.etag")
+    return result
+
+
+def extracted(folder: str) -> dict:
+    """
+    Reads the files extracted from an archive.
+    :param folder: The folder.
+    :type folder: str
+    :return: Their contents, by path relative to the archive's root folder.
+    :rtype: dict
+    """
+    (root,) = os.listdir(folder)
+    result = {}
+    for directory, _, names in os.walk(os.path.join(folder, root)):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, "rb") as source:
+                result[
+                    os.path.relpath(path, os.path.join(folder, root))
+                ] = source.read()
+    return result
+
+
+def test_resumes_from_the_partial_file_and_extracts_it_all(github, tmp_path):
+    complete, resumed, requests, folder = resume(
+        github, tmp_path, lambda body, etag: (body[:50000], etag)
+    )
+    assert resumed == complete
+    assert requests == 1
+    files = extracted(folder)
+    assert files["README.md"] == b"# Widget"
+    assert len(files["data/noise.bin"]) == 200000
+
+
+def test_complete_partial_files_are_answered_with_416(github, tmp_path):
+    complete, resumed, requests, folder = resume(
+        github, tmp_path, lambda body, etag: (body, etag)
+    )
+    assert resumed == complete
+    assert requests == 1
+    assert extracted(folder)["README.md"] == b"# Widget"
+
+
+def test_partial_files_longer_than_the_archive_start_over(github, tmp_path):
+    complete, resumed, requests, _ = resume(
+        github, tmp_path, lambda body, etag: (body + b"garbage", etag)
+    )
+    # The 416 doesn't match the partial file, which is discarded and retried.
+    assert resumed == complete
+    assert requests == 2
+
+
+def test_partial_files_of_another_archive_start_over(github, tmp_path):
+    complete, resumed, requests, _ = resume(
+        github, tmp_path, lambda body, etag: (b"x" * 50000, 'W/"other"')
+    )
+    assert resumed == complete
+    assert requests == 1
+
+
+def test_extractions_outnumbering_the_default_executor(github, tmp_path):
+    async def scenario(server):
+        # A single worker, shared by nothing this class does.
+        asyncio.get_running_loop().set_default_executor(
+            concurrent.futures.ThreadPoolExecutor(1)
+        )
+        found = await repositories(server, 4)
+        downloads = ArchiveDownload(
+            "secret-token", apiUrl=server.url, concurrency=4, chunkSize=4096
+        )
+        return await asyncio.wait_for(
+            asyncio.gather(
+                *[
+                    downloads.download(
+                        repository,
+                        str(tmp_path / f"{repository.name}.tar.gz"),
+                        extractTo=str(tmp_path / repository.name),
+                    )
+                    for repository in found
+                ]
+            ),
+            30,
+        )
+
+    assert github(scenario) == [True] * 4
+    for index in range(4):
+        files = extracted(str(tmp_path / f"widget{index}"))
+        assert len(files["data/noise.bin"]) == 200000
+
+
+def test_transient_errors_come_from_the_transport():
+    class Offline(Transport):
+        def request(self, method, url, headers=None, data=None):
+            raise OSError("offline")
+
+    assert Offline().transient_errors == (OSError, asyncio.TimeoutError)
+    throttled = ThrottledTransport(AiohttpTransport(), None)
+    assert aiohttp.ClientError in throttled.transient_errors
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
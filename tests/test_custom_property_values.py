@@ -0,0 +1,102 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_custom_property_values.py
+
+This file tests the CustomPropertyValues class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared.git.github import (
+    CustomPropertyUpdateError,
+    CustomPropertyValues,
+    GithubApiError,
+    GithubClient,
+    RepositoryAccess,
+    Team,
+)
+import pytest
+
+
+def test_clients_share_the_base_client():
+    for client in (CustomPropertyValues, RepositoryAccess, Team):
+        assert issubclass(client, GithubClient)
+        assert client._track is GithubClient._track
+    values = CustomPropertyValues("token", apiUrl="http://localhost/")
+    assert values.api_url == "http://localhost"
+
+
+def test_update_batches_repositories_sharing_changes(github):
+    async def scenario(server):
+        names = server.populate("acme", 70)
+        values = CustomPropertyValues("secret-token", apiUrl=server.url)
+        changes = {name: {"tier": "gold"} for name in names[:65]}
+        changes.update({name: {"tier": "silver"} for name in names[65:]})
+        results = await values.update("acme", changes)
+        return names, results, await values.read("acme")
+
+    names, results, read = github(scenario)
+    assert [len(batch) for batch, _ in results] == [30, 30, 5, 5]
+    assert [properties for _, properties in results] == [
+        {"tier": "gold"},
+        {"tier": "gold"},
+        {"tier": "gold"},
+        {"tier": "silver"},
+    ]
+    assert read[names[0]] == {"tier": "gold"}
+    assert read[names[69]] == {"tier": "silver"}
+    assert len(read) == 70
+
+
+def test_update_sends_every_batch_and_reports_failures(github):
+    async def scenario(server):
+        names = server.populate("acme", 40)
+        values = CustomPropertyValues("secret-token", apiUrl=server.url)
+        changes = {name: {"tier": "gold"} for name in names}
+        # Github rejects a whole batch naming an unknown repository.
+        changes["missing"] = {"tier": "bronze"}
+        with pytest.raises(CustomPropertyUpdateError) as error:
+            await values.update("acme", changes, concurrency=1)
+        return names, error.value, await values.read("acme")
+
+    names, error, read = github(scenario)
+    assert error.failed == ["missing"]
+    assert [len(batch) for batch, _, _ in error.results] == [30, 10, 1]
+    assert error.results[0][2] is None and error.results[1][2] is None
+    assert isinstance(error.results[2][2], GithubApiError)
+    assert error.results[2][2].status == 422
+    assert all(read[name] == {"tier": "gold"} for name in names)
+
+
+def test_read_raises_instead_of_truncating(github):
+    async def scenario(server):
+        server.populate("acme", 150)
+        values = CustomPropertyValues("secret-token", apiUrl=server.url)
+        # The budget runs out after the first of two pages.
+        with pytest.raises(GithubApiError) as error:
+            await values.read("acme")
+        return error.value.status
+
+    assert github(scenario, rateLimit=1) == 403
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,146 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_fake_github_server.py
+
+This file tests the FakeGithubServer class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import aiohttp
+import asyncio
+import json
+import time
+
+HEADERS = {"Authorization": "token secret-token"}
+
+
+async def get(server, path: str, headers=None):
+    """
+    Sends a GET request to the fake server.
+    :param server: The server.
+    :type server: pythoneda.shared.git.github.FakeGithubServer
+    :param path: The path, with its query.
+    :type path: str
+    :param headers: Extra request headers, if any.
+    :type headers: Union[Dict[str, str], None]
+    :return: The status, the headers and the body.
+    :rtype: Tuple[int, multidict.CIMultiDict, bytes]
+    """
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            f"{server.url}{path}", headers={**HEADERS, **(headers or {})}
+        ) as response:
+            return response.status, response.headers.copy(), await response.read()
+
+
+def test_listings_are_paginated_with_link_headers(github):
+    async def scenario(server):
+        names = server.populate("acme", 25)
+        first = await get(server, "/orgs/acme/repos?per_page=10")
+        last = await get(server, "/orgs/acme/repos?per_page=10&page=3")
+        beyond = await get(server, "/orgs/acme/repos?per_page=10&page=4")
+        return names, first, last, beyond
+
+    names, first, last, beyond = github(scenario)
+    status, headers, body = first
+    assert status == 200
+    assert [item["name"] for item in json.loads(body)] == names[:10]
+    assert 'page=2>; rel="next"' in headers["Link"]
+    assert 'page=3>; rel="last"' in headers["Link"]
+    status, headers, body = last
+    assert [item["name"] for item in json.loads(body)] == names[20:]
+    assert 'rel="next"' not in headers["Link"]
+    assert 'page=2>; rel="prev"' in headers["Link"]
+    assert json.loads(beyond[2]) == []
+
+
+def test_unchanged_responses_are_answered_with_a_free_304(github):
+    async def scenario(server):
+        payload = server.add_repository("acme", "widgets")
+        _, headers, _ = await get(server, "/repos/acme/widgets")
+        etag = headers["ETag"]
+        status, unchanged, body = await get(
+            server, "/repos/acme/widgets", {"If-None-Match": etag}
+        )
+        payload["description"] = "Changed"
+        changed = await get(server, "/repos/acme/widgets", {"If-None-Match": etag})
+        return headers, status, unchanged, body, changed
+
+    headers, status, unchanged, body, changed = github(scenario)
+    assert status == 304 and body == b""
+    assert unchanged["ETag"] == headers["ETag"]
+    # Conditional hits don't use the rate budget.
+    assert unchanged["X-RateLimit-Remaining"] == headers["X-RateLimit-Remaining"]
+    assert changed[0] == 200
+    assert changed[1]["ETag"] != headers["ETag"]
+
+
+def test_latency_delays_every_response(github):
+    async def scenario(server):
+        server.add_repository("acme", "widgets")
+        start = time.perf_counter()
+        await asyncio.gather(*[get(server, "/repos/acme/widgets") for _ in range(5)])
+        return time.perf_counter() - start, server.request_count
+
+    elapsed, requests = github(scenario, latency=0.1)
+    # Delays overlap, as they would against Github.
+    assert 0.1 <= elapsed < 0.4
+    assert requests == 5
+
+
+def test_slow_bodies_arrive_in_chunks(github):
+    async def scenario(server):
+        server.populate("acme", 20)
+        async with aiohttp.ClientSession() as session:
+            async with session.get(
+                f"{server.url}/orgs/acme/repos?per_page=20", headers=HEADERS
+            ) as response:
+                chunks = [chunk async for chunk in response.content.iter_any()]
+        return chunks
+
+    chunks = github(scenario, chunkLatency=0.01, chunkSize=1024)
+    assert len(chunks) > 1
+    assert len(json.loads(b"".join(chunks))) == 20
+
+
+def test_failures_authentication_and_rate_limits(github):
+    async def scenario(server):
+        server.add_repository("acme", "widgets")
+        server.fail_next(1, 502, "Bad Gateway")
+        failed = await get(server, "/repos/acme/widgets")
+        recovered = await get(server, "/repos/acme/widgets")
+        anonymous = await get(server, "/repos/acme/widgets", {"Authorization": ""})
+        await get(server, "/repos/acme/widgets")
+        exhausted = await get(server, "/repos/acme/widgets")
+        return failed, recovered, anonymous, exhausted
+
+    failed, recovered, anonymous, exhausted = github(scenario, rateLimit=3)
+    assert failed[0] == 502
+    assert json.loads(failed[2])["message"] == "Bad Gateway"
+    assert recovered[0] == 200
+    assert anonymous[0] == 401
+    assert exhausted[0] == 403
+    assert exhausted[1]["X-RateLimit-Remaining"] == "0"
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,90 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_import_time.py
+
+This file checks the import cost of pythoneda.shared.git.github.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import pytest
+import subprocess
+import sys
+from typing import Set
+
+BENCHMARK = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "benchmarks",
+    "import_time.py",
+)
+STATEMENTS = [
+    "from pythoneda.shared.git.github import Repository",
+    "from pythoneda.shared.git.github import RepositoryAccess",
+    "from pythoneda.shared.git.github import Team",
+]
+
+
+def run(*args: str) -> subprocess.CompletedProcess:
+    """
+    Runs a fresh interpreter, seeing the same modules as the tests.
+    :param args: The interpreter arguments.
+    :type args: str
+    :return: The finished process.
+    :rtype: subprocess.CompletedProcess
+    """
+    return subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, sys.path))},
+    )
+
+
+def loaded(statement: str) -> Set[str]:
+    """
+    Retrieves the modules loaded after running a statement in a fresh interpreter.
+    :param statement: The Python statement.
+    :type statement: str
+    :return: The names of such modules.
+    :rtype: Set[str]
+    """
+    process = run("-c", f"{statement}\nimport sys\nprint('\\n'.join(sys.modules))")
+    assert process.returncode == 0, process.stderr
+    return set(process.stdout.split())
+
+
+@pytest.mark.parametrize("statement", STATEMENTS)
+def test_imports_stay_within_budget(statement):
+    process = run(BENCHMARK, "--statement", statement, "--runs", "3")
+    assert process.returncode == 0, process.stdout + process.stderr
+
+
+@pytest.mark.parametrize("statement", STATEMENTS)
+def test_imports_defer_the_event_loop(statement):
+    # Whatever pythoneda.shared needs itself is not this package's cost.
+    modules = loaded(statement) - loaded("import pythoneda.shared")
+    for module in ("asyncio", "ssl", "aiohttp", "multidict", "http.server"):
+        assert module not in modules
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,161 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_json_array_stream.py
+
+This file tests the JsonArrayStream class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import json
+from pythoneda.shared.git.github import JsonArrayStream, RepositoryAccess
+import pytest
+
+DOCUMENT = json.dumps(
+    [
+        {"name": "widget", "tags": ["a", "b"], "size": 12.5e3},
+        "café ☃",
+        -17,
+        0.25,
+        True,
+        None,
+        [],
+        {},
+        [1, [2, [3]]],
+        1234567890,
+    ],
+    ensure_ascii=False,
+).encode("utf-8")
+
+
+def parse(chunks) -> list:
+    """
+    Feeds some chunks to a new parser, and closes it.
+    :param chunks: The chunks.
+    :type chunks: Iterable[bytes]
+    :return: All elements.
+    :rtype: list
+    """
+    parser = JsonArrayStream()
+    elements = []
+    for chunk in chunks:
+        elements.extend(parser.feed(chunk))
+    elements.extend(parser.close())
+    assert parser.finished
+    return elements
+
+
+def test_parses_a_document_fed_at_once():
+    assert parse([DOCUMENT]) == json.loads(DOCUMENT)
+
+
+def test_parses_a_document_split_at_every_byte():
+    expected = json.loads(DOCUMENT)
+    for split in range(len(DOCUMENT) + 1):
+        assert parse([DOCUMENT[:split], DOCUMENT[split:]]) == expected
+
+
+def test_parses_a_document_fed_byte_by_byte():
+    assert parse(DOCUMENT[index : index + 1] for index in range(len(DOCUMENT))) == (
+        json.loads(DOCUMENT)
+    )
+
+
+def test_waits_for_the_rest_of_a_number():
+    parser = JsonArrayStream()
+    assert parser.feed(b"[12") == []
+    assert parser.feed(b"34") == []
+    assert parser.feed(b".5") == []
+    assert parser.feed(b"e") == []
+    assert parser.feed(b"2, 7") == [1234.5e2]
+    assert parser.feed(b"]") == [7]
+    assert parser.finished
+    assert parser.close() == []
+
+
+def test_decodes_elements_as_soon_as_they_complete():
+    parser = JsonArrayStream()
+    assert parser.feed(b'[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(b": 2}") == [{"b": 2}]
+    assert not parser.finished
+
+
+def test_parses_large_elements():
+    element = {"blob": "x" * 1000000, "items": list(range(10000))}
+    document = json.dumps([element, element]).encode("utf-8")
+    chunks = [document[start : start + 4096] for start in range(0, len(document), 4096)]
+    assert parse(chunks) == [element, element]
+
+
+def test_parses_empty_arrays():
+    assert parse([b" [ ] \n"]) == []
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        b"[1,,2]",
+        b"[,1]",
+        b"[1 2]",
+        b"[1,]",
+        b"[1]garbage",
+        b"[1] [2]",
+        b"{}",
+        b"1",
+        b"[1;2]",
+        b"[x]",
+        b"[1.]",
+        b'["a" "b"]',
+        b"[\xff]",
+    ],
+)
+def test_rejects_malformed_documents(document):
+    with pytest.raises(ValueError):
+        parse([document])
+    with pytest.raises(ValueError):
+        parse(document[index : index + 1] for index in range(len(document)))
+
+
+@pytest.mark.parametrize("document", [b"", b"[", b"[1,", b'[{"a": 1}', b"[12"])
+def test_rejects_truncated_documents(document):
+    with pytest.raises(ValueError):
+        parse([document])
+
+
+def test_stream_yields_repositories_before_their_page_ends(github):
+    async def scenario(server):
+        server.populate("acme", 100)
+        access = RepositoryAccess("secret-token", apiUrl=server.url)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        arrivals = [loop.time() - start async for _ in access.stream("acme")]
+        return arrivals
+
+    # A single page, sent in chunks 20ms apart.
+    arrivals = github(scenario, chunkLatency=0.02, chunkSize=8192)
+    assert len(arrivals) == 100
+    assert arrivals[-1] >= 0.1
+    assert arrivals[0] < arrivals[-1] / 2
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,241 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_metrics.py
+
+This file tests the GithubMetrics class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from pythoneda.shared.git.github import (
+    AiohttpTransport,
+    GithubMetrics,
+    RepositoryAccess,
+)
+from urllib.request import urlopen
+
+
+def samples(text: str) -> dict:
+    """
+    Parses the samples of a Prometheus text exposition.
+    :param text: The exposition.
+    :type text: str
+    :return: The values, by metric name and labels.
+    :rtype: dict
+    """
+    result = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            result[name] = float(value)
+    return result
+
+
+def test_track_records_latency_status_and_in_flight():
+    metrics = GithubMetrics(buckets=(0.5, 1.0))
+
+    async def scenario():
+        async with metrics.track("GET", "/repos/{org}/{name}", "token") as observe:
+            running = samples(metrics.render())
+            observe(404, {})
+        return running
+
+    running = asyncio.run(scenario())
+    assert (
+        running[
+            'github_api_requests_in_flight{method="GET",endpoint="/repos/{org}/{name}"}'
+        ]
+        == 1
+    )
+    done = samples(metrics.render())
+    labels = 'method="GET",endpoint="/repos/{org}/{name}"'
+    assert done[f"github_api_requests_in_flight{{{labels}}}"] == 0
+    assert done[f'github_api_request_duration_seconds_bucket{{{labels},le="0.5"}}'] == 1
+    assert (
+        done[f'github_api_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 1
+    )
+    assert done[f"github_api_request_duration_seconds_count{{{labels}}}"] == 1
+    assert done[f'github_api_requests_total{{{labels},status_class="4xx"}}'] == 1
+    assert done[f'github_api_errors_total{{{labels},status_class="4xx"}}'] == 1
+
+
+def test_track_counts_exceptions():
+    metrics = GithubMetrics()
+
+    async def scenario():
+        try:
+            async with metrics.track("GET", "/orgs/{org}/repos", "token"):
+                raise OSError("unreachable")
+        except OSError:
+            pass
+
+    asyncio.run(scenario())
+    labels = 'method="GET",endpoint="/orgs/{org}/repos",status_class="exception"'
+    assert samples(metrics.render())[f"github_api_errors_total{{{labels}}}"] == 1
+
+
+def test_requests_against_the_fake_server(github):
+    metrics = GithubMetrics()
+
+    async def scenario(server):
+        server.add_repository("acme", "widget")
+        access = RepositoryAccess("secret-token", metrics, server.url)
+        assert await access.fetch("acme", "widget") is not None
+        assert await access.fetch("acme", "missing") is None
+
+    github(scenario, rateLimit=100)
+    text = metrics.render()
+    values = samples(text)
+    labels = 'method="GET",endpoint="/repos/{org}/{name}"'
+    assert values[f'github_api_requests_total{{{labels},status_class="2xx"}}'] == 1
+    assert values[f'github_api_errors_total{{{labels},status_class="4xx"}}'] == 1
+    fingerprint = GithubMetrics.fingerprint("secret-token")
+    assert values[f'github_api_rate_limit_remaining{{token="{fingerprint}"}}'] == 98
+    assert values[f'github_api_rate_limit_limit{{token="{fingerprint}"}}'] == 100
+    assert "secret-token" not in text
+
+
+def test_stream_times_requests_up_to_their_headers(github):
+    metrics = GithubMetrics(buckets=(0.5, 5.0))
+    labels = 'method="GET",endpoint="/orgs/{org}/repos"'
+
+    async def scenario(server):
+        server.populate("acme", 150)
+        access = RepositoryAccess("secret-token", metrics, server.url)
+        in_flight = set()
+        async for _ in access.stream("acme"):
+            in_flight.add(
+                samples(metrics.render())[f"github_api_requests_in_flight{{{labels}}}"]
+            )
+            # A slow consumer must not be measured as a slow request.
+            await asyncio.sleep(0.005)
+        return in_flight
+
+    assert github(scenario) == {0}
+    values = samples(metrics.render())
+    assert values[f"github_api_request_duration_seconds_count{{{labels}}}"] == 2
+    assert (
+        values[f'github_api_request_duration_seconds_bucket{{{labels},le="0.5"}}'] == 2
+    )
+
+
+def test_default_transport_reports_its_connections(github):
+    metrics = GithubMetrics()
+
+    async def scenario(server):
+        server.add_repository("acme", "widgets")
+        access = RepositoryAccess("secret-token", metrics, server.url)
+        server.latency = 0.1
+        calls = [
+            asyncio.ensure_future(access.fetch("acme", "widgets")) for _ in range(5)
+        ]
+        await asyncio.sleep(0.05)
+        during = samples(metrics.render())
+        await asyncio.gather(*calls)
+        return during, samples(metrics.render())
+
+    during, after = github(scenario)
+    labels = '{pool="RepositoryAccess"}'
+    assert during[f"github_api_pool_connections_in_use{labels}"] == 5
+    assert during[f"github_api_pool_connections_limit{labels}"] == 0
+    assert f"github_api_pool_utilization_ratio{labels}" not in during
+    assert after[f"github_api_pool_connections_in_use{labels}"] == 0
+
+
+def test_shared_session_reports_its_pool(github):
+    import aiohttp
+
+    metrics = GithubMetrics()
+
+    async def scenario(server):
+        server.populate("acme", 50)
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=2)
+        ) as session:
+            transport = AiohttpTransport(session, metrics, "shared")
+            peaks = []
+
+            async def fetch():
+                # The connection stays checked out while the body trickles in.
+                async with transport.request(
+                    "GET",
+                    f"{server.url}/orgs/acme/repos?per_page=50",
+                    {"Authorization": "token secret-token"},
+                ) as response:
+                    peaks.append(samples(metrics.render()))
+                    await response.read()
+
+            await asyncio.gather(*[fetch() for _ in range(6)])
+            return peaks, samples(metrics.render())
+
+    peaks, after = github(scenario, chunkLatency=0.01, chunkSize=4096)
+    labels = '{pool="shared"}'
+    assert (
+        max(peak[f"github_api_pool_connections_in_use{labels}"] for peak in peaks) == 2
+    )
+    assert all(
+        peak[f"github_api_pool_connections_limit{labels}"] == 2 for peak in peaks
+    )
+    assert (
+        max(peak[f"github_api_pool_utilization_ratio{labels}"] for peak in peaks) == 1.0
+    )
+    assert after[f"github_api_pool_connections_in_use{labels}"] == 0
+
+
+def test_client_calls_and_caches():
+    metrics = GithubMetrics()
+    metrics.observe_calls("sync_client", 150, 100)
+    metrics.observe_cache("repositories", True)
+    metrics.observe_cache("repositories", True)
+    metrics.observe_cache("repositories", False)
+    values = samples(metrics.render())
+    assert values['github_api_client_calls_in_flight{client="sync_client"}'] == 150
+    assert values['github_api_client_call_pressure_ratio{client="sync_client"}'] == 1.5
+    assert values['github_api_cache_hits_total{cache="repositories"}'] == 2
+    assert values['github_api_cache_misses_total{cache="repositories"}'] == 1
+    assert (
+        abs(values['github_api_cache_hit_ratio{cache="repositories"}'] - 2 / 3) < 1e-9
+    )
+
+
+def test_labels_are_escaped():
+    metrics = GithubMetrics()
+    metrics.observe_cache('quote"back\\slash', True)
+    assert 'cache="quote\\"back\\\\slash"' in metrics.render()
+
+
+def test_serve():
+    metrics = GithubMetrics()
+    metrics.observe_cache("blobs", True)
+    host, port = metrics.serve(port=0)
+    try:
+        with urlopen(f"http://{host}:{port}/metrics") as response:
+            assert response.status == 200
+            assert "text/plain" in response.headers["Content-Type"]
+            body = response.read().decode("utf-8")
+    finally:
+        metrics.stop()
+    assert 'github_api_cache_hits_total{cache="blobs"} 1' in body
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,199 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_org_scanner.py
+
+This file tests the OrgScanner class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import time
+from pythoneda.shared.git.github import (
+    GithubApiError,
+    OrgScanner,
+    RepositoryAccess,
+    RepositoryInventory,
+)
+import pytest
+
+
+def test_shards_cover_every_page(github):
+    async def scenario(server):
+        server.populate("acme", 450)
+        server.populate("tiny", 5)
+        scanner = OrgScanner("secret-token", apiUrl=server.url, pagesPerShard=2)
+        return await scanner.shards_async(["acme", "tiny"])
+
+    assert github(scenario) == [
+        ("acme", 1, 2),
+        ("acme", 3, 4),
+        ("acme", 5, None),
+        ("tiny", 1, None),
+    ]
+
+
+def test_counting_keeps_to_the_request_rate(github):
+    async def scenario(server):
+        orgs = [f"org-{index:02d}" for index in range(15)]
+        for org in orgs:
+            server.populate(org, 1)
+        scanner = OrgScanner(
+            "secret-token", apiUrl=server.url, requestsPerSecond=10, pagesPerShard=1
+        )
+        start = time.perf_counter()
+        shards = await scanner.shards_async(orgs)
+        return shards, time.perf_counter() - start
+
+    shards, elapsed = github(scenario)
+    assert len(shards) == 15
+    # A burst of a second's worth of requests, then 10 per second.
+    assert elapsed >= 0.45
+
+
+def test_scans_keep_counting_and_listing_to_the_request_rate(github, tmp_path):
+    path = str(tmp_path / "orgs.jsonl")
+
+    async def scenario(server):
+        for org in ("acme", "tiny"):
+            server.populate(org, 250)
+        scanner = OrgScanner(
+            "secret-token",
+            apiUrl=server.url,
+            processes=2,
+            requestsPerSecond=5,
+            pagesPerShard=1,
+            mpContext="fork",
+        )
+        start = time.perf_counter()
+        written = await asyncio.to_thread(
+            scanner.scan_to, RepositoryInventory(path), ["acme", "tiny"]
+        )
+        return written, server.request_count, time.perf_counter() - start
+
+    written, requests, elapsed = github(scenario)
+    assert written == 500
+    # 2 counts and 6 pages: a burst of 5, then 5 per second.
+    assert requests == 8
+    assert elapsed >= 0.55
+
+
+def test_shards_raise_for_organizations_that_cant_be_listed(github):
+    async def scenario(server):
+        server.populate("acme", 10)
+        scanner = OrgScanner("secret-token", apiUrl=server.url)
+        with pytest.raises(GithubApiError) as error:
+            await scanner.shards_async(["acme", "missing"])
+        return error.value.status
+
+    assert github(scenario) == 404
+
+
+def test_blocking_methods_refuse_a_running_loop():
+    scanner = OrgScanner("secret-token", apiUrl="http://localhost:1")
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="shards_async"):
+            scanner.shards(["acme"])
+        with pytest.raises(RuntimeError, match="to_thread"):
+            next(scanner.repositories(["acme"]))
+
+    asyncio.run(scenario())
+
+
+def test_stream_sorts_by_creation(github):
+    async def scenario(server):
+        names = server.populate("acme", 5)
+        access = RepositoryAccess("secret-token", apiUrl=server.url)
+        oldest = [
+            repository.name
+            async for repository in access.stream(
+                "acme", 2, sort="created", direction="asc"
+            )
+        ]
+        newest = [
+            repository.name
+            async for repository in access.stream("acme", sort="created")
+        ]
+        return names, oldest, newest
+
+    names, oldest, newest = github(scenario)
+    assert oldest == names
+    assert newest == list(reversed(names))
+
+
+@pytest.mark.parametrize("mpContext", ["spawn", "fork"])
+def test_scan_to_merges_all_shards(github, tmp_path, mpContext):
+    path = str(tmp_path / "orgs.jsonl.gz")
+
+    async def scenario(server):
+        names = server.populate("acme", 730) + server.populate("tiny", 3, "small")
+        scanner = OrgScanner(
+            "secret-token",
+            apiUrl=server.url,
+            processes=3,
+            requestsPerSecond=1000,
+            pagesPerShard=2,
+            mpContext=mpContext,
+        )
+        written = await asyncio.to_thread(
+            scanner.scan_to, RepositoryInventory(path), ["acme", "tiny"]
+        )
+        return names, written
+
+    names, written = github(scenario)
+    assert written == 733
+    scanned = [repository.name for repository in RepositoryInventory(path).read()]
+    assert sorted(scanned) == sorted(names)
+
+
+def test_failed_shards_fail_the_scan(github, tmp_path):
+    path = str(tmp_path / "orgs.jsonl")
+    with open(path, "w") as previous:
+        previous.write("previous\n")
+
+    async def scenario(server):
+        server.populate("acme", 450)
+        scanner = OrgScanner(
+            "secret-token",
+            apiUrl=server.url,
+            processes=2,
+            pagesPerShard=1,
+            mpContext="spawn",
+        )
+        shards = await scanner.shards_async(["acme"])
+        # The first page any worker asks for fails.
+        server.fail_next(1, 502, "Server Error")
+        with pytest.raises(GithubApiError) as error:
+            await asyncio.to_thread(
+                scanner.scan_to, RepositoryInventory(path), ["acme"]
+            )
+        return shards, error.value
+
+    shards, error = github(scenario)
+    assert len(shards) == 5
+    assert error.status == 502
+    with open(path) as current:
+        assert current.read() == "previous\n"
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
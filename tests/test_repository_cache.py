@@ -0,0 +1,211 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_repository_cache.py
+
+This file tests the RepositoryCache class and cached fetches.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from pythoneda.shared.git.github import RepositoryAccess, RepositoryCache
+
+
+def test_entries_age_from_fresh_to_stale_to_expired():
+    cache = RepositoryCache(softTtl=10, maxStale=60)
+    cache.put("acme", "widgets", "repository", '"etag"', 100)
+    validated = cache._entries[("acme", "widgets")][2]
+    assert cache.get("acme", "widgets", validated + 5) == (
+        "repository",
+        '"etag"',
+        RepositoryCache.FRESH,
+    )
+    assert cache.get("acme", "widgets", validated + 30)[2] == RepositoryCache.STALE
+    assert cache.get("acme", "widgets", validated + 90)[2] == RepositoryCache.EXPIRED
+    assert cache.get("acme", "missing") is None
+
+
+def test_touch_renews_the_entry():
+    cache = RepositoryCache(softTtl=10, maxStale=60)
+    cache.put("acme", "widgets", "repository", '"etag"', 100)
+    cache._entries[("acme", "widgets")][2] -= 30
+    assert cache.get("acme", "widgets")[2] == RepositoryCache.STALE
+    cache.touch("acme", "widgets")
+    assert cache.get("acme", "widgets")[2] == RepositoryCache.FRESH
+    cache.touch("acme", "missing")
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entries_are_evicted_beyond_the_entry_limit():
+    cache = RepositoryCache(maxEntries=2)
+    cache.put("acme", "a", "a", None, 10)
+    cache.put("acme", "b", "b", None, 10)
+    cache.get("acme", "a")
+    cache.put("acme", "c", "c", None, 10)
+    assert cache.keys() == [("acme", "a"), ("acme", "c")]
+    assert cache.size == 20
+
+
+def test_entries_are_evicted_beyond_the_byte_limit():
+    cache = RepositoryCache(maxBytes=100)
+    cache.put("acme", "a", "a", None, 40)
+    cache.put("acme", "b", "b", None, 40)
+    cache.put("acme", "c", "c", None, 40)
+    assert cache.keys() == [("acme", "b"), ("acme", "c")]
+    assert cache.size == 80
+    # Replacing an entry releases its previous size.
+    cache.put("acme", "c", "c", None, 70)
+    assert cache.keys() == [("acme", "c")]
+    assert cache.size == 70
+    # Entries larger than the whole cache aren't kept.
+    cache.put("acme", "huge", "huge", None, 101)
+    assert cache.keys() == [("acme", "c")]
+    cache.discard("acme", "c")
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_fresh_entries_are_served_without_requests(github):
+    async def scenario(server):
+        server.add_repository("acme", "widgets")
+        access = RepositoryAccess(
+            "secret-token", apiUrl=server.url, cache=RepositoryCache(softTtl=60)
+        )
+        first = await access.fetch("acme", "widgets", staleWhileRevalidate=True)
+        requests = server.request_count
+        second = await access.fetch("acme", "widgets", staleWhileRevalidate=True)
+        return first, second, server.request_count - requests
+
+    first, second, requests = github(scenario)
+    assert first.name == "widgets"
+    assert second is first
+    assert requests == 0
+
+
+def test_unchanged_repositories_are_revalidated_with_a_304(github):
+    async def scenario(server):
+        server.add_repository("acme", "widgets")
+        cache = RepositoryCache()
+        access = RepositoryAccess("secret-token", apiUrl=server.url, cache=cache)
+        first = await access.fetch("acme", "widgets")
+        cache._entries[("acme", "widgets")][2] -= 3600
+        second = await access.fetch("acme", "widgets")
+        return first, second, cache.get("acme", "widgets")[2]
+
+    first, second, state = github(scenario)
+    # The cached instance comes back, and its entry is fresh again.
+    assert second is first
+    assert state == RepositoryCache.FRESH
+
+
+def test_stale_entries_are_served_while_revalidated(github):
+    async def scenario(server):
+        payload = server.add_repository("acme", "widgets")
+        access = RepositoryAccess(
+            "secret-token",
+            apiUrl=server.url,
+            cache=RepositoryCache(softTtl=0, maxStale=3600),
+        )
+        first = await access.fetch("acme", "widgets")
+        payload["description"] = "Changed"
+        server.latency = 0.05
+        requests = server.request_count
+        served = await asyncio.gather(
+            *[
+                access.fetch("acme", "widgets", staleWhileRevalidate=True)
+                for _ in range(10)
+            ]
+        )
+        await asyncio.sleep(0.2)
+        revalidations = server.request_count - requests
+        server.latency = 0
+        latest = await access.fetch("acme", "widgets", staleWhileRevalidate=True)
+        return first, served, revalidations, latest
+
+    first, served, revalidations, latest = github(scenario)
+    assert all(repository is first for repository in served)
+    # The concurrent stale hits share a single revalidation.
+    assert revalidations == 1
+    assert latest.description == "Changed"
+
+
+def test_expired_entries_wait_for_a_single_revalidation(github):
+    async def scenario(server):
+        payload = server.add_repository("acme", "widgets")
+        access = RepositoryAccess(
+            "secret-token",
+            apiUrl=server.url,
+            cache=RepositoryCache(softTtl=0, maxStale=0),
+        )
+        await access.fetch("acme", "widgets")
+        payload["description"] = "Changed"
+        server.latency = 0.05
+        requests = server.request_count
+        fetched = await asyncio.gather(
+            *[
+                access.fetch("acme", "widgets", staleWhileRevalidate=True)
+                for _ in range(10)
+            ]
+        )
+        return fetched, server.request_count - requests
+
+    fetched, requests = github(scenario)
+    assert requests == 1
+    assert all(repository.description == "Changed" for repository in fetched)
+
+
+def test_failed_revalidations_keep_the_stale_entry(github):
+    async def scenario(server):
+        server.add_repository("acme", "widgets")
+        cache = RepositoryCache(softTtl=0, maxStale=3600)
+        first = await RepositoryAccess(
+            "secret-token", apiUrl=server.url, cache=cache
+        ).fetch("acme", "widgets")
+        # Nothing listens there, so revalidations raise.
+        unreachable = RepositoryAccess(
+            "secret-token", apiUrl="http://127.0.0.1:1", cache=cache
+        )
+        served = await unreachable.fetch("acme", "widgets", staleWhileRevalidate=True)
+        await asyncio.sleep(0.1)
+        retried = await unreachable.fetch("acme", "widgets", staleWhileRevalidate=True)
+        await asyncio.sleep(0.1)
+        return first, served, retried, cache.keys(), unreachable._revalidations
+
+    first, served, retried, keys, pending = github(scenario)
+    assert served is first and retried is first
+    assert keys == [("acme", "widgets")]
+    assert pending == {}
+
+
+def test_deleted_repositories_are_discarded(github):
+    async def scenario(server):
+        server.add_repository("acme", "widgets")
+        cache = RepositoryCache(softTtl=0, maxStale=0)
+        access = RepositoryAccess("secret-token", apiUrl=server.url, cache=cache)
+        await access.fetch("acme", "widgets")
+        del server._repositories["acme"]["widgets"]
+        missing = await access.fetch("acme", "widgets", staleWhileRevalidate=True)
+        return missing, len(cache)
+
+    assert github(scenario) == (None, 0)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,152 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_repository_inventory.py
+
+This file tests the RepositoryInventory class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import os
+from pythoneda.shared.git.github import (
+    GithubApiError,
+    RepositoryAccess,
+    RepositoryInventory,
+)
+import pytest
+
+
+def test_export_org_round_trips_through_gzip(github, tmp_path):
+    path = str(tmp_path / "acme.jsonl.gz")
+
+    async def scenario(server):
+        names = server.populate("acme", 1234)
+        access = RepositoryAccess("secret-token", apiUrl=server.url)
+        written = await RepositoryInventory(path).export_org(access, "acme")
+        return names, written
+
+    names, written = github(scenario)
+    assert written == 1234
+    inventory = RepositoryInventory(path)
+    assert inventory.compression == "gzip"
+    assert [repository.name for repository in inventory.read()] == names
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_export_org_raises_and_keeps_the_previous_file(github, tmp_path):
+    path = str(tmp_path / "acme.jsonl")
+    with open(path, "w") as previous:
+        previous.write("previous\n")
+
+    async def scenario(server):
+        server.populate("acme", 1000)
+        access = RepositoryAccess("secret-token", apiUrl=server.url)
+        # The budget runs out after three of the ten pages.
+        with pytest.raises(GithubApiError) as error:
+            await RepositoryInventory(path).export_org(access, "acme")
+        return error.value
+
+    error = github(scenario, rateLimit=3)
+    assert error.status == 403
+    assert "rate limit" in error.message
+    with open(path) as current:
+        assert current.read() == "previous\n"
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_count_raises_on_failure(github):
+    async def scenario(server):
+        server.populate("acme", 3)
+        access = RepositoryAccess("secret-token", apiUrl=server.url)
+        assert await access.count("acme") == 3
+        with pytest.raises(GithubApiError) as error:
+            await access.count("missing")
+        return error.value.status
+
+    assert github(scenario) == 404
+
+
+def test_restore_creates_every_repository(github, tmp_path):
+    path = str(tmp_path / "acme.jsonl")
+
+    async def scenario(server):
+        names = server.populate("acme", 50)
+        access = RepositoryAccess("secret-token", apiUrl=server.url)
+        await RepositoryInventory(path).export_org(access, "acme")
+        target = RepositoryInventory(str(tmp_path / "copy.jsonl"))
+        target.write_encoded(
+            line.replace('"org":"acme"', '"org":"copy"')
+            for line in open(path, encoding="utf-8")
+        )
+        created = await target.restore(access, concurrency=4)
+        restored = [repository.name async for repository in access.stream("copy")]
+        return names, created, restored
+
+    names, created, restored = github(scenario)
+    assert created == 50
+    assert restored == names
+
+
+class FailingAccess:
+    """
+    Fails the creation of one repository, and blocks the others.
+    """
+
+    def __init__(self, failing: str):
+        self.failing = failing
+        self.started = []
+        self.cancelled = []
+
+    async def create(self, org: str, name: str, **kwargs):
+        self.started.append(name)
+        if name == self.failing:
+            await asyncio.sleep(0.01)
+            raise RuntimeError(f"{name} failed")
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+
+
+def test_restore_cancels_pending_creations_on_failure(github, tmp_path):
+    path = str(tmp_path / "acme.jsonl")
+
+    async def scenario(server):
+        server.populate("acme", 20)
+        access = RepositoryAccess("secret-token", apiUrl=server.url)
+        inventory = RepositoryInventory(path)
+        await inventory.export_org(access, "acme")
+        failing = FailingAccess("repo-000002")
+        with pytest.raises(RuntimeError, match="repo-000002 failed"):
+            await inventory.restore(failing, concurrency=4)
+        return failing
+
+    failing = github(scenario)
+    assert len(failing.started) == 4
+    assert sorted(failing.cancelled) == sorted(
+        name for name in failing.started if name != "repo-000002"
+    )
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,174 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_repository_tree.py
+
+This file tests the RepositoryTree class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from pythoneda.shared.git.github import (
+    BlobStore,
+    GithubApiError,
+    Repository,
+    RepositoryAccess,
+    RepositoryTree,
+)
+import pytest
+
+FILES = {
+    "LICENSE": b"GPL",
+    "README.md": b"# Widget",
+    "docs/CODEOWNERS": b"* @docs",
+    "docs/guide/intro.md": b"Intro",
+    "src/widget/__init__.py": b"",
+    "src/widget/CODEOWNERS": b"* @core",
+}
+
+
+async def widget(server):
+    """
+    Adds the widget repository, with its files.
+    :param server: The fake server.
+    :type server: pythoneda.shared.git.github.FakeGithubServer
+    :return: The repository.
+    :rtype: pythoneda.shared.git.github.Repository
+    """
+    server.add_repository("acme", "widget")
+    for path, content in FILES.items():
+        server.add_file("acme", "widget", path, content)
+    return await RepositoryAccess("secret-token", apiUrl=server.url).fetch(
+        "acme", "widget"
+    )
+
+
+def test_files_downloads_only_matching_blobs_once(github, tmp_path):
+    async def scenario(server):
+        repository = await widget(server)
+        tree = RepositoryTree(
+            "secret-token", BlobStore(str(tmp_path)), apiUrl=server.url
+        )
+        before = server.request_count
+        first, second = await asyncio.gather(
+            tree.files(repository, ["LICENSE*", "*/CODEOWNERS"]),
+            tree.files(repository, ["*/CODEOWNERS"]),
+        )
+        return first, second, server.request_count - before
+
+    first, second, requests = github(scenario)
+    assert first == {
+        "LICENSE": b"GPL",
+        "docs/CODEOWNERS": b"* @docs",
+        "src/widget/CODEOWNERS": b"* @core",
+    }
+    assert second == {
+        "docs/CODEOWNERS": b"* @docs",
+        "src/widget/CODEOWNERS": b"* @core",
+    }
+    # Two trees, and each of the three blobs once.
+    assert requests == 5
+
+
+def test_truncated_trees_are_walked_directory_by_directory(github, tmp_path):
+    async def scenario(server):
+        repository = await widget(server)
+        tree = RepositoryTree(
+            "secret-token", BlobStore(str(tmp_path)), apiUrl=server.url
+        )
+        return await tree.tree(repository)
+
+    complete = github(scenario)
+    walked = github(scenario, treeLimit=4)
+    assert len(complete) == 10
+    assert walked == complete
+    assert {entry["path"] for entry in walked if entry["type"] == "blob"} == set(FILES)
+
+
+def test_snapshot_raises_on_failed_blobs(github, tmp_path):
+    store = BlobStore(str(tmp_path))
+
+    async def scenario(server):
+        repository = await widget(server)
+        tree = RepositoryTree("secret-token", store, apiUrl=server.url, concurrency=1)
+        # The fetch, the tree and the first blob fit in the budget, the second doesn't.
+        with pytest.raises(GithubApiError) as error:
+            await tree.snapshot(repository, ["LICENSE", "README.md"])
+        return error.value
+
+    error = github(scenario, rateLimit=3)
+    assert error.status == 403
+    stored = [BlobStore.sha_of(content) in store for content in (b"GPL", b"# Widget")]
+    assert sorted(stored) == [False, True]
+
+
+def test_store_discards_and_rewrites_changed_blobs(tmp_path):
+    store = BlobStore(str(tmp_path))
+    sha = store.put(b"GPL")
+    with open(store.path_of(sha), "wb") as changed:
+        changed.write(b"MIT")
+    assert store.get(sha) is None
+    assert sha not in store
+    with open(store.path_of(sha), "wb") as changed:
+        changed.write(b"MIT")
+    assert store.put(b"GPL") == sha
+    assert store.get(sha) == b"GPL"
+
+
+def test_snapshot_downloads_changed_blobs_again(github, tmp_path):
+    store = BlobStore(str(tmp_path))
+
+    async def scenario(server):
+        repository = await widget(server)
+        tree = RepositoryTree("secret-token", store, apiUrl=server.url)
+        snapshot = await tree.snapshot(repository, ["LICENSE"])
+        with open(store.path_of(snapshot["LICENSE"]), "wb") as changed:
+            changed.write(b"MIT")
+        return await tree.files(repository, ["LICENSE"])
+
+    assert github(scenario) == {"LICENSE": b"GPL"}
+
+
+def test_missing_repositories_have_no_tree(github, tmp_path):
+    async def scenario(server):
+        tree = RepositoryTree(
+            "secret-token", BlobStore(str(tmp_path)), apiUrl=server.url
+        )
+        missing = Repository.from_github("acme", {"name": "gone"})
+        return await tree.tree(missing), await tree.snapshot(missing, ["*"])
+
+    assert github(scenario) == (None, None)
+
+
+def test_semaphore_follows_the_running_loop(tmp_path):
+    tree = RepositoryTree("token", BlobStore(str(tmp_path)), concurrency=2)
+
+    async def semaphores():
+        return tree._semaphore(2), tree._semaphore(2)
+
+    first, same = asyncio.run(semaphores())
+    second, _ = asyncio.run(semaphores())
+    assert first is same
+    assert first is not second
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
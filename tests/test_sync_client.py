@@ -0,0 +1,112 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_sync_client.py
+
+This file tests the SyncClient class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import concurrent.futures
+from pythoneda.shared.git.github import SyncClient
+import pytest
+import threading
+
+
+class Sleeper:
+    """
+    A call that never ends on its own, and tells when it's cancelled.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    async def __call__(self):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+def test_calls_from_many_threads_share_the_session(github):
+    async def scenario(server):
+        names = server.populate("acme", 120)
+        server.add_team("acme", "Core")
+        with SyncClient("secret-token", apiUrl=server.url, useUvloop=False) as client:
+            fetched = await asyncio.gather(
+                *[asyncio.to_thread(client.fetch, "acme", name) for name in names[:20]]
+            )
+            listed = await asyncio.to_thread(client.repositories, "acme")
+            teams = await asyncio.to_thread(client.teams, "acme")
+            session = client._session
+        return names, fetched, listed, teams, session
+
+    names, fetched, listed, teams, session = github(scenario)
+    assert [repository.name for repository in fetched] == names[:20]
+    assert [repository.name for repository in listed] == names
+    assert [team["slug"] for team in teams] == ["core"]
+    assert session.closed
+
+
+def test_run_cancels_calls_that_time_out():
+    sleeper = Sleeper()
+    with SyncClient("token", useUvloop=False) as client:
+        with pytest.raises(concurrent.futures.TimeoutError):
+            client.run(sleeper(), timeout=0.05)
+        assert sleeper.cancelled.wait(5)
+        assert client.run(asyncio.sleep(0, "still usable")) == "still usable"
+
+
+def test_close_cancels_outstanding_calls():
+    sleepers = [Sleeper() for _ in range(3)]
+    client = SyncClient("token", useUvloop=False)
+    futures = [client.submit(sleeper()) for sleeper in sleepers]
+    client.close()
+    assert not client.running
+    assert all(sleeper.cancelled.is_set() for sleeper in sleepers)
+    assert all(future.cancelled() for future in futures)
+
+
+def test_failed_start_leaves_the_client_stopped():
+    class Broken(SyncClient):
+        attempts = 0
+
+        async def _open(self):
+            Broken.attempts += 1
+            if Broken.attempts == 1:
+                raise RuntimeError("no session")
+            await super()._open()
+
+    client = Broken("token", useUvloop=False)
+    with pytest.raises(RuntimeError, match="no session"):
+        client.start()
+    assert not client.running
+    assert client._loop is None and client._session is None
+    # The next call starts it again.
+    assert client.run(asyncio.sleep(0, "started")) == "started"
+    assert client.running
+    client.close()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
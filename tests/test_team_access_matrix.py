@@ -0,0 +1,132 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_team_access_matrix.py
+
+This file tests the TeamAccessMatrix class.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared.git.github import GithubApiError, Team, TeamAccessMatrix
+import pytest
+
+
+def organization(server):
+    """
+    Populates an organization with three teams.
+    :param server: The fake server.
+    :type server: pythoneda.shared.git.github.FakeGithubServer
+    """
+    names = server.populate("acme", 150)
+    server.add_team("acme", "Core")
+    server.add_team("acme", "Docs", parent="core")
+    server.add_team("acme", "Bots")
+    for name in names:
+        server.grant("acme", "core", name, "maintain")
+    server.grant("acme", "docs", names[0], "push")
+    server.grant("acme", "bots", names[1], "pull")
+
+
+def test_build_follows_pagination(github):
+    async def scenario(server):
+        organization(server)
+        team = Team("secret-token", apiUrl=server.url)
+        return await TeamAccessMatrix(team, "acme", concurrency=2).build()
+
+    matrix = github(scenario)
+    assert len(matrix) == 152
+    assert len(matrix.repositories("core")) == 150
+    assert matrix.permission("docs", "repo-000000") == "push"
+    assert matrix.teams("repo-000001") == {"core": "maintain", "bots": "pull"}
+    assert matrix.permission("bots", "repo-000002") is None
+
+
+def test_refresh_replaces_rows_only_on_success(github):
+    async def scenario(server):
+        organization(server)
+        team = Team("secret-token", apiUrl=server.url)
+        matrix = await TeamAccessMatrix(team, "acme").build()
+        server.grant("acme", "docs", "repo-000003", "admin")
+        server.fail_next()
+        with pytest.raises(GithubApiError):
+            await matrix.refresh("docs", "bots")
+        before = dict(matrix.repositories("docs"))
+        assert await matrix.refresh("docs", "bots") == 3
+        return before, matrix
+
+    before, matrix = github(scenario)
+    assert before == {"repo-000000": "push"}
+    assert matrix.repositories("docs") == {
+        "repo-000000": "push",
+        "repo-000003": "admin",
+    }
+
+
+class BrokenTeam(Team):
+    """
+    Fails listing the repositories of one team, after its first one.
+    """
+
+    broken = None
+
+    async def repositories(self, org: str, slug: str, perPage: int = 100):
+        async for repository in super().repositories(org, slug, perPage):
+            yield repository
+            if slug == self.broken:
+                raise GithubApiError("GET", slug, 502, "Server Error")
+
+
+def test_failed_build_keeps_the_previous_matrix(github):
+    async def scenario(server):
+        organization(server)
+        team = BrokenTeam("secret-token", apiUrl=server.url)
+        matrix = await TeamAccessMatrix(team, "acme").build()
+        server.add_team("acme", "Ops")
+        server.grant("acme", "ops", "repo-000004", "admin")
+        server.grant("acme", "ops", "repo-000005", "admin")
+        team.broken = "ops"
+        with pytest.raises(GithubApiError):
+            await matrix.build()
+        return matrix
+
+    matrix = github(scenario)
+    assert len(matrix) == 152
+    assert [team.slug for team in matrix.hierarchy] == ["core", "docs", "bots"]
+    assert matrix.teams("repo-000004") == {"core": "maintain"}
+
+
+def test_team_streams_raise_instead_of_truncating(github):
+    async def scenario(server):
+        organization(server)
+        team = Team("secret-token", apiUrl=server.url)
+        # The budget runs out after the first of two pages.
+        with pytest.raises(GithubApiError) as error:
+            async for _ in team.repositories("acme", "core"):
+                pass
+        assert error.value.status == 403
+        with pytest.raises(GithubApiError):
+            await team.hierarchy("acme")
+
+    github(scenario, rateLimit=1)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
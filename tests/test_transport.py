@@ -0,0 +1,182 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_transport.py
+
+This file tests the transports and cassettes.
+
+Copyright (C) 2024-today rydnr's pythoneda-shared-git/github
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from pythoneda.shared.git.github import (
+    AiohttpTransport,
+    Cassette,
+    RecordingTransport,
+    ReplayTransport,
+    RepositoryAccess,
+    RepositoryCache,
+    Transport,
+)
+import pytest
+
+
+def record(github, path: str):
+    """
+    Records two fetches of a repository, the second one conditional, and a
+    listing of two pages.
+    """
+
+    async def scenario(server):
+        server.add_repository("acme", "widget", description="The widget")
+        server.populate("acme", 150)
+        recording = RecordingTransport(AiohttpTransport(), path)
+        access = RepositoryAccess(
+            "secret-token",
+            apiUrl=server.url,
+            transport=recording,
+            cache=RepositoryCache(),
+        )
+        await access.fetch("acme", "widget")
+        await access.fetch("acme", "widget")
+        names = [repository.name async for repository in access.stream("acme")]
+        await recording.close()
+        return names
+
+    return github(scenario)
+
+
+def test_transport_is_abstract():
+    with pytest.raises(TypeError):
+        Transport()
+
+
+def test_cassette_key_includes_conditional_headers():
+    plain = Cassette.key("get", "https://api.github.com/repos/acme/widget")
+    conditional = Cassette.key(
+        "GET",
+        "http://localhost:1234/repos/acme/widget",
+        None,
+        {"if-none-match": 'W/"abc"', "Authorization": "token secret"},
+    )
+    assert plain == ("GET", "/repos/acme/widget", "", "")
+    assert conditional == ("GET", "/repos/acme/widget", "", 'if-none-match: W/"abc"')
+
+
+def test_replay_serves_recorded_exchanges_once(github, tmp_path):
+    path = str(tmp_path / "sync.jsonl.gz")
+    names = record(github, path)
+    assert len(names) == 151
+    assert all("secret-token" not in line for line in Cassette(path).lines())
+
+    async def replay():
+        transport = ReplayTransport(path)
+        assert transport.pending == 4
+        access = RepositoryAccess(
+            "secret-token", transport=transport, cache=RepositoryCache()
+        )
+        # The listing first, although it was recorded last.
+        replayed = [repository.name async for repository in access.stream("acme")]
+        assert transport.held == 2
+        first = await access.fetch("acme", "widget")
+        second = await access.fetch("acme", "widget")
+        assert transport.pending == 0
+        assert transport.held == 0
+        await transport.close()
+        return replayed, first, second
+
+    replayed, first, second = asyncio.run(replay())
+    assert replayed == names
+    assert first.description == "The widget"
+    # The conditional request was answered with the recorded 304.
+    assert second is first
+
+
+def test_replay_tells_conditional_requests_apart(github, tmp_path):
+    path = str(tmp_path / "sync.jsonl.gz")
+    record(github, path)
+
+    async def replay():
+        transport = ReplayTransport(path)
+        # Without a cache, both fetches are unconditional, and only one was recorded.
+        access = RepositoryAccess("secret-token", transport=transport)
+        assert (await access.fetch("acme", "widget")).description == "The widget"
+        with pytest.raises(LookupError):
+            await access.fetch("acme", "widget")
+        await transport.close()
+
+    asyncio.run(replay())
+
+
+def test_replay_look_ahead_is_bounded(github, tmp_path):
+    path = str(tmp_path / "sync.jsonl.gz")
+    record(github, path)
+
+    async def replay():
+        transport = ReplayTransport(path, lookAhead=1)
+        access = RepositoryAccess("secret-token", transport=transport)
+        with pytest.raises(LookupError):
+            [repository async for repository in access.stream("acme")]
+        assert transport.held == 1
+        await transport.close()
+
+    asyncio.run(replay())
+
+
+def test_replay_scales_latencies(github, tmp_path):
+    path = str(tmp_path / "slow.jsonl.gz")
+
+    async def scenario(server):
+        server.add_repository("acme", "widget")
+        recording = RecordingTransport(AiohttpTransport(), path)
+        access = RepositoryAccess("token", apiUrl=server.url, transport=recording)
+        await access.fetch("acme", "widget")
+        await recording.close()
+
+    github(scenario, latency=0.2)
+
+    async def replay(scale: float) -> float:
+        transport = ReplayTransport(path, timeScale=scale)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await RepositoryAccess("token", transport=transport).fetch("acme", "widget")
+        await transport.close()
+        return loop.time() - start
+
+    assert asyncio.run(replay(0.0)) < 0.1
+    assert asyncio.run(replay(0.5)) >= 0.1
+
+
+def test_aiohttp_transport_reuses_a_session(github):
+    async def scenario(server):
+        import aiohttp
+
+        server.add_repository("acme", "widget")
+        async with aiohttp.ClientSession() as session:
+            transport = AiohttpTransport(session)
+            access = RepositoryAccess("token", apiUrl=server.url, transport=transport)
+            assert (await access.fetch("acme", "widget")).name == "widget"
+            assert not session.closed
+
+    github(scenario)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End: